@@ -0,0 +1,128 @@
+"""
+Runs the slot operations of the QDutch interface off the UI thread.
+
+The operations are queued on a worker thread, which applies them to the game one at a time and
+posts an ACTION_DONE pygame event with the result. The event loop keeps rendering while a
+simulation is in flight, handles the result like any other event and then calls handled. It does
+not read the game state while the worker is busy, so the game needs no lock. The worker also
+counts the depth of its queue and the latency of the actions.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+
+# Posted when an action is done, with the attributes tag, result, error and latency
+ACTION_DONE = pygame.event.custom_type()
+
+
+class ActionWorker:
+    """
+    Queue of game actions executed one at a time on a worker thread.
+
+    The worker is a thread and not a process because the game state lives in the objects of the
+    UI process. The simulators release the GIL in their numerical kernels, so the event loop stays
+    responsive.
+    """
+    def __init__(self, game, event_type=ACTION_DONE):
+        """
+        Initializes the worker.
+
+        Args:
+            game (QDutch): The game the actions are applied to.
+            event_type (int): The type of the events posted when an action is done.
+        """
+        self.game = game
+        self.event_type = event_type
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="qdutch-action")
+
+        self._counter_lock = threading.Lock()
+        # Actions whose ACTION_DONE event was not handled yet by the event loop
+        self._unhandled = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    @property
+    def busy(self) -> bool:
+        """
+        bool: Whether actions are queued, running, or done but not handled yet by the event loop
+        (see handled).
+        """
+        return self._unhandled > 0
+
+    def submit(self, method, *args, tag=None) -> None:
+        """
+        Queues a call to a method of the game. An ACTION_DONE event is posted when it is done.
+
+        Args:
+            method (str): The name of the QDutch method, e.g. "apply_operator_card".
+            *args: The arguments of the method.
+            tag (hashable): Passed back in the event to identify the action.
+        """
+        with self._counter_lock:
+            self._unhandled += 1
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+        self.executor.submit(self._run, method, args, tag, time.perf_counter())
+
+    def _run(self, method, args, tag, submitted):
+        result, error = None, None
+        try:
+            result = getattr(self.game, method)(*args)
+        except Exception as exception:
+            error = exception
+
+        # Latency from the submission, including the time spent in the queue
+        latency = time.perf_counter() - submitted
+        with self._counter_lock:
+            self.queue_depth -= 1
+            self.completed += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+        pygame.event.post(pygame.event.Event(self.event_type, tag=tag, result=result, error=error, latency=latency))
+
+    def handled(self) -> None:
+        """
+        Tells the worker that the ACTION_DONE event of an action was handled, so that the event
+        loop does not accept a new move against the state before the result.
+        """
+        with self._counter_lock:
+            self._unhandled -= 1
+
+    def wait(self) -> None:
+        """
+        Waits until the queued actions are done. The actions run in order, so an empty action
+        queued after them is done last.
+        """
+        self.executor.submit(lambda: None).result()
+
+    def stats(self) -> dict:
+        """
+        Returns the instrumentation counters of the worker, exported with the metrics of
+        instrumentation.py when it is enabled.
+
+        Returns:
+            dict: The current and maximal queue depth, the number of completed actions and their
+            mean and maximal latency in seconds.
+        """
+        with self._counter_lock:
+            return {
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "completed": self.completed,
+                "mean_latency": self.total_latency / self.completed if self.completed else 0.0,
+                "max_latency": self.max_latency,
+            }
+
+    def shutdown(self) -> None:
+        """
+        Stops the worker thread, dropping the actions that did not start.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
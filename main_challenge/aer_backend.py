@@ -0,0 +1,186 @@
+from functools import lru_cache
+
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.quantum_info import Statevector
+from qiskit_aer import AerSimulator
+from gates import parse_operator
+
+
+@lru_cache(maxsize=256)
+def _operator_circuit(operator: tuple[str, ...], num_qubits: int) -> QuantumCircuit:
+    """
+    Builds the circuit of an operator card.
+
+    Args:
+        operator (tuple[str, ...]): The quantum operator.
+        num_qubits (int): The number of qubits.
+
+    Returns:
+        QuantumCircuit: The gates of the operator.
+    """
+    qc = QuantumCircuit(num_qubits)
+    for gate_name, qubits in parse_operator(operator):
+        if gate_name == "swap":
+            qubit1, qubit2 = qubits
+            qc.cx(qubit1, qubit2)
+            qc.cx(qubit2, qubit1)
+            qc.cx(qubit1, qubit2)
+        else:
+            getattr(qc, gate_name)(*qubits)
+    return qc
+
+
+class AerBackend:
+    """
+    Simulates a player slot with Qiskit: the operators evolve a fixed-size statevector and the
+    measurements are run on the Aer simulator.
+
+    The slot only keeps its statevector, so the cost of a turn does not grow with the history of
+    the game. The measurement circuits load the statevector with Aer's set_statevector
+    instruction, which does not need to be transpiled into a state preparation circuit.
+    """
+    # Whether set_statevector can load the states of the game, e.g. from a snapshot
+    settable = True
+    # Whether the state is always pure, so statevector never fails
+    pure = True
+
+    def __init__(self, num_qubits, rng=None):
+        """
+        Initializes the backend in the state |0...0>.
+
+        Args:
+            num_qubits (int): The number of qubits of the slot.
+            rng (numpy.random.Generator | None): Generator used to seed the simulator. If None, the
+                simulator is not seeded.
+        """
+        self.num_qubits = num_qubits
+        self.rng = rng
+        self.simulator = AerSimulator(method="statevector")
+        self.set_state(0)
+
+    def _run(self, qc):
+        options = {} if self.rng is None else {"seed_simulator": int(self.rng.integers(2**31))}
+        return self.simulator.run(qc, shots=1, **options).result()
+
+    def _load_circuit(self) -> QuantumCircuit:
+        qc = QuantumCircuit(self.num_qubits, self.num_qubits)
+        qc.set_statevector(self.state)
+        return qc
+
+    def apply_operator(self, operator: list[str]) -> None:
+        """
+        Evolves the statevector with the gates of a quantum operator.
+
+        Args:
+            operator (list[str]): The quantum operator to apply.
+        """
+        self.state = self.state.evolve(_operator_circuit(tuple(operator), self.num_qubits))
+
+    def measure(self, nb) -> int:
+        """
+        Measures one qubit on the Aer simulator.
+
+        Args:
+            nb (int): The index of the qubit to measure.
+
+        Returns:
+            int: The measured bit.
+        """
+        qc = self._load_circuit()
+        qc.measure(nb, nb)
+        # To be able to retrieve the state and continue the game after the measurement
+        qc.save_statevector()
+
+        result = self._run(qc)
+
+        # Keep the statevector AFTER the partial measurement to continue the game
+        self.state = Statevector(result.get_statevector(qc))
+        measured_bit = list(result.get_counts().keys())[0][-nb-1]
+
+        return int(measured_bit)
+
+    def measure_all(self) -> int:
+        """
+        Measures all the qubits on the Aer simulator.
+
+        Returns:
+            int: The measured value.
+        """
+        qc = self._load_circuit()
+        qc.measure(range(self.num_qubits), range(self.num_qubits))
+
+        counts = self._run(qc).get_counts()
+        value = int(list(counts.keys())[0], 2)
+
+        # The state collapses to the measured value
+        self.set_state(value)
+
+        return value
+
+    def probabilities(self):
+        """
+        Computes the probability of each value without collapsing the state.
+
+        Returns:
+            np.ndarray: The probability of each of the 2**num_qubits values.
+        """
+        return self.state.probabilities()
+
+    def set_state(self, state: int) -> None:
+        """
+        Prepares a computational basis state.
+
+        Args:
+            state (int): The index of the basis state.
+        """
+        self.state = Statevector.from_int(state, 2**self.num_qubits)
+
+    def set_statevector(self, amplitudes) -> None:
+        """
+        Sets the amplitudes of the slot. They are normalized, so amplitudes stored with a lower
+        precision can be loaded.
+
+        Args:
+            amplitudes (np.ndarray): The 2**num_qubits amplitudes.
+        """
+        amplitudes = np.asarray(amplitudes, dtype=complex)
+        self.state = Statevector(amplitudes / np.linalg.norm(amplitudes))
+
+    def snapshot(self):
+        """
+        Saves the state of the slot. The operators and measurements replace the Statevector
+        instead of modifying it, so it is shared with the snapshot without any copy.
+
+        Returns:
+            Statevector: The saved state.
+        """
+        return self.state
+
+    def restore(self, state) -> None:
+        """
+        Restores a state saved by snapshot.
+
+        Args:
+            state (Statevector): The saved state.
+        """
+        self.state = state
+
+    @property
+    def statevector(self):
+        """
+        np.ndarray: The amplitudes of the slot.
+        """
+        return self.state.data.copy()
+
+    def to_circuit(self):
+        """
+        Builds a circuit preparing the current state of the slot. The circuit is only generated
+        when it is requested, e.g. by PlayerSlot.plot_circuit.
+
+        Returns:
+            QuantumCircuit: The state preparation circuit.
+        """
+        qc = QuantumCircuit(self.num_qubits, self.num_qubits)
+        qc.initialize(self.state.data, range(self.num_qubits))
+        return qc
@@ -0,0 +1,247 @@
+"""
+Vectorized QDutch engine simulating many games at once.
+
+Instead of Player and PlayerSlot objects, all the slots of all the games are stored in one
+contiguous array of shape (games, players, 4, 2**num_qubits). The cards are encoded with
+integers: the type code is the index of the type in card_generator.CARD_TYPES and the data is the
+basis state of a State card, the index of the operator in card_generator.enumerate_operators for
+an Operator card, or the measured qubit of a Measurement card. Entangle cards, which link two
+slots (see registers.py), are not simulated: the engine refuses a deck with Entangle cards.
+
+A game ends when the turn comes back to the player that called "Dutch". Its state is then frozen
+while the other games go on: the cards played in it and the moves to the next player are ignored.
+"""
+import numpy as np
+import parameters as param
+from card_generator import CARD_TYPES, enumerate_operators
+from statevector_backend import operator_unitary
+
+
+STATE = CARD_TYPES.index("State")
+OPERATOR = CARD_TYPES.index("Operator")
+MEASUREMENT = CARD_TYPES.index("Measurement")
+ENTANGLE = CARD_TYPES.index("Entangle")
+
+HAND_SIZE = 4
+
+
+class BatchQDutch:
+    """
+    Struct-of-arrays QDutch engine playing num_games games in lockstep.
+
+    Every method working on slots takes index arrays (games, players, slots) of the same length,
+    and a slot must not appear more than once in the same call.
+    """
+    def __init__(self, num_games, nb_players=4, rng=None):
+        """
+        Initializes the engine.
+
+        Args:
+            num_games (int): The number of games simulated at once.
+            nb_players (int): The number of players in each game.
+            rng (numpy.random.Generator | None): Generator used to draw the initial hands and
+                sample the measurements.
+        """
+        if param.entangle_prob > 0:
+            raise ValueError("The batch engine does not simulate Entangle cards, set parameters.entangle_prob to 0.")
+
+        self.num_games = num_games
+        self.nb_players = nb_players
+        self.num_qubits = param.num_qubits
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+        self.operators = enumerate_operators()
+        self.unitaries = np.array([operator_unitary(operator, self.num_qubits) for operator in self.operators])
+        self._bits = (np.arange(2**self.num_qubits)[None, :] >> np.arange(self.num_qubits)[:, None]) & 1
+
+        dim = 2**self.num_qubits
+        self.states = np.zeros((num_games, nb_players, HAND_SIZE, dim), dtype=complex)
+        self.active_player = np.zeros(num_games, dtype=np.int64)
+        self.dutch_player = np.full(num_games, -1, dtype=np.int64)
+        self.turn = np.zeros(num_games, dtype=np.int64)
+        self.ended = np.zeros(num_games, dtype=bool)
+
+    def start_game(self) -> None:
+        """
+        Deals a random computational basis state to every slot of every game.
+        """
+        self.active_player[:] = 0
+        self.dutch_player[:] = -1
+        self.turn[:] = 0
+        self.ended[:] = False
+
+        values = self.rng.integers(0, 2**self.num_qubits, size=self.states.shape[:3])
+        self.states[:] = 0
+        np.put_along_axis(self.states, values[..., None], 1, axis=-1)
+
+    # --- Slot operations ---
+    def set_state(self, games, players, slots, values) -> None:
+        """
+        Prepares computational basis states.
+
+        Args:
+            games, players, slots (np.ndarray): The slots to change.
+            values (np.ndarray): The basis state of each slot.
+        """
+        self.states[games, players, slots] = 0
+        self.states[games, players, slots, values] = 1
+
+    def apply_operator(self, games, players, slots, operators) -> None:
+        """
+        Applies operator cards.
+
+        Args:
+            games, players, slots (np.ndarray): The slots to change.
+            operators (np.ndarray): The index of the operator card applied to each slot.
+        """
+        psi = self.states[games, players, slots]
+        self.states[games, players, slots] = np.einsum("kij,kj->ki", self.unitaries[operators], psi)
+
+    def measure(self, games, players, slots, qubits) -> np.ndarray:
+        """
+        Measures one qubit of each slot and collapses the states.
+
+        Args:
+            games, players, slots (np.ndarray): The slots to measure.
+            qubits (np.ndarray): The qubit measured in each slot.
+
+        Returns:
+            np.ndarray: The measured bits.
+        """
+        psi = self.states[games, players, slots]
+        ones = self._bits[qubits].astype(bool)
+
+        p1 = np.sum(np.abs(psi)**2 * ones, axis=1)
+        bits = self.rng.random(len(p1)) < p1
+
+        kept = ones == bits[:, None]
+        norm = np.sqrt(np.where(bits, p1, 1 - p1))
+        self.states[games, players, slots] = np.where(kept, psi, 0) / norm[:, None]
+
+        return bits.astype(np.int64)
+
+    def measure_all(self, games, players, slots) -> np.ndarray:
+        """
+        Measures all the qubits of each slot and collapses them to the measured basis states.
+
+        Args:
+            games, players, slots (np.ndarray): The slots to measure.
+
+        Returns:
+            np.ndarray: The measured values.
+        """
+        cdf = np.cumsum(np.abs(self.states[games, players, slots])**2, axis=1)
+        draws = self.rng.random(len(cdf)) * cdf[:, -1]
+        values = np.minimum(np.sum(cdf <= draws[:, None], axis=1), cdf.shape[1] - 1)
+
+        self.set_state(games, players, slots, values)
+        return values
+
+    def value_probabilities(self) -> np.ndarray:
+        """
+        Computes the exact distribution of the value of every slot, without measuring.
+
+        Returns:
+            np.ndarray: (games, players, 4, 2**num_qubits) probability of each value.
+        """
+        return np.abs(self.states)**2
+
+    def qubit_probabilities(self) -> np.ndarray:
+        """
+        Computes the exact probability of measuring 1 on every qubit of every slot, without
+        measuring.
+
+        Returns:
+            np.ndarray: (games, players, 4, num_qubits) probability of each qubit to be measured as 1.
+        """
+        return self.value_probabilities() @ self._bits.T
+
+    def apply_cards(self, card_types, card_data, players, slots) -> np.ndarray:
+        """
+        Plays one card in every game that has not ended.
+
+        Args:
+            card_types (np.ndarray): (games,) type code of the card played in each game.
+            card_data (np.ndarray): (games,) encoded data of each card.
+            players (np.ndarray): (games,) player targeted in each game.
+            slots (np.ndarray): (games,) slot targeted in each game.
+
+        Returns:
+            np.ndarray: The measured bit in the games where a Measurement card was played, -1
+            elsewhere.
+        """
+        card_types = np.asarray(card_types)
+        card_data = np.asarray(card_data)
+        players = np.asarray(players)
+        slots = np.asarray(slots)
+        results = np.full(self.num_games, -1, dtype=np.int64)
+        if np.any(card_types == ENTANGLE):
+            raise ValueError("The batch engine does not simulate Entangle cards.")
+        playing = ~self.ended
+
+        games = np.flatnonzero((card_types == STATE) & playing)
+        self.set_state(games, players[games], slots[games], card_data[games])
+
+        games = np.flatnonzero((card_types == OPERATOR) & playing)
+        self.apply_operator(games, players[games], slots[games], card_data[games])
+
+        games = np.flatnonzero((card_types == MEASUREMENT) & playing)
+        results[games] = self.measure(games, players[games], slots[games], card_data[games])
+
+        return results
+
+    # --- Game flow ---
+    def call_dutch(self, games) -> None:
+        """
+        Makes the active player of the given games call "Dutch". The games that have ended are
+        ignored.
+
+        Args:
+            games (np.ndarray): The games where "Dutch" is called.
+        """
+        games = np.arange(self.num_games)[games]
+        games = games[~self.ended[games]]
+        self.dutch_player[games] = self.active_player[games]
+
+    def next_player(self) -> None:
+        """
+        Moves to the next player in every game that has not ended. A game ends when the turn
+        comes back to the player that called "Dutch".
+        """
+        playing = ~self.ended
+        self.active_player[playing] = (self.active_player[playing] + 1) % self.nb_players
+        self.turn[playing] += self.active_player[playing] == 0
+        self.ended |= playing & (self.active_player == self.dutch_player)
+
+    def check_end_game(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: Whether each game has ended. A game that has ended stays ended.
+        """
+        self.ended |= self.active_player == self.dutch_player
+        return self.ended.copy()
+
+    def get_scores(self) -> np.ndarray:
+        """
+        Measures every slot and computes the ranking scores of QDutch.get_score.
+
+        Returns:
+            np.ndarray: (games, players) scores, the lowest score wins.
+        """
+        games, players, slots = np.indices(self.states.shape[:3]).reshape(3, -1)
+        values = self.measure_all(games, players, slots).reshape(self.states.shape[:3])
+
+        scores = values.sum(axis=2).astype(float)
+        scores -= 0.5 * (np.arange(self.nb_players)[None, :] == self.dutch_player[:, None])
+        scores += 0.01 * values.min(axis=2)
+        return scores
+
+    def get_ranking(self) -> np.ndarray:
+        """
+        Ranks the players of every game. Players with equal scores share the same rank.
+
+        Returns:
+            np.ndarray: (games, players) rank of each player, starting at 1.
+        """
+        scores = self.get_scores()
+        return 1 + np.sum(scores[:, None, :] < scores[:, :, None], axis=2)
@@ -1,56 +1,60 @@
-import numpy as np
 import random
-from qiskit import QuantumCircuit
 import parameters as param
-import math
 from typing import NamedTuple, Any
 
 
+# Card types, their index is used as type code in the encoded cards
+CARD_TYPES = ["State", "Operator", "Measurement", "Entangle"]
+
+
 class Card(NamedTuple):
     type: str
     data: Any
 
-def generate_card():
-    card_type = random.choices(
-        ["State", "Operator", "Measurement"], 
-        [param.state_prob, param.operation_prob, param.measurement_prob]
+def generate_card(rng=random):
+    card_type = rng.choices(
+        CARD_TYPES, 
+        [param.state_prob, param.operation_prob, param.measurement_prob, param.entangle_prob]
     )[0]
     if card_type == "State":
-        data = generate_state()
+        data = generate_state(rng)
 
     elif card_type == "Measurement":
-        data = generate_measurement()
+        data = generate_measurement(rng)
+
+    elif card_type == "Entangle":
+        data = generate_entangle(rng)
 
     else:
-        data = generate_operator()
+        data = generate_operator(rng)
 
     return Card(type=card_type, data=data)
         
 
 
-def generate_operator():
+def generate_operator(rng=random):
     card = ["I" for _ in range(param.num_qubits)]
 
-    operator_type = random.choices(
+    operator_type = rng.choices(
         ['one_single_qubit', "two_single_qubit", "two_qubit"], [param.one_single_qubit_prob, param.two_single_qubit_prob, param.two_qubit_prob])[0]
     
     if operator_type == "one_single_qubit":
-        index = random.sample(range(param.num_qubits), 1)[0]
-        operation = random.choices(list(param.gate_prob["single_qubit"].keys()),
+        index = rng.sample(range(param.num_qubits), 1)[0]
+        operation = rng.choices(list(param.gate_prob["single_qubit"].keys()),
                                   list(param.gate_prob["single_qubit"].values()))[0]
         card[index] = operation
 
     elif operator_type == "two_single_qubit":
-        index = random.sample(range(param.num_qubits), 2)
-        operation = random.choices(list(param.gate_prob["single_qubit"].keys()),
+        index = rng.sample(range(param.num_qubits), 2)
+        operation = rng.choices(list(param.gate_prob["single_qubit"].keys()),
                                   list(param.gate_prob["single_qubit"].values()), k = 2)
 
         for i, op in zip(index, operation):
             card[i] = op
 
     else:
-        index = random.sample(range(param.num_qubits), 2)
-        operation = random.choices(list(param.gate_prob["two_qubit"].keys()),
+        index = rng.sample(range(param.num_qubits), 2)
+        operation = rng.choices(list(param.gate_prob["two_qubit"].keys()),
                                   list(param.gate_prob["two_qubit"].values()))[0]
         if operation == "CNOT":
             card[index[0]] = "C"
@@ -66,8 +70,120 @@ def generate_operator():
 
     return card
 
-def generate_state() -> int:
-    return random.randint(0, 2**param.num_qubits - 1)
+def enumerate_operators():
+    """
+    Lists all the distinct operator cards that generate_operator can produce.
+
+    Returns:
+        list[list[str]]: The operator cards.
+    """
+    single_qubit_gates = list(param.gate_prob["single_qubit"].keys())
+    cards = []
+
+    # One single qubit gate
+    for index in range(param.num_qubits):
+        for operation in single_qubit_gates:
+            card = ["I" for _ in range(param.num_qubits)]
+            card[index] = operation
+            cards.append(card)
+
+    # Two single qubit gates
+    for index1 in range(param.num_qubits):
+        for index2 in range(index1 + 1, param.num_qubits):
+            for operation1 in single_qubit_gates:
+                for operation2 in single_qubit_gates:
+                    card = ["I" for _ in range(param.num_qubits)]
+                    card[index1] = operation1
+                    card[index2] = operation2
+                    cards.append(card)
+
+    # Two qubit gates
+    for index1 in range(param.num_qubits):
+        for index2 in range(param.num_qubits):
+            if index1 == index2:
+                continue
+
+            if "CNOT" in param.gate_prob["two_qubit"]:
+                card = ["I" for _ in range(param.num_qubits)]
+                card[index1] = "C"
+                card[index2] = "X"
+                cards.append(card)
+
+            if "SWAP" in param.gate_prob["two_qubit"] and index1 < index2:
+                card = ["I" for _ in range(param.num_qubits)]
+                card[index1] = "SWAP"
+                card[index2] = "SWAP"
+                cards.append(card)
+
+            if "H_CNOT" in param.gate_prob["two_qubit"]:
+                card = ["I" for _ in range(param.num_qubits)]
+                card[index1] = "HC"
+                card[index2] = "X"
+                cards.append(card)
+
+    return cards
+
+def card_distribution():
+    """
+    Lists all the distinct cards that generate_card can produce, with their probability.
+
+    Returns:
+        tuple[list[Card], list[float]]: The cards and the probability of drawing each of them.
+    """
+    n = param.num_qubits
+    single_qubit = param.gate_prob["single_qubit"]
+    two_qubit = param.gate_prob["two_qubit"]
+    single_total = sum(single_qubit.values())
+    two_total = sum(two_qubit.values())
+    # Probability of one ordered pair of distinct qubits
+    pair_prob = 1 / (n * (n - 1)) if n > 1 else 0
+
+    def operator_prob(card):
+        gates = [(index, gate) for index, gate in enumerate(card) if gate != "I"]
+        if len(gates) == 1:
+            return param.one_single_qubit_prob / n * single_qubit[gates[0][1]] / single_total
+
+        names = [gate for _, gate in gates]
+        if all(gate in single_qubit for gate in names):
+            # Both orders of the two qubits give the same card
+            return param.two_single_qubit_prob * 2 * pair_prob * single_qubit[names[0]] * single_qubit[names[1]] / single_total**2
+        if names == ["SWAP", "SWAP"]:
+            return param.two_qubit_prob * 2 * pair_prob * two_qubit["SWAP"] / two_total
+        name = "CNOT" if "C" in names else "H_CNOT"
+        return param.two_qubit_prob * pair_prob * two_qubit[name] / two_total
+
+    cards, probabilities = [], []
+    for state in range(2**n):
+        cards.append(Card("State", state))
+        probabilities.append(param.state_prob / 2**n)
+    for operator in enumerate_operators():
+        cards.append(Card("Operator", operator))
+        probabilities.append(param.operation_prob * operator_prob(operator))
+    for qubit in range(n):
+        cards.append(Card("Measurement", qubit))
+        probabilities.append(param.measurement_prob / n)
+    for gate, prob in two_qubit.items():
+        for qubit_a in range(n):
+            for qubit_b in range(n):
+                cards.append(Card("Entangle", [gate, qubit_a, qubit_b]))
+                probabilities.append(param.entangle_prob * prob / two_total / n**2)
+
+    return cards, probabilities
+
+def generate_state(rng=random) -> int:
+    return rng.randint(0, 2**param.num_qubits - 1)
+
+def generate_measurement(rng=random):
+    return rng.randint(0, param.num_qubits - 1)
+
+def generate_entangle(rng=random):
+    """
+    Generates the data of an Entangle card: a two qubit gate between a qubit of a first slot and
+    a qubit of a second slot (see registers.py).
 
-def generate_measurement():
-    return random.randint(0, param.num_qubits - 1)
+    Returns:
+        list: The gate, the qubit of the first slot and the qubit of the second slot.
+    """
+    gate = rng.choices(list(param.gate_prob["two_qubit"].keys()),
+                       list(param.gate_prob["two_qubit"].values()))[0]
+    return [gate, rng.randrange(param.num_qubits), rng.randrange(param.num_qubits)]
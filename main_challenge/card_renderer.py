@@ -1,23 +1,13 @@
 import pygame
 import sys
 import os
-
-pygame.init()
+from collections import OrderedDict
+from functools import lru_cache
 
 # Get the directory where the running script is located
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
 SCREEN_SIZE = (900, 600)
-screen = pygame.display.set_mode(SCREEN_SIZE)
-pygame.display.set_caption("Modular Card Renderer")
-
-# Build the absolute path to the image file
-bg_image_path = os.path.join(SCRIPT_DIR, "assets/background.png")
-bg_image = pygame.image.load(bg_image_path).convert_alpha()
-
-measurement_img_path = os.path.join(SCRIPT_DIR, "assets/measure.png")
-measurement_img = pygame.image.load(measurement_img_path).convert_alpha()
-
 
 
 # Colors
@@ -28,7 +18,68 @@ COLOR_TOP = pygame.Color(250, 128, 114)
 COLOR_BOTTOM = pygame.Color(255, 224, 230)
 HIDDEN_BASE = (180, 180, 180)
 
-font = pygame.font.SysFont("arial", 100, bold=False)
+
+# Fonts and images are loaded on first use, so importing this module opens no window
+@lru_cache(maxsize=None)
+def get_font(name, size, bold=False):
+    """
+    Returns a system font, initializing the font module on first use.
+    """
+    if not pygame.font.get_init():
+        pygame.font.init()
+    return pygame.font.SysFont(name, size, bold=bold)
+
+
+@lru_cache(maxsize=None)
+def get_image(name):
+    """
+    Returns an image of the assets directory. The image is converted to the pixel format of the
+    display when a display is open.
+    """
+    image = pygame.image.load(os.path.join(SCRIPT_DIR, "assets", name))
+    if pygame.display.get_surface() is not None:
+        image = image.convert_alpha()
+    return image
+
+
+# Pre-rendered and pre-rotated card surfaces, least recently used first
+SPRITE_CACHE_SIZE = 256
+_sprite_cache = OrderedDict()
+sprite_cache_stats = {"hits": 0, "misses": 0}
+
+
+def _cached_sprite(key, render):
+    """
+    Returns the cached surface of a key, rendering it with render() on a cache miss.
+    """
+    sprite = _sprite_cache.get(key)
+    if sprite is not None:
+        _sprite_cache.move_to_end(key)
+        sprite_cache_stats["hits"] += 1
+        return sprite
+
+    sprite_cache_stats["misses"] += 1
+    sprite = render()
+    _sprite_cache[key] = sprite
+    if len(_sprite_cache) > SPRITE_CACHE_SIZE:
+        _sprite_cache.popitem(last=False)
+    return sprite
+
+
+def sprite_cache_info():
+    """
+    Returns the hit and miss counters and the current size of the sprite cache.
+    """
+    return {**sprite_cache_stats, "size": len(_sprite_cache), "max_size": SPRITE_CACHE_SIZE}
+
+
+def clear_sprite_cache():
+    """
+    Empties the sprite cache and resets its counters.
+    """
+    _sprite_cache.clear()
+    sprite_cache_stats["hits"] = 0
+    sprite_cache_stats["misses"] = 0
 
 def lerp_color(c1, c2, t):
     return pygame.Color(
@@ -53,7 +104,7 @@ def draw_blur_circle(surface, center, radius):
         pygame.draw.circle(blur_surface, color, (radius, radius), r)
     surface.blit(blur_surface, (x - radius, y - radius))
 
-def draw_card_front(board_surface, bits, position, size, rotation=0, card_type="state", measurement_img=measurement_img):
+def draw_card_front(board_surface, bits, position, size, rotation=0, card_type="state", measurement_img=None):
     """
     Draws a card (state, operator, or measurement) with optional rotation.
     - board_surface: main surface to draw onto
@@ -62,9 +113,26 @@ def draw_card_front(board_surface, bits, position, size, rotation=0, card_type="
     - size: (width, height) of the card
     - rotation: angle in degrees (clockwise)
     - card_type: "state", "operator", or "measurement"
-    - measurement_img: optional Surface to render when value == "M"
+    - measurement_img: optional Surface to render when value == "M", assets/measure.png by default
+    The rendered card is kept in the sprite cache, so drawing the same card again is a single blit.
+    """
+    width, height = size
+    if measurement_img is None:
+        measurement_img = get_image("measure.png")
+    key = ("front", tuple(bits) if isinstance(bits, list) else bits, card_type, tuple(size), rotation, id(measurement_img))
+    rotated_surface = _cached_sprite(key, lambda: render_card_front(bits, size, rotation, card_type, measurement_img))
+
+    rotated_rect = rotated_surface.get_rect(center=(position[0] + width // 2, position[1] + height // 2))
+    board_surface.blit(rotated_surface, rotated_rect.topleft)
+
+
+def render_card_front(bits, size, rotation=0, card_type="state", measurement_img=None):
+    """
+    Renders a rotated card front on a new surface (see draw_card_front for the arguments).
     """
     width, height = size
+    if measurement_img is None:
+        measurement_img = get_image("measure.png")
     card_surface = pygame.Surface((width, height), pygame.SRCALPHA)
     pygame.draw.rect(card_surface, CARD_COLOR, card_surface.get_rect(), border_radius=3)
 
@@ -132,15 +200,13 @@ def draw_card_front(board_surface, bits, position, size, rotation=0, card_type="
                 card_surface.blit(img, img_rect)
             else:
                 font_size = int(radius * 1.5)
-                font = pygame.font.SysFont("arial", font_size, bold=False)
+                font = get_font("arial", font_size)
                 text = font.render(str(value), True, TEXT_COLOR)
                 text_rect = text.get_rect(center=(x, int(y)))
                 card_surface.blit(text, text_rect)
 
-    # Rotate and blit onto the main board
-    rotated_surface = pygame.transform.rotate(card_surface, rotation)
-    rotated_rect = rotated_surface.get_rect(center=(position[0] + width // 2, position[1] + height // 2))
-    board_surface.blit(rotated_surface, rotated_rect.topleft)
+    # Rotate the card
+    return pygame.transform.rotate(card_surface, rotation)
 
 
 
@@ -166,24 +232,38 @@ def draw_card_back(board_surface, bg_image, position, size, rotation=0):
     - position: (x, y) top-left corner on the board
     - size: (width, height) of the card
     - rotation: rotation angle in degrees
+    The rendered card is kept in the sprite cache, so drawing the same card again is a single blit.
     """
     width, height = size
 
-    scaled_img = pygame.transform.smoothscale(bg_image.copy(), (width, height))
-
-    # apply_rounded_mask(scaled_img, border_radius=20)
-
-    rotated_img = pygame.transform.rotate(scaled_img, rotation)
+    key = ("back", id(bg_image), tuple(size), rotation)
+    rotated_img = _cached_sprite(key, lambda: render_card_back(bg_image, size, rotation))
     rotated_rect = rotated_img.get_rect(center=(position[0] + width // 2, position[1] + height // 2))
 
     board_surface.blit(rotated_img, rotated_rect.topleft)
 
 
+def render_card_back(bg_image, size, rotation=0):
+    """
+    Renders a rotated card back on a new surface (see draw_card_back for the arguments).
+    """
+    scaled_img = pygame.transform.smoothscale(bg_image.copy(), tuple(size))
+
+    # apply_rounded_mask(scaled_img, border_radius=20)
+
+    return pygame.transform.rotate(scaled_img, rotation)
+
+
 
 # --------------------
 # Example usage
 # --------------------
 def main():
+    pygame.init()
+    screen = pygame.display.set_mode(SCREEN_SIZE)
+    pygame.display.set_caption("Modular Card Renderer")
+    bg_image = get_image("background.png")
+
     running = True
     while running:
         screen.fill(BG)
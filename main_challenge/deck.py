@@ -0,0 +1,199 @@
+"""
+Batched and vectorized card deck.
+
+The deck draws large batches of cards with a few NumPy calls, from cumulative weight tables
+computed once from parameters.py. The cards of a batch are stored in a compact encoded array with
+one row per card:
+    - column 0: the type code, i.e. the index of the type in card_generator.CARD_TYPES;
+    - State card: column 1 holds the basis state;
+    - Measurement card: column 1 holds the measured qubit;
+    - Operator card: columns 1 to num_qubits hold the code of the gate on each qubit, i.e. its
+      index in GATE_CODES;
+    - Entangle card: column 1 holds the index of the gate in TWO_QUBIT_GATES and column 2 holds
+      qubit_a * num_qubits + qubit_b, the qubits of the first and second slot.
+Card objects are only built when a card is actually handed to the game.
+"""
+import numpy as np
+import parameters as param
+from card_generator import CARD_TYPES, Card, enumerate_operators
+
+
+GATE_CODES = ["I", "H", "X", "Z", "S", "C", "SWAP", "HC"]
+
+# Gates written on the two qubits of each two qubit operator
+TWO_QUBIT_GATES = {
+    "CNOT": ("C", "X"),
+    "SWAP": ("SWAP", "SWAP"),
+    "H_CNOT": ("HC", "X"),
+}
+
+STATE = CARD_TYPES.index("State")
+OPERATOR = CARD_TYPES.index("Operator")
+MEASUREMENT = CARD_TYPES.index("Measurement")
+ENTANGLE = CARD_TYPES.index("Entangle")
+
+
+def _cdf(weights):
+    weights = np.asarray(weights, dtype=float)
+    return np.cumsum(weights) / weights.sum()
+
+
+class Deck:
+    """
+    Draws cards by batches with the probabilities of parameters.py at the time of its creation.
+    """
+    def __init__(self, rng=None, batch_size=1024):
+        """
+        Precomputes the cumulative weight tables of the deck.
+
+        Args:
+            rng (numpy.random.Generator | None): Generator used to draw the cards.
+            batch_size (int): The number of cards drawn at once by draw_card.
+        """
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.batch_size = batch_size
+        self.num_qubits = param.num_qubits
+
+        self.type_cdf = _cdf([param.state_prob, param.operation_prob, param.measurement_prob, param.entangle_prob])
+        self.operator_type_cdf = _cdf([param.one_single_qubit_prob, param.two_single_qubit_prob, param.two_qubit_prob])
+
+        single_qubit = param.gate_prob["single_qubit"]
+        self.single_qubit_codes = np.array([GATE_CODES.index(gate) for gate in single_qubit])
+        self.single_qubit_cdf = _cdf(list(single_qubit.values()))
+
+        two_qubit = param.gate_prob["two_qubit"]
+        self.two_qubit_codes = np.array([[GATE_CODES.index(gate) for gate in TWO_QUBIT_GATES[name]] for name in two_qubit])
+        self.two_qubit_cdf = _cdf(list(two_qubit.values()))
+        self.two_qubit_names = np.array([list(TWO_QUBIT_GATES).index(name) for name in two_qubit])
+
+        # Index of each operator in enumerate_operators, from its gate codes
+        self.operator_index = {
+            tuple(GATE_CODES.index(gate) for gate in operator): i
+            for i, operator in enumerate(enumerate_operators())
+        }
+
+        # Current batch of draw_card, as lists to avoid building NumPy scalars for each card
+        self._buffer = []
+        self._position = 0
+
+    def _sample(self, cdf, size):
+        return np.minimum(np.searchsorted(cdf, self.rng.random(size), side="right"), len(cdf) - 1)
+
+    def draw(self, size) -> np.ndarray:
+        """
+        Draws a batch of encoded cards.
+
+        Args:
+            size (int): The number of cards.
+
+        Returns:
+            np.ndarray: (size, 1 + num_qubits) encoded cards.
+        """
+        n = self.num_qubits
+        cards = np.zeros((size, 1 + n), dtype=np.int64)
+        rows = np.arange(size)
+
+        types = self._sample(self.type_cdf, size)
+        cards[:, 0] = types
+        cards[:, 1] = np.where(
+            types == STATE,
+            self.rng.integers(0, 2**n, size),
+            self.rng.integers(0, n, size),
+        )
+
+        # Operators: two distinct random qubits and the gates applied on them
+        operator_types = self._sample(self.operator_type_cdf, size)
+        qubits = np.argsort(self.rng.random((size, n)), axis=1)[:, :2]
+        single_gates = self.single_qubit_codes[self._sample(self.single_qubit_cdf, (size, 2))]
+        two_qubit_gates = self.two_qubit_codes[self._sample(self.two_qubit_cdf, size)]
+
+        codes = np.zeros((size, n), dtype=np.int64)
+        codes[rows, qubits[:, 0]] = np.where(operator_types == 2, two_qubit_gates[:, 0], single_gates[:, 0])
+        second = operator_types > 0
+        codes[rows[second], qubits[second, 1]] = np.where(
+            operator_types[second] == 2, two_qubit_gates[second, 1], single_gates[second, 1]
+        )
+
+        is_operator = types == OPERATOR
+        cards[is_operator, 1:] = codes[is_operator]
+
+        # Entangle cards are only drawn when enabled, so they do not change the other draws
+        entangle = np.flatnonzero(types == ENTANGLE)
+        if len(entangle):
+            cards[entangle, 1] = self.two_qubit_names[self._sample(self.two_qubit_cdf, len(entangle))]
+            cards[entangle, 2] = self.rng.integers(0, n**2, len(entangle))
+        return cards
+
+    def draw_card(self) -> Card:
+        """
+        Draws one card from the current batch, drawing a new batch when it is exhausted.
+
+        Returns:
+            Card: The drawn card.
+        """
+        if self._position == len(self._buffer):
+            self._buffer = self.draw(self.batch_size).tolist()
+            self._position = 0
+
+        row = self._buffer[self._position]
+        self._position += 1
+        return decode(row)
+
+    def snapshot(self):
+        """
+        Saves the position of the deck. A new batch replaces the buffer instead of modifying it,
+        so the buffer is shared with the snapshot without any copy.
+
+        Returns:
+            tuple[list, int]: The current batch and the position in it.
+        """
+        return self._buffer, self._position
+
+    def restore(self, state) -> None:
+        """
+        Restores a position saved by snapshot. The cards of the restored batch are drawn again;
+        the batches drawn afterwards are new ones.
+
+        Args:
+            state (tuple[list, int]): The saved position.
+        """
+        self._buffer, self._position = state
+
+    def card_data(self, cards) -> np.ndarray:
+        """
+        Converts encoded cards to the card data of batch_engine.BatchQDutch.apply_cards.
+
+        Args:
+            cards (np.ndarray): (size, 1 + num_qubits) encoded cards.
+
+        Returns:
+            np.ndarray: The basis state, operator index (in enumerate_operators) or measured qubit
+            of each card.
+        """
+        data = cards[:, 1].copy()
+        operators = np.flatnonzero(cards[:, 0] == OPERATOR)
+
+        # The distinct operators of the batch are looked up once each
+        codes, inverse = np.unique(cards[operators, 1:], axis=0, return_inverse=True)
+        data[operators] = np.array([self.operator_index[tuple(row)] for row in codes.tolist()], dtype=np.int64)[inverse.ravel()]
+        return data
+
+
+def decode(row) -> Card:
+    """
+    Builds the Card object of an encoded card.
+
+    Args:
+        row (np.ndarray | list[int]): The encoded card.
+
+    Returns:
+        Card: The card.
+    """
+    card_type = CARD_TYPES[row[0]]
+    if card_type == "Operator":
+        return Card(card_type, [GATE_CODES[code] for code in row[1:]])
+    if card_type == "Entangle":
+        num_qubits = len(row) - 1
+        return Card(card_type, [list(TWO_QUBIT_GATES)[row[1]], int(row[2]) // num_qubits, int(row[2]) % num_qubits])
+
+    return Card(card_type, int(row[1]))
@@ -0,0 +1,196 @@
+"""
+Expectimax evaluation of the player slots over the transition tables.
+
+A slot is identified by its index in the transition tables (see transition_tables.py), a canonical
+encoding of its state up to the global phase. The value of a slot after d more turns of its owner
+only depends on this index, so the values of all the states are computed at once for each depth
+and kept in a transposition table: a decision is then a few lookups.
+
+The search tree of one slot alternates:
+    - chance nodes over the drawn card, with the probabilities of card_generator.card_distribution;
+    - decision nodes where the owner keeps the slot or plays the card on it, minimizing the value;
+    - chance nodes over the outcome of a Measurement card, with the probabilities of the tables.
+Each turn draws two cards for the four slots of a hand, so a slot is only offered a card with
+probability offer_prob. The slots of a hand are evaluated independently, and the cards the other
+players could play on a hand are not taken into account. Entangle cards link two slots, which the
+tables cannot describe: the search never plays them.
+"""
+import time
+from functools import lru_cache
+
+import numpy as np
+import parameters as param
+from card_generator import card_distribution
+from table_backend import TableBackend
+from transition_tables import get_tables
+
+
+def _card_key(card):
+    # The data of the Operator and Entangle cards are lists
+    return tuple(card.data) if isinstance(card.data, list) else card.data
+
+
+class SlotValues:
+    """
+    Transposition table of the expectimax values of the slot states.
+    """
+    def __init__(self, tables, cards, probabilities, offer_prob=0.5):
+        """
+        Builds the transitions of every card over all the states of the tables.
+
+        Args:
+            tables (TransitionTables): The transition tables.
+            cards (list[Card]): The cards of the deck.
+            probabilities (list[float]): The probability of drawing each card.
+            offer_prob (float): Probability that a slot is offered a card in a turn of its owner.
+        """
+        self.tables = tables
+        self.cards = cards
+        self.card_index = {(card.type, _card_key(card)): i for i, card in enumerate(cards)}
+        self.probabilities = np.asarray(probabilities)
+        self.offer_prob = offer_prob
+
+        # Outcomes of each card on each state: (cards, states, 2) next states and their
+        # probabilities. Only Measurement cards have a second outcome.
+        num_states = tables.num_states
+        self.next_states = np.zeros((len(cards), num_states, 2), dtype=np.int64)
+        self.next_probs = np.zeros((len(cards), num_states, 2))
+        self.next_probs[:, :, 0] = 1
+        for i, card in enumerate(cards):
+            if card.type == "State":
+                self.next_states[i] = tables.basis_states[card.data]
+            elif card.type == "Operator":
+                self.next_states[i, :, 0] = tables.operator_table[:, tables.operator_index[tuple(card.data)]]
+            elif card.type == "Entangle":
+                # Not played: the slot keeps its state
+                self.next_states[i, :, 0] = np.arange(num_states)
+            else:
+                p1 = np.asarray(tables.measure_prob[:, card.data])
+                outcomes = np.asarray(tables.measure_table[:, card.data])
+                # The impossible outcomes (-1) get a null probability
+                self.next_states[i] = np.where(outcomes < 0, outcomes.max(axis=1, keepdims=True), outcomes)
+                self.next_probs[i] = np.stack([1 - p1, p1], axis=1)
+
+        self.levels = [np.asarray(tables.value_prob) @ np.arange(2**tables.num_qubits)]
+
+    def values(self, depth, deadline=None) -> np.ndarray:
+        """
+        Gets the expected final value of every state when its owner plays depth more turns,
+        computing the missing depths. Each depth costs a few vectorized operations over all the
+        states and is computed once.
+
+        Args:
+            depth (int): The number of turns.
+            deadline (float | None): time.perf_counter() time after which no new depth is
+                computed; the deepest computed values are returned instead.
+
+        Returns:
+            np.ndarray: The value of each state.
+        """
+        while len(self.levels) <= depth:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            keep = self.levels[-1]
+            best = np.minimum(keep, self.after(keep))
+            self.levels.append((1 - self.offer_prob) * keep + self.offer_prob * (self.probabilities @ best))
+
+        return self.levels[min(depth, len(self.levels) - 1)]
+
+    def after(self, values, states=None) -> np.ndarray:
+        """
+        Computes the expected value after playing each card, over the measurement outcomes.
+
+        Args:
+            values (np.ndarray): The value of each state.
+            states (np.ndarray | None): The states the cards are played on. Defaults to all states.
+
+        Returns:
+            np.ndarray: (cards, states) expected value after each card.
+        """
+        if states is None:
+            return (values[self.next_states] * self.next_probs).sum(axis=-1)
+        return (values[self.next_states[:, states]] * self.next_probs[:, states]).sum(axis=-1)
+
+    def index(self, card) -> int:
+        """
+        Finds the index of a card.
+
+        Args:
+            card (Card): The card.
+
+        Returns:
+            int: The index of the card in cards.
+        """
+        return self.card_index[card.type, _card_key(card)]
+
+    def turn_gain(self, states) -> float:
+        """
+        Computes the expected decrease of the value of a hand during the last turn of its owner,
+        by exact expectation over the pair of drawn cards.
+
+        Args:
+            states (list[int]): The states of the slots of the hand.
+
+        Returns:
+            float: The expected decrease of the sum of the values of the slots.
+        """
+        values = self.levels[0]
+        gains = values[states][None, :] - self.after(values, states)
+        # Best gain of each card, 0 when it is discarded
+        best = np.maximum(gains.max(axis=1), 0)
+        return float(self.probabilities @ np.maximum(best[:, None], best[None, :]) @ self.probabilities)
+
+
+# Depths computed when the transposition table is built, the horizon of ExpectimaxPolicy
+WARM_DEPTH = 2
+
+
+@lru_cache(maxsize=8)
+def _slot_values(signature, offer_prob) -> SlotValues:
+    slot_values = SlotValues(get_tables(), *card_distribution(), offer_prob)
+    # The first decision of a policy would otherwise build the index of the states and the first
+    # depths, several times its time budget
+    slot_values.tables.state_index(slot_values.tables.amplitudes[0])
+    slot_values.values(WARM_DEPTH)
+    return slot_values
+
+
+def get_slot_values(offer_prob=0.5) -> SlotValues:
+    """
+    Gets the transposition table for the card probabilities of parameters.py. The tables are
+    shared by all the policies of a process, and rebuilt when the probabilities change. The
+    depths up to WARM_DEPTH are computed when the table is built.
+
+    Args:
+        offer_prob (float): Probability that a slot is offered a card in a turn of its owner.
+
+    Returns:
+        SlotValues: The transposition table.
+    """
+    signature = (param.num_qubits, param.state_prob, param.measurement_prob, param.entangle_prob,
+                 param.single_qubit_prob, param.one_single_qubit_ratio, repr(param.gate_prob))
+    return _slot_values(signature, offer_prob)
+
+
+def state_id(slot) -> int | None:
+    """
+    Computes the canonical encoding of the state of a slot: its index in the transition tables.
+
+    Args:
+        slot (PlayerSlot): The slot.
+
+    Returns:
+        int | None: The index of the state in the tables, or None if the tables do not describe
+        it: an entangled slot, or a noisy slot (see noise_backend.py).
+    """
+    if isinstance(slot.backend, TableBackend):
+        return slot.backend.state
+    # The noise of the trajectories leads to states the tables do not describe
+    if slot.entangled or not slot.backend.pure or getattr(slot.backend, "noisy", False):
+        return None
+
+    # A state loaded with set_statevector may not be reachable with the cards
+    try:
+        return get_tables().state_index(slot.backend.statevector)
+    except ValueError:
+        return None
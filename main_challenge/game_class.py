@@ -1,12 +1,37 @@
+import random
+
+import numpy as np
+import parameters as param
 from player_class import Player
+from player_slot_class import load_backend, qubit_marginals
 from card_generator import *
+from deck import Deck
+from registers import RegisterManager, check_backend
 
 
 class QDutch:
-    def __init__(self):
+    def __init__(self, seed=None, history=True):
+        """
+        Initializes the game.
+
+        Args:
+            seed (int | None): Seed of the card draws and of the measurements. If None, the game is
+                not reproducible.
+            history (bool): Whether to keep the undo and redo stacks (see undo).
+        """
         self.players = None
         self.dutch_player = None
         self.active_player = None
+        self.turn = 0
+        self.rng = random.Random(seed)
+        self.slot_rng = np.random.default_rng(seed)
+        self.deck = None
+        self.registers = None
+        self.history = history
+        # Each entry holds the game attributes and the slots touched by one action, before it
+        # (undo stack) or after it (redo stack). The untouched slots are not copied.
+        self.undo_stack = []
+        self.redo_stack = []
 
     def start_game(self, nb_players=4):
         """
@@ -15,10 +40,19 @@ class QDutch:
         Args:
             nb_players (int): The number of players in the game.
         """
+        if param.entangle_prob > 0:
+            # The deck has Entangle cards, see registers.py
+            check_backend(load_backend(param.backend))
+
         self.end_game_flag = False
         self.dutch_player = None
         self.active_player = 0
-        self.players = [Player(f"Player {i + 1}") for i in range(nb_players)]
+        self.turn = 0
+        self.deck = Deck(self.slot_rng)
+        self.registers = RegisterManager()
+        self.players = [Player(f"Player {i + 1}", self.rng, self.slot_rng) for i in range(nb_players)]
+        self.undo_stack.clear()
+        self.redo_stack.clear()
     
     def init_routine(self):
         """
@@ -26,7 +60,7 @@ class QDutch:
         """
         for player in self.players:
             for card in player.hand:
-                card.set_state(generate_state())
+                card.set_state(generate_state(self.rng))
 
     def end_routine(self):
         pass
@@ -41,14 +75,15 @@ class QDutch:
         return self.active_player == self.dutch_player or self.end_game_flag
 
     def call_dutch(self):
+        self._record()
         self.dutch_player = self.active_player
 
     def draw_cards(self):
         """
         Draw 2 cards from the deck.
         """
-        card1 = generate_card()
-        card2 = generate_card()
+        card1 = self.deck.draw_card()
+        card2 = self.deck.draw_card()
 
         return card1, card2
     
@@ -67,7 +102,9 @@ class QDutch:
         # Check the operator type
         if operator.type not in ["Operator", "Measurement"]:
             raise ValueError(f"The card to apply can only be an Operator or Measurement card. Got {operator.type}.")
-        
+
+        self._record((player_no, card_no))
+
         # Apply the operator card
         if operator.type == "Measurement":
             return self.players[player_no].hand[card_no].measure(operator.data)
@@ -86,14 +123,106 @@ class QDutch:
         """
         if card.type != "State":
             raise ValueError(f"The card to change can only be a State card. Got {card.type}.")
-        
+
+        self._record((self.active_player, card_no))
         self.players[self.active_player].hand[card_no].set_state(card.data)
     
+    def apply_entangle_card(self, player_no, card_no, other_player_no, other_card_no, card):
+        """
+        Allows a player to entangle two cards of the table, which can belong to different players.
+
+        Args:
+            player_no (int): The index of the player of the first card.
+            card_no (int): The index of the first card.
+            other_player_no (int): The index of the player of the second card.
+            other_card_no (int): The index of the second card.
+            card (Card): The Entangle card, see RegisterManager.entangle.
+        """
+        if card.type != "Entangle":
+            raise ValueError(f"The card to apply can only be an Entangle card. Got {card.type}.")
+
+        slot = self.players[player_no].hand[card_no]
+        other_slot = self.players[other_player_no].hand[other_card_no]
+        self.registers.check(slot, other_slot)
+
+        self._record((player_no, card_no), (other_player_no, other_card_no))
+        self.registers.entangle(slot, other_slot, card.data)
+        slot.last_measure = None
+        other_slot.last_measure = None
+
     def next_player(self):
         """
-        Moves to the next player in the game.
+        Moves to the next player in the game. A turn ends when every player has played.
         """
+        self._record()
         self.active_player = (self.active_player + 1) % len(self.players)
+        if self.active_player == 0:
+            self.turn += 1
+
+    def _game_state(self):
+        return self.active_player, self.dutch_player, self.turn, self.end_game_flag, self.deck.snapshot()
+
+    def _save(self, slots):
+        return self._game_state(), {(i, j): self.players[i].hand[j].snapshot() for i, j in slots}
+
+    def _entangled(self, slots):
+        # An action on an entangled slot also changes the slots of its cluster
+        if not any(self.players[i].hand[j].entangled for i, j in slots):
+            return slots
+
+        positions = {id(slot): (i, j) for i, player in enumerate(self.players) for j, slot in enumerate(player.hand)}
+        return list(dict.fromkeys(
+            positions[id(slot)] for i, j in slots for slot in self.registers.entangled_slots(self.players[i].hand[j])
+        ))
+
+    def _load(self, entry):
+        game_state, slots = entry
+        self.active_player, self.dutch_player, self.turn, self.end_game_flag, deck_state = game_state
+        self.deck.restore(deck_state)
+        for (i, j), state in slots.items():
+            self.players[i].hand[j].restore(state)
+
+    def _record(self, *slots):
+        """
+        Saves the state before an action on the undo stack: the game attributes and the slots
+        touched by the action, with the slots they are entangled with.
+        """
+        if self.history:
+            self.undo_stack.append(self._save(self._entangled(slots)))
+            self.redo_stack.clear()
+
+    def undo(self):
+        """
+        Cancels the last action (a card applied, "Dutch" called or the move to the next player).
+        Only the slots touched by the action are restored and nothing is simulated again, so the
+        cost does not depend on the length of the game. The measurements are drawn again when the
+        action is played again.
+
+        Returns:
+            bool: False if there was no action to cancel.
+        """
+        if not self.undo_stack:
+            return False
+
+        entry = self.undo_stack.pop()
+        self.redo_stack.append(self._save(entry[1]))
+        self._load(entry)
+        return True
+
+    def redo(self):
+        """
+        Plays again the last action cancelled by undo, with the same result.
+
+        Returns:
+            bool: False if there was no action to play again.
+        """
+        if not self.redo_stack:
+            return False
+
+        entry = self.redo_stack.pop()
+        self.undo_stack.append(self._save(entry[1]))
+        self._load(entry)
+        return True
 
     def get_ranking(self):
         """
@@ -108,6 +237,9 @@ class QDutch:
         3. The player with the smallest card is ranked first.
         4. In case of a tie, both players are ranked equally.
 
+        Each card is measured exactly once and the measured values are used both for the ranking
+        and for the displayed points.
+
         Returns:
             list[list]: A list of players sorted by their scores in descending order.
         """
@@ -144,6 +276,113 @@ class QDutch:
             points -= 0.5
 
         # The player with the smallest card wins in case of a tie
-        points += 0.01 * min([card.measure_all() for card in player.hand])
+        points += 0.01 * min([card.reveal() for card in player.hand])
 
         return points
+
+    def value_probabilities(self, player_no, card_no):
+        """
+        Computes the exact distribution of the value of a card, without measuring it.
+
+        Args:
+            player_no (int): The index of the player.
+            card_no (int): The index of the card in the hand of the player.
+
+        Returns:
+            np.ndarray: The probability of each of the 2**num_qubits values.
+        """
+        return self.players[player_no].hand[card_no].probabilities()
+
+    def qubit_probabilities(self, player_no, card_no):
+        """
+        Computes the exact probability of each outcome of a Measurement card on a card, without
+        measuring it.
+
+        Args:
+            player_no (int): The index of the player.
+            card_no (int): The index of the card in the hand of the player.
+
+        Returns:
+            np.ndarray: The probability of each qubit of the card to be measured as 1.
+        """
+        return self.players[player_no].hand[card_no].qubit_probabilities()
+
+    def all_value_probabilities(self):
+        """
+        Computes the exact distribution of the value of every card of the table.
+
+        Returns:
+            np.ndarray: (players, 4, 2**num_qubits) probability of each value of each card.
+        """
+        return np.array([[slot.probabilities() for slot in player.hand] for player in self.players])
+
+    def all_qubit_probabilities(self):
+        """
+        Computes the exact probability of measuring 1 on every qubit of every card of the table,
+        with one vectorized reduction over all the cards.
+
+        Returns:
+            np.ndarray: (players, 4, num_qubits) probability of each qubit to be measured as 1.
+        """
+        probabilities = self.all_value_probabilities()
+        return qubit_marginals(probabilities, probabilities.shape[-1].bit_length() - 1)
+
+    def expected_scores(self):
+        """
+        Computes the exact expected points of each player, without measuring any card. The
+        points are a sum of cards, so the expectation stays exact when cards are entangled (see
+        registers.py).
+
+        Returns:
+            list[float]: The expected points of each player.
+        """
+        return [player.expected_points() for player in self.players]
+
+    def score_distributions(self):
+        """
+        Computes the distribution of the points of each player, without measuring any card. The
+        cards are assumed independent: the distribution is exact unless cards of a hand are
+        entangled (see registers.py), which are counted with their marginal distributions.
+
+        Returns:
+            list[np.ndarray]: The probability of each number of points, for each player.
+        """
+        return [player.points_distribution() for player in self.players]
+
+    def win_probabilities(self):
+        """
+        Computes the probability of each player to be ranked first by get_ranking, without
+        measuring any card. Players tied for the first place are all ranked first. It needs the
+        joint distributions of Player.hand_distribution, so the cards are limited to about 11
+        qubits. The cards are assumed independent: the probabilities are exact unless some cards
+        are entangled (see registers.py), which are counted with their marginal distributions and
+        without the correlations between their values.
+
+        Returns:
+            list[float]: The probability of each player to be ranked first.
+        """
+        # Distribution of the score of get_score for each player
+        scores = []
+        for i, player in enumerate(self.players):
+            joint = player.hand_distribution()
+            points, smallest = np.indices(joint.shape)
+            score = points + 0.01 * smallest - 0.5 * (self.dutch_player == i)
+            scores.append((score.ravel(), joint.ravel()))
+
+        # Probability of a score larger or equal to each score, by binary search in the sorted scores
+        tails = []
+        for score, prob in scores:
+            order = np.argsort(score)
+            tail = np.append(np.cumsum(prob[order][::-1])[::-1], 0)
+            tails.append((score[order], tail))
+
+        win_probabilities = []
+        for i, (score, prob) in enumerate(scores):
+            # Probability that every other player has a larger or equal score
+            not_beaten = np.ones_like(prob)
+            for j, (other_score, tail) in enumerate(tails):
+                if j != i:
+                    not_beaten *= tail[np.searchsorted(other_score, score - 1e-9)]
+            win_probabilities.append(float(prob @ not_beaten))
+
+        return win_probabilities
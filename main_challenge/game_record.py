@@ -0,0 +1,324 @@
+"""
+Binary snapshots and action logs of QDutch games.
+
+Snapshots
+    A snapshot stores the state of a game in a NumPy structured record: the amplitudes of every
+    card as complex64, the active player, the player that called "Dutch" (-1 if nobody did) and
+    the turn counter. Arrays of snapshots are saved as .npy files, which can be memory-mapped and
+    scanned without building any Python object:
+        snapshots = load_snapshots("games.npy")
+        mean_turns = snapshots["turn"].mean()
+    A snapshot does not contain the state of the random generators, a restored game continues
+    with new random draws. The slots entangled by an Entangle card have no amplitudes of their
+    own (see registers.py), so a game with entangled slots cannot be snapshotted; its action log
+    can still be replayed.
+
+Action logs
+    An action log is an append-only binary file of fixed-size ACTION_DTYPE records. Each game
+    starts with a START record holding its seed, followed by one record per action, undo and redo
+    included. A game only depends on its seed and on its actions, so replaying the records
+    reproduces it exactly, measurement results included. This holds as long as the random generators of the game are
+    only used by its actions (the policies may use game.rng, which the game does not use after
+    init_routine).
+"""
+import struct
+
+import numpy as np
+import parameters as param
+from game_class import QDutch
+from player_slot_class import load_backend
+
+
+# Operations of the action log
+START, INIT, DRAW, OPERATOR, STATE, DUTCH, NEXT, ENTANGLE, UNDO, REDO = range(10)
+
+# value is the seed of a START record, the measurement result of an OPERATOR record (-1 if the
+# card is not a Measurement card) and other_player_no * 256 + other_card_no for the second card of
+# an ENTANGLE record. card is the index of the played card among the drawn cards.
+ACTION_DTYPE = np.dtype([
+    ("op", "u1"),
+    ("player_no", "i1"),
+    ("card_no", "i1"),
+    ("card", "i1"),
+    ("value", "<i8"),
+])
+_RECORD = struct.Struct("<Bbbbq")
+
+
+def snapshot_dtype(nb_players=4, hand_size=4, num_qubits=None) -> np.dtype:
+    """
+    Builds the structured type of the snapshots.
+
+    Args:
+        nb_players (int): The number of players.
+        hand_size (int): The number of cards of each player.
+        num_qubits (int | None): The number of qubits of a card. Defaults to parameters.num_qubits.
+
+    Returns:
+        np.dtype: The type of a snapshot.
+    """
+    num_qubits = param.num_qubits if num_qubits is None else num_qubits
+    return np.dtype([
+        ("active_player", "i1"),
+        ("dutch_player", "i1"),
+        ("turn", "<i4"),
+        ("amplitudes", "<c8", (nb_players, hand_size, 2**num_qubits)),
+    ])
+
+
+def snapshot(game) -> np.ndarray:
+    """
+    Takes a snapshot of a game. Raises a ValueError if some slots are entangled.
+
+    Args:
+        game (QDutch): The game.
+
+    Returns:
+        np.ndarray: The snapshot, a 0-dimensional structured array.
+    """
+    if any(slot.entangled for player in game.players for slot in player.hand):
+        raise ValueError("The game has entangled slots, they have no amplitudes of their own to snapshot.")
+
+    hand_size = len(game.players[0].hand)
+    record = np.zeros((), dtype=snapshot_dtype(len(game.players), hand_size))
+    record["active_player"] = game.active_player
+    record["dutch_player"] = -1 if game.dutch_player is None else game.dutch_player
+    record["turn"] = game.turn
+    for i, player in enumerate(game.players):
+        for j, slot in enumerate(player.hand):
+            record["amplitudes"][i, j] = slot.backend.statevector
+
+    return record
+
+
+def restore(record, seed=None) -> QDutch:
+    """
+    Builds a game in the state of a snapshot. The player slots need a backend that can be set
+    from amplitudes (see parameters.backend).
+
+    Args:
+        record (np.ndarray): The snapshot.
+        seed (int | None): Seed of the random draws of the restored game.
+
+    Returns:
+        QDutch: The restored game.
+    """
+    if not load_backend(param.backend).settable:
+        raise ValueError(f"The {param.backend} backend cannot be set from amplitudes, use the numpy, aer or table backend.")
+
+    amplitudes = record["amplitudes"]
+    game = QDutch(seed)
+    game.start_game(amplitudes.shape[0])
+
+    game.active_player = int(record["active_player"])
+    game.dutch_player = None if record["dutch_player"] < 0 else int(record["dutch_player"])
+    game.turn = int(record["turn"])
+    for i, player in enumerate(game.players):
+        for j, slot in enumerate(player.hand):
+            slot.set_statevector(amplitudes[i, j])
+
+    return game
+
+
+def save_snapshots(path, snapshots) -> None:
+    """
+    Saves snapshots in a .npy file.
+
+    Args:
+        path (str): The output file.
+        snapshots (list[np.ndarray] | np.ndarray): The snapshots.
+    """
+    np.save(path, np.stack(snapshots) if isinstance(snapshots, list) else snapshots)
+
+
+def create_snapshot_file(path, num_games, nb_players=4, hand_size=4) -> np.ndarray:
+    """
+    Creates a .npy file of snapshots filled in place, e.g. by a batch of simulated games:
+        snapshots = create_snapshot_file("games.npy", len(games))
+        for i, game in enumerate(games):
+            snapshots[i] = snapshot(game)
+        snapshots.flush()
+
+    Args:
+        path (str): The output file.
+        num_games (int): The number of snapshots.
+        nb_players (int): The number of players.
+        hand_size (int): The number of cards of each player.
+
+    Returns:
+        np.memmap: The writable snapshots.
+    """
+    return np.lib.format.open_memmap(path, mode="w+", dtype=snapshot_dtype(nb_players, hand_size), shape=(num_games,))
+
+
+def load_snapshots(path, mmap=True) -> np.ndarray:
+    """
+    Loads snapshots saved in a .npy file.
+
+    Args:
+        path (str): The file.
+        mmap (bool): Whether to memory-map the file instead of reading it.
+
+    Returns:
+        np.ndarray: The snapshots.
+    """
+    return np.load(path, mmap_mode="r" if mmap else None)
+
+
+class ActionLog:
+    """
+    Append-only binary file of actions.
+    """
+    def __init__(self, path):
+        """
+        Opens an action log, keeping the records already written.
+
+        Args:
+            path (str): The file of the log.
+        """
+        self.file = open(path, "ab")
+
+    def append(self, op, player_no=-1, card_no=-1, card=-1, value=-1) -> None:
+        """
+        Appends a record (see ACTION_DTYPE).
+        """
+        self.file.write(_RECORD.pack(op, player_no, card_no, card, value))
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_log(path, mmap=True) -> np.ndarray:
+    """
+    Reads the records of an action log.
+
+    Args:
+        path (str): The file of the log.
+        mmap (bool): Whether to memory-map the file instead of reading it.
+
+    Returns:
+        np.ndarray: The ACTION_DTYPE records.
+    """
+    if mmap:
+        return np.memmap(path, dtype=ACTION_DTYPE, mode="r")
+    return np.fromfile(path, dtype=ACTION_DTYPE)
+
+
+class RecordedGame:
+    """
+    A QDutch game whose actions are appended to an action log. The other attributes of the game,
+    e.g. players or expected_scores, are read through the wrapper, so it can be played like a
+    QDutch game. The methods changing the game are all logged, undo and redo included.
+    """
+    def __init__(self, log, seed):
+        """
+        Creates the game.
+
+        Args:
+            log (ActionLog): The log of the game.
+            seed (int): Seed of the game, needed to replay it.
+        """
+        self.game = QDutch(seed)
+        self.log = log
+        self.seed = seed
+        self.cards = None
+
+    def __getattr__(self, name):
+        return getattr(self.game, name)
+
+    def start_game(self, nb_players=4):
+        self.game.start_game(nb_players)
+        self.log.append(START, player_no=nb_players, value=self.seed)
+
+    def init_routine(self):
+        self.game.init_routine()
+        self.log.append(INIT)
+
+    def call_dutch(self):
+        self.game.call_dutch()
+        self.log.append(DUTCH)
+
+    def draw_cards(self):
+        self.cards = self.game.draw_cards()
+        self.log.append(DRAW)
+        return self.cards
+
+    def apply_operator_card(self, player_no, card_no, operator):
+        result = self.game.apply_operator_card(player_no, card_no, operator)
+        self.log.append(OPERATOR, player_no, card_no, self.cards.index(operator), -1 if result is None else result)
+        return result
+
+    def apply_state_card(self, card_no, card):
+        self.game.apply_state_card(card_no, card)
+        self.log.append(STATE, card_no=card_no, card=self.cards.index(card))
+
+    def apply_entangle_card(self, player_no, card_no, other_player_no, other_card_no, card):
+        self.game.apply_entangle_card(player_no, card_no, other_player_no, other_card_no, card)
+        self.log.append(ENTANGLE, player_no, card_no, self.cards.index(card), other_player_no * 256 + other_card_no)
+
+    def next_player(self):
+        self.game.next_player()
+        self.log.append(NEXT)
+
+    def undo(self):
+        # Nothing is logged when there is no action to cancel
+        if not self.game.undo():
+            return False
+        self.log.append(UNDO)
+        return True
+
+    def redo(self):
+        if not self.game.redo():
+            return False
+        self.log.append(REDO)
+        return True
+
+
+def replay(records):
+    """
+    Replays the games of an action log.
+
+    Args:
+        records (np.ndarray): The ACTION_DTYPE records, e.g. from read_log.
+
+    Yields:
+        QDutch: Each game of the log, in its final state.
+    """
+    game, cards = None, None
+    for op, player_no, card_no, card, value in records.tolist():
+        if op == START:
+            if game is not None:
+                yield game
+            game = QDutch(value)
+            game.start_game(player_no)
+        elif op == INIT:
+            game.init_routine()
+        elif op == DRAW:
+            cards = game.draw_cards()
+        elif op == OPERATOR:
+            result = game.apply_operator_card(player_no, card_no, cards[card])
+            if (-1 if result is None else result) != value:
+                raise ValueError(f"The replay diverged from the log: measured {result} instead of {value}.")
+        elif op == STATE:
+            game.apply_state_card(card_no, cards[card])
+        elif op == DUTCH:
+            game.call_dutch()
+        elif op == NEXT:
+            game.next_player()
+        elif op == ENTANGLE:
+            game.apply_entangle_card(player_no, card_no, value // 256, value % 256, cards[card])
+        elif op == UNDO:
+            game.undo()
+        elif op == REDO:
+            game.redo()
+        else:
+            raise ValueError(f"Unknown operation {op} in the action log.")
+
+    if game is not None:
+        yield game
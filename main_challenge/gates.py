@@ -0,0 +1,33 @@
+"""
+Translation of operator cards into elementary quantum gates.
+"""
+
+
+def parse_operator(operator: list[str]) -> list[tuple[str, tuple[int, ...]]]:
+    """
+    Converts an operator card into the sequence of gates it applies.
+
+    Args:
+        operator (list[str]): The quantum operator, one gate name per qubit.
+
+    Returns:
+        list[tuple[str, tuple[int, ...]]]: The gates to apply, as (gate name, qubits) pairs.
+    """
+    # CNOT gate
+    if "C" in operator:
+        return [("cx", (operator.index("C"), operator.index("X")))]
+
+    # H followed by a CNOT gate
+    if "HC" in operator:
+        qubit1 = operator.index("HC")
+        qubit2 = operator.index("X")
+        return [("h", (qubit1,)), ("cx", (qubit1, qubit2))]
+
+    # SWAP gate
+    if "SWAP" in operator:
+        qubit1 = operator.index("SWAP")
+        qubit2 = operator[qubit1+1:].index("SWAP") + qubit1 + 1
+        return [("swap", (qubit1, qubit2))]
+
+    # Single qubit gates
+    return [(gate_name.lower(), (i,)) for i, gate_name in enumerate(operator) if gate_name != "I"]
@@ -0,0 +1,416 @@
+"""
+Headless QDutch simulator.
+
+Plays complete games without the pygame interface, with one policy object deciding the moves of
+each player, and spreads batches of games over a process pool. Each chunk of games gets its own
+seed sequence, so the results only depend on the seed and not on the number of workers.
+
+Usage:
+    python headless.py --games 10000 --workers 8 --policies random greedy --out results.jsonl
+    python headless.py --games 1000 --metrics metrics.prom
+"""
+import abc
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import NamedTuple
+
+import instrumentation
+import numpy as np
+from expectimax import get_slot_values, state_id
+from game_class import QDutch
+from game_record import RecordedGame
+
+
+class Action(NamedTuple):
+    card_no: int    # Index of the played card among the two drawn cards
+    player_no: int  # Index of the targeted player
+    slot_no: int    # Index of the targeted card in the hand of the player
+    # Second card linked by an Entangle card
+    other_player_no: int = -1
+    other_slot_no: int = -1
+
+
+class Policy(abc.ABC):
+    """
+    Decides the moves of one player. Policies should draw their random numbers from game.rng so
+    that the games stay reproducible.
+    """
+    def call_dutch(self, game, player_no) -> bool:
+        """
+        Decides whether the player calls "Dutch" at the beginning of its turn.
+
+        Args:
+            game (QDutch): The game.
+            player_no (int): The index of the player.
+
+        Returns:
+            bool: True to call "Dutch".
+        """
+        return False
+
+    @abc.abstractmethod
+    def choose_action(self, game, player_no, cards) -> Action | None:
+        """
+        Decides which of the two drawn cards is played, and on which card of the table.
+
+        Args:
+            game (QDutch): The game.
+            player_no (int): The index of the player.
+            cards (tuple[Card, Card]): The drawn cards.
+
+        Returns:
+            Action | None: The move, or None to discard both cards.
+        """
+
+
+class RandomPolicy(Policy):
+    """
+    Plays a random legal move and calls "Dutch" with a fixed probability.
+    """
+    def __init__(self, dutch_prob=0.05):
+        self.dutch_prob = dutch_prob
+
+    def call_dutch(self, game, player_no):
+        return game.rng.random() < self.dutch_prob
+
+    def choose_action(self, game, player_no, cards):
+        card_no = game.rng.randrange(len(cards))
+        # State cards can only replace one of the cards of the player
+        if cards[card_no].type == "State":
+            target = player_no
+        else:
+            target = game.rng.randrange(len(game.players))
+        slot_no = game.rng.randrange(len(game.players[target].hand))
+
+        if cards[card_no].type == "Entangle":
+            # Any other card of the table
+            slots = [(i, j) for i, player in enumerate(game.players) for j in range(len(player.hand))
+                     if (i, j) != (target, slot_no)]
+            return Action(card_no, target, slot_no, *game.rng.choice(slots))
+        return Action(card_no, target, slot_no)
+
+
+class GreedyPolicy(Policy):
+    """
+    Plays the move that lowers the expected value of its hand the most, or raises the expected
+    value of an opponent's hand. Calls "Dutch" when its expected score is the lowest of the table
+    by a margin. Entangle cards and entangled slots are left aside.
+    """
+    def __init__(self, margin=2.0):
+        self.margin = margin
+
+    def call_dutch(self, game, player_no):
+        scores = game.expected_scores()
+        # Alone at the table, the player ends the game at once, like ExpectimaxPolicy
+        best_opponent = min((score for i, score in enumerate(scores) if i != player_no), default=float("inf"))
+        return scores[player_no] + self.margin < best_opponent
+
+    def choose_action(self, game, player_no, cards):
+        best_gain, best_action = 0, None
+        for card_no, card in enumerate(cards):
+            if card.type in ("Measurement", "Entangle"):
+                continue
+
+            for target, player in enumerate(game.players):
+                if card.type == "State" and target != player_no:
+                    continue
+                # Lowering our own hand and raising an opponent's hand are both gains
+                sign = 1 if target == player_no else -1 / (len(game.players) - 1)
+
+                for slot_no, slot in enumerate(player.hand):
+                    if slot.entangled:
+                        continue
+                    before = slot.expected_value()
+                    if card.type == "State":
+                        after = card.data
+                    elif getattr(slot.backend, "noisy", False) and slot.backend.pure:
+                        # Trying the card on a trajectory would sample its noise: the expected
+                        # value of the noisy slot is computed on a density matrix instead
+                        from noise_backend import DensityMatrixBackend
+
+                        trial = DensityMatrixBackend(slot.backend.num_qubits)
+                        trial.set_statevector(slot.backend.statevector)
+                        trial.apply_operator(card.data)
+                        probabilities = trial.probabilities()
+                        after = float(probabilities @ np.arange(len(probabilities)))
+                    else:
+                        # Tried in place and restored: the snapshots share the state of the
+                        # large cards (see tensor_backend.py) instead of copying it
+                        state = slot.backend.snapshot()
+                        slot.backend.apply_operator(card.data)
+                        after = slot.expected_value()
+                        slot.backend.restore(state)
+
+                    gain = sign * (before - after)
+                    if gain > best_gain:
+                        best_gain, best_action = gain, Action(card_no, target, slot_no)
+
+        return best_action
+
+
+def remaining_turns(game, horizon) -> list[int]:
+    """
+    Counts the turns each player still plays after the turn of the active player.
+
+    Args:
+        game (QDutch): The game.
+        horizon (int): The number of turns counted when nobody called "Dutch".
+
+    Returns:
+        list[int]: The number of turns of each player.
+    """
+    nb_players = len(game.players)
+    if game.dutch_player is None:
+        return [horizon] * nb_players
+
+    # The players between the active player and the one that called "Dutch" play once more
+    turns = [0] * nb_players
+    player_no = (game.active_player + 1) % nb_players
+    while player_no != game.dutch_player:
+        turns[player_no] = 1
+        player_no = (player_no + 1) % nb_players
+    return turns
+
+
+class ExpectimaxPolicy(Policy):
+    """
+    Plays the move with the best expectimax value, see expectimax.py. Every move (each drawn
+    card on each slot of the table, or discarding both cards) is evaluated exactly over the
+    measurement outcomes, and the resulting slots are valued by the transposition table with the
+    number of turns their owner still plays. Calls "Dutch" when its expected points are lower
+    than the expected points of every opponent after its last turn, by a margin. Entangle cards
+    and the slots the transition tables do not describe (entangled or noisy slots) are left
+    aside: these slots count for their expected value.
+    """
+    def __init__(self, horizon=2, margin=1.0, time_budget=0.01, offer_prob=0.5):
+        """
+        Args:
+            horizon (int): The number of future turns searched when nobody called "Dutch".
+            margin (float): Margin of points required to call "Dutch".
+            time_budget (float): Time in seconds after which no deeper values are computed. It is
+                checked between two depths, and the depths up to expectimax.WARM_DEPTH are
+                computed when the policy is created, so a decision with the default horizon
+                only makes lookups.
+            offer_prob (float): Probability that a slot is offered a card in a turn of its owner.
+        """
+        self.horizon = horizon
+        self.margin = margin
+        self.time_budget = time_budget
+        self.values = get_slot_values(offer_prob)
+
+    def call_dutch(self, game, player_no):
+        def expected_points(player):
+            ids = [state_id(slot) for slot in player.hand]
+            states = [state for state in ids if state is not None]
+            points = self.values.values(0)[states].sum() + sum(
+                slot.expected_value() for slot, state in zip(player.hand, ids) if state is None)
+            return points, states
+
+        own, _ = expected_points(game.players[player_no])
+        for i, player in enumerate(game.players):
+            if i != player_no:
+                points, states = expected_points(player)
+                if own + self.margin >= points - (self.values.turn_gain(states) if states else 0):
+                    return False
+        return True
+
+    def choose_action(self, game, player_no, cards):
+        deadline = time.perf_counter() + self.time_budget
+        turns = remaining_turns(game, self.horizon)
+        weights = [1 if i == player_no else -1 / (len(game.players) - 1) for i in range(len(game.players))]
+
+        best_gain, best_action = 0, None
+        for target, player in enumerate(game.players):
+            ids = [state_id(slot) for slot in player.hand]
+            slot_nos = [slot_no for slot_no, state in enumerate(ids) if state is not None]
+            if not slot_nos:
+                continue
+            values = self.values.values(turns[target], deadline)
+            states = np.array([ids[slot_no] for slot_no in slot_nos])
+            after = self.values.after(values, states)
+
+            for card_no, card in enumerate(cards):
+                if card.type == "Entangle" or card.type == "State" and target != player_no:
+                    continue
+                # Lowering our own slots and raising the slots of the opponents are both gains
+                gains = weights[target] * (values[states] - after[self.values.index(card)])
+                best = int(np.argmax(gains))
+                if gains[best] > best_gain + 1e-9:
+                    best_gain, best_action = gains[best], Action(card_no, target, slot_nos[best])
+
+        return best_action
+
+
+# Policies available from the command line
+POLICIES = {
+    "random": RandomPolicy,
+    "greedy": GreedyPolicy,
+    "expectimax": ExpectimaxPolicy,
+}
+
+
+def play_turn(game, policy) -> Action | bool | None:
+    """
+    Plays the turn of the active player and moves to the next player.
+
+    Args:
+        game (QDutch): The game.
+        policy (Policy): The policy of the active player.
+
+    Returns:
+        Action | bool | None: True if the player called "Dutch", otherwise the played move, or
+        None if both cards were discarded.
+    """
+    player_no = game.active_player
+    if game.dutch_player is None and policy.call_dutch(game, player_no):
+        game.call_dutch()
+        game.next_player()
+        return True
+
+    cards = game.draw_cards()
+    action = policy.choose_action(game, player_no, cards)
+    if action is not None:
+        card = cards[action.card_no]
+        if card.type == "State":
+            game.apply_state_card(action.slot_no, card)
+        elif card.type == "Entangle":
+            game.apply_entangle_card(action.player_no, action.slot_no, action.other_player_no, action.other_slot_no, card)
+        else:
+            game.apply_operator_card(action.player_no, action.slot_no, card)
+
+    game.next_player()
+    return action
+
+
+def play_game(policies, seed=None, max_turns=50, log=None) -> dict:
+    """
+    Plays a complete game.
+
+    Args:
+        policies (list[Policy]): The policy of each player.
+        seed (int | None): Seed of the game.
+        max_turns (int): Number of turns after which the game ends even if nobody called "Dutch".
+        log (game_record.ActionLog | None): Log the actions of the game are appended to. The
+            game needs a seed to be logged.
+
+    Returns:
+        dict: The result of the game.
+    """
+    if log is None:
+        # Simulated games are never undone
+        game = QDutch(seed, history=False)
+    elif seed is None:
+        raise ValueError("A game needs a seed to be logged.")
+    else:
+        game = RecordedGame(log, seed)
+    game.start_game(len(policies))
+    game.init_routine()
+
+    while not game.check_end_game() and game.turn < max_turns:
+        play_turn(game, policies[game.active_player])
+
+    ranking = game.get_ranking()
+    names = [player.name for player in game.players]
+    scores = [None] * len(names)
+    ranks = [None] * len(names)
+    for name, score, rank in ranking:
+        scores[names.index(name)] = score
+        ranks[names.index(name)] = rank
+
+    return {
+        "seed": seed,
+        "turns": game.turn,
+        "dutch_player": game.dutch_player,
+        "ranking": ranking,
+        "scores": scores,
+        "ranks": ranks,
+    }
+
+
+def play_chunk(policy_names, seed_sequence, first_game, num_games, max_turns=50) -> list[dict]:
+    """
+    Plays a chunk of games in a worker process.
+
+    Args:
+        policy_names (list[str]): The name of the policy of each player (see POLICIES).
+        seed_sequence (np.random.SeedSequence): The seed sequence of the chunk.
+        first_game (int): The index of the first game of the chunk.
+        num_games (int): The number of games of the chunk.
+        max_turns (int): Maximal number of turns of a game.
+
+    Returns:
+        list[dict]: The results of the games.
+    """
+    seeds = np.random.default_rng(seed_sequence).integers(2**63, size=num_games)
+    results = []
+    for i, seed in enumerate(seeds):
+        policies = [POLICIES[name]() for name in policy_names]
+        result = play_game(policies, int(seed), max_turns)
+        result["game"] = first_game + i
+        result["policies"] = list(policy_names)
+        results.append(result)
+
+    return results
+
+
+def simulate(policy_names, num_games, out_path, workers=None, seed=0, chunk_size=100, max_turns=50,
+             metrics_path=None) -> None:
+    """
+    Plays games in parallel and writes their results to a JSON lines file as they finish.
+
+    Args:
+        policy_names (list[str]): The name of the policy of each player (see POLICIES).
+        num_games (int): The number of games.
+        out_path (str): The output file, one JSON object per game.
+        workers (int | None): The number of worker processes. Defaults to the number of CPUs.
+        seed (int): The root seed of the simulation.
+        chunk_size (int): The number of games played by a worker task.
+        max_turns (int): Maximal number of turns of a game.
+        metrics_path (str | None): File the metrics of the instrumentation of the workers are
+            written to (see instrumentation.save). None disables the instrumentation.
+    """
+    starts = range(0, num_games, chunk_size)
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(starts))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor, open(out_path, "w") as file:
+        futures = [
+            executor.submit(instrumentation.run_instrumented, play_chunk, policy_names, seed_sequence, start,
+                            min(chunk_size, num_games - start), max_turns)
+            if metrics_path else
+            executor.submit(play_chunk, policy_names, seed_sequence, start, min(chunk_size, num_games - start), max_turns)
+            for start, seed_sequence in zip(starts, seed_sequences)
+        ]
+        for future in as_completed(futures):
+            results = future.result()
+            if metrics_path:
+                results, metrics = results
+                instrumentation.merge(metrics)
+            for result in results:
+                file.write(json.dumps(result) + "\n")
+            file.flush()
+
+    if metrics_path:
+        instrumentation.save(metrics_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless QDutch simulator.")
+    parser.add_argument("--games", type=int, default=1000, help="Number of games to play.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes.")
+    parser.add_argument("--policies", nargs="+", default=["random"] * 4, choices=list(POLICIES),
+                        help="Policy of each player.")
+    parser.add_argument("--seed", type=int, default=0, help="Root seed of the simulation.")
+    parser.add_argument("--chunk-size", type=int, default=100, help="Number of games per worker task.")
+    parser.add_argument("--max-turns", type=int, default=50, help="Maximal number of turns of a game.")
+    parser.add_argument("--out", default="results.jsonl", help="Output JSON lines file.")
+    parser.add_argument("--metrics", help="Output file of the instrumentation metrics, .json or .prom.")
+    args = parser.parse_args()
+
+    simulate(args.policies, args.games, args.out, args.workers, args.seed, args.chunk_size, args.max_turns, args.metrics)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Opt-in instrumentation of the QDutch engine.
+
+enable() replaces the methods of QDutch, PlayerSlot, the slot backend and the Deck, and the
+functions of card_generator, by wrappers that record for each operation its number of calls, a histogram of
+its wall time and the number of memory blocks it allocated. disable() puts the original
+functions back: nothing is wrapped while the instrumentation is disabled, so it costs nothing.
+The pygame loop of qdutch.py is instrumented the same way with instrument_functions, and the
+queue depth and latency of its action worker are exported as gauges (see register_gauges).
+
+The times are inclusive: the time of QDutch.apply_operator_card contains the time of the
+PlayerSlot and backend calls it makes. The allocations are the net number of memory blocks
+allocated by the interpreter during the call (sys.getallocatedblocks), so the objects freed
+before the end of the call are not counted, and the large numpy buffers are not either.
+
+The metrics are exported as a JSON snapshot, which snapshots of other processes can be merged
+into, or in the Prometheus text format:
+
+    instrumentation.enable()
+    play_game(...)
+    instrumentation.save("metrics.json")  # or "metrics.prom"
+"""
+import functools
+import inspect
+import json
+import sys
+import threading
+import time
+
+import parameters as param
+
+
+# Upper bounds of the buckets of the wall time histograms, in seconds
+BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0, 10.0)
+
+# Statistics of each operation: calls, total seconds, allocated blocks and histogram counts
+# (one per bucket and one above the last bucket)
+_metrics = {}
+# The game actions of the interface run on a worker thread (see action_worker.py)
+_lock = threading.Lock()
+# Replaced attributes: (owner, name, original value)
+_patches = []
+# Functions returning the current values of some gauges, by prefix
+_gauges = {}
+# Gauges of the snapshots merged from other processes
+_merged_gauges = {}
+
+
+def _record(name, elapsed, blocks) -> None:
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = {"calls": 0, "seconds": 0.0, "allocated_blocks": 0,
+                                       "histogram": [0] * (len(BUCKETS) + 1)}
+        metric["calls"] += 1
+        metric["seconds"] += elapsed
+        metric["allocated_blocks"] += blocks
+        i = 0
+        while i < len(BUCKETS) and elapsed > BUCKETS[i]:
+            i += 1
+        metric["histogram"][i] += 1
+
+
+def _wrap(name, function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _record(name, time.perf_counter() - start, sys.getallocatedblocks() - blocks)
+
+    return wrapper
+
+
+def _patch(owner, attribute, value) -> None:
+    _patches.append((owner, attribute, owner.__dict__[attribute] if isinstance(owner, type) else getattr(owner, attribute)))
+    setattr(owner, attribute, value)
+
+
+def instrument_class(cls, prefix=None) -> None:
+    """
+    Instruments the public methods and properties defined by a class.
+
+    Args:
+        cls (type): The class.
+        prefix (str | None): Prefix of the names of the operations. Defaults to the class name.
+    """
+    prefix = prefix or cls.__name__
+    for attribute, value in list(vars(cls).items()):
+        if attribute.startswith("_"):
+            continue
+        if inspect.isfunction(value):
+            _patch(cls, attribute, _wrap(f"{prefix}.{attribute}", value))
+        elif isinstance(value, property) and value.fget is not None:
+            _patch(cls, attribute, property(_wrap(f"{prefix}.{attribute}", value.fget), value.fset, value.fdel, value.__doc__))
+
+
+def instrument_functions(module, names=None, prefix=None) -> None:
+    """
+    Instruments the functions of a module. The modules that imported a function by name
+    (from module import function) call the instrumented function too.
+
+    Args:
+        module (module): The module.
+        names (list[str] | None): The names of the functions. Defaults to the public functions
+            defined in the module.
+        prefix (str | None): Prefix of the names of the operations. Defaults to the module name.
+    """
+    prefix = prefix or module.__name__
+    if names is None:
+        names = [name for name, value in vars(module).items()
+                 if not name.startswith("_") and callable(value) and not isinstance(value, type)
+                 and getattr(value, "__module__", None) == module.__name__]
+
+    for name in names:
+        original = getattr(module, name)
+        wrapper = _wrap(f"{prefix}.{name}", original)
+        for other in list(sys.modules.values()):
+            if getattr(other, "__dict__", {}).get(name) is original:
+                _patch(other, name, wrapper)
+
+
+def enable() -> None:
+    """
+    Instruments QDutch, PlayerSlot, the backend of parameters.backend, the Deck the cards are
+    drawn from and card_generator. Does nothing if the instrumentation is already enabled.
+    """
+    if enabled():
+        return
+
+    import card_generator
+    from deck import Deck
+    from game_class import QDutch
+    from player_slot_class import PlayerSlot, load_backend
+
+    instrument_class(QDutch)
+    instrument_class(PlayerSlot)
+    instrument_class(load_backend(param.backend))
+    instrument_class(Deck)
+    instrument_functions(card_generator)
+
+
+def register_gauges(prefix, function) -> None:
+    """
+    Adds gauges read each time the metrics are exported, e.g. ActionWorker.stats.
+
+    Args:
+        prefix (str): Prefix of the names of the gauges.
+        function (callable): Returns the current value of each gauge, as a dict.
+    """
+    _gauges[prefix] = function
+
+
+def disable() -> None:
+    """
+    Puts back all the original functions. The recorded metrics are kept.
+    """
+    while _patches:
+        owner, attribute, original = _patches.pop()
+        setattr(owner, attribute, original)
+
+
+def enabled() -> bool:
+    """
+    Returns:
+        bool: Whether some functions are instrumented.
+    """
+    return bool(_patches)
+
+
+def reset() -> None:
+    """
+    Forgets the recorded metrics and the merged gauges.
+    """
+    with _lock:
+        _metrics.clear()
+        _merged_gauges.clear()
+
+
+def snapshot() -> dict:
+    """
+    Copies the recorded metrics.
+
+    Returns:
+        dict: The bucket bounds, the statistics of each operation and the value of each gauge.
+    """
+    gauges = {f"{prefix}.{name}": value for prefix, function in _gauges.items() for name, value in function().items()}
+    with _lock:
+        return {
+            "buckets": list(BUCKETS),
+            "operations": {name: {**metric, "histogram": list(metric["histogram"])} for name, metric in sorted(_metrics.items())},
+            "gauges": dict(sorted({**_merged_gauges, **gauges}.items())),
+        }
+
+
+def merge(other) -> None:
+    """
+    Adds the metrics of a snapshot, e.g. of a worker process, to the recorded metrics. Its
+    gauges replace the gauges of the same name.
+
+    Args:
+        other (dict): The snapshot.
+    """
+    if list(other["buckets"]) != list(BUCKETS):
+        raise ValueError("The snapshot does not have the same histogram buckets.")
+
+    with _lock:
+        for name, metric in other["operations"].items():
+            own = _metrics.setdefault(name, {"calls": 0, "seconds": 0.0, "allocated_blocks": 0,
+                                             "histogram": [0] * (len(BUCKETS) + 1)})
+            own["calls"] += metric["calls"]
+            own["seconds"] += metric["seconds"]
+            own["allocated_blocks"] += metric["allocated_blocks"]
+            own["histogram"] = [a + b for a, b in zip(own["histogram"], metric["histogram"])]
+        _merged_gauges.update(other.get("gauges", {}))
+
+
+def run_instrumented(function, *args, **kwargs):
+    """
+    Calls a function with the instrumentation enabled, e.g. in a worker process.
+
+    Args:
+        function (callable): The function.
+        *args: Positional arguments of the function.
+        **kwargs: Keyword arguments of the function.
+
+    Returns:
+        tuple: The result of the function and the snapshot of the metrics of the call.
+    """
+    was_enabled = enabled()
+    saved = snapshot()
+    reset()
+    enable()
+    try:
+        result = function(*args, **kwargs)
+        metrics = snapshot()
+    finally:
+        if not was_enabled:
+            disable()
+        reset()
+        merge(saved)
+    merge(metrics)
+    return result, metrics
+
+
+def to_json() -> str:
+    """
+    Returns:
+        str: The snapshot of the metrics as JSON.
+    """
+    return json.dumps(snapshot(), indent=2)
+
+
+def to_prometheus() -> str:
+    """
+    Formats the metrics in the Prometheus text exposition format.
+
+    Returns:
+        str: The metrics qdutch_calls_total, qdutch_call_seconds (histogram) and
+        qdutch_allocated_blocks, labeled by operation, and qdutch_gauge labeled by gauge.
+    """
+    metrics = snapshot()
+    operations = metrics["operations"]
+    lines = ["# HELP qdutch_calls_total Number of calls of each operation.", "# TYPE qdutch_calls_total counter"]
+    lines += [f'qdutch_calls_total{{operation="{name}"}} {metric["calls"]}' for name, metric in operations.items()]
+
+    lines += ["# HELP qdutch_call_seconds Wall time of the calls of each operation.", "# TYPE qdutch_call_seconds histogram"]
+    for name, metric in operations.items():
+        count = 0
+        for bound, bucket in zip(BUCKETS + (float("inf"),), metric["histogram"]):
+            count += bucket
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'qdutch_call_seconds_bucket{{operation="{name}",le="{le}"}} {count}')
+        lines.append(f'qdutch_call_seconds_sum{{operation="{name}"}} {metric["seconds"]!r}')
+        lines.append(f'qdutch_call_seconds_count{{operation="{name}"}} {metric["calls"]}')
+
+    lines += ["# HELP qdutch_allocated_blocks Net number of memory blocks allocated by the calls of each operation.",
+              "# TYPE qdutch_allocated_blocks gauge"]
+    lines += [f'qdutch_allocated_blocks{{operation="{name}"}} {metric["allocated_blocks"]}' for name, metric in operations.items()]
+
+    lines += ["# HELP qdutch_gauge Current value of each gauge, e.g. the queue depth of the action worker.",
+              "# TYPE qdutch_gauge gauge"]
+    lines += [f'qdutch_gauge{{gauge="{name}"}} {value!r}' for name, value in metrics["gauges"].items()]
+    return "\n".join(lines) + "\n"
+
+
+def save(path) -> None:
+    """
+    Writes the metrics to a file, in the Prometheus text format if its extension is .prom and
+    as JSON otherwise.
+
+    Args:
+        path (str): The path of the file.
+    """
+    with open(path, "w") as file:
+        file.write(to_prometheus() if path.endswith(".prom") else to_json())
@@ -0,0 +1,199 @@
+"""
+Load test of the QDutch table server.
+
+Simulated players play complete games on concurrent tables, with one connection per active
+table, and the latency of every request is recorded. Idle tables can be opened beforehand to
+check how the server behaves when it hosts many games.
+
+Usage:
+    python table_server.py --port 8765 &
+    python load_test.py --port 8765 --tables 200 --games 5 --idle-tables 5000
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+
+import numpy as np
+from table_server import read_message, write_message
+
+
+class Client:
+    """
+    Connection to a table server, recording the latency of its requests.
+    """
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.latencies = []
+        # Number of moves refused by the server
+        self.refused = 0
+        self._ids = itertools.count()
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=8765, unix_path=None):
+        """
+        Opens a connection to a table server.
+
+        Args:
+            host (str): The TCP host.
+            port (int): The TCP port.
+            unix_path (str | None): Path of a Unix socket, used instead of TCP if given.
+
+        Returns:
+            Client: The connected client.
+        """
+        if unix_path is not None:
+            return cls(*await asyncio.open_unix_connection(unix_path))
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def send(self, op, table=None, **args) -> dict:
+        """
+        Sends a request and waits for its response, whether the server executed it or refused it.
+
+        Args:
+            op (str): The operation (see table_server.TableServer).
+            table (int | None): The table of the operation.
+            **args: The arguments of the operation.
+
+        Returns:
+            dict: The response, with its "ok" field and its result or error.
+        """
+        start = time.perf_counter()
+        write_message(self.writer, {"id": next(self._ids), "op": op, "table": table, "args": args})
+        await self.writer.drain()
+        response = await read_message(self.reader)
+        self.latencies.append(time.perf_counter() - start)
+
+        if response is None:
+            raise ConnectionError("The server closed the connection.")
+        return response
+
+    async def request(self, op, table=None, **args):
+        """
+        Sends a request and waits for its response.
+
+        Args:
+            op (str): The operation (see table_server.TableServer).
+            table (int | None): The table of the operation.
+            **args: The arguments of the operation.
+
+        Returns:
+            Any: The result of the operation.
+        """
+        response = await self.send(op, table, **args)
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def play_games(client, rng, games, nb_players=4, dutch_prob=0.05, max_turns=50) -> None:
+    """
+    Plays complete games with random moves, like headless.RandomPolicy.
+
+    Args:
+        client (Client): The connection of the table.
+        rng (random.Random): Generator of the moves.
+        games (int): The number of games to play.
+        nb_players (int): The number of players of each game.
+        dutch_prob (float): Probability of calling "Dutch" at the beginning of a turn.
+        max_turns (int): Number of turns after which a game ends even if nobody called "Dutch".
+    """
+    for _ in range(games):
+        table = await client.request("create", seed=rng.getrandbits(32), nb_players=nb_players)
+        state = await client.request("state", table)
+
+        while not state["ended"] and state["turn"] < max_turns:
+            if state["dutch_player"] is None and rng.random() < dutch_prob:
+                await client.request("call_dutch", table)
+            else:
+                cards = await client.request("draw_cards", table)
+                card = rng.randrange(len(cards))
+                if cards[card][0] == "State":
+                    await client.request("apply_state_card", table, card=card, card_no=rng.randrange(4))
+                elif cards[card][0] == "Entangle":
+                    player_no, other_player_no = rng.sample(range(nb_players), 2)
+                    # The server can refuse an Entangle card (see RegisterManager.check): the card
+                    # is then discarded, like a refused move of a real player
+                    response = await client.send("apply_entangle_card", table, card=card, player_no=player_no,
+                                                 card_no=rng.randrange(4), other_player_no=other_player_no,
+                                                 other_card_no=rng.randrange(4))
+                    client.refused += not response["ok"]
+                else:
+                    await client.request("apply_operator_card", table, card=card,
+                                         player_no=rng.randrange(nb_players), card_no=rng.randrange(4))
+
+            state = await client.request("next_player", table)
+
+        await client.request("get_ranking", table)
+        await client.request("close", table)
+
+
+async def load_test(tables=100, games=5, idle_tables=0, host="127.0.0.1", port=8765, unix_path=None,
+                    seed=0) -> dict:
+    """
+    Plays games on concurrent tables and measures the throughput and latency of the server.
+
+    Args:
+        tables (int): The number of tables played concurrently.
+        games (int): The number of games played on each table.
+        idle_tables (int): The number of tables opened beforehand and never played.
+        host (str): The TCP host.
+        port (int): The TCP port.
+        unix_path (str | None): Path of a Unix socket, used instead of TCP if given.
+        seed (int): Seed of the games and of the moves.
+
+    Returns:
+        dict: The number of requests and of refused moves, the requests per second and the
+        latency percentiles in ms.
+    """
+    rng = random.Random(seed)
+
+    idle_client = await Client.connect(host, port, unix_path)
+    for _ in range(idle_tables):
+        await idle_client.request("create", seed=rng.getrandbits(32))
+
+    clients = [await Client.connect(host, port, unix_path) for _ in range(tables)]
+    start = time.perf_counter()
+    await asyncio.gather(*(play_games(client, random.Random(rng.getrandbits(64)), games) for client in clients))
+    elapsed = time.perf_counter() - start
+
+    for client in clients + [idle_client]:
+        await client.close()
+
+    latencies = np.concatenate([client.latencies for client in clients]) * 1000
+    return {
+        "tables": tables,
+        "idle_tables": idle_tables,
+        "requests": len(latencies),
+        "refused_moves": sum(client.refused for client in clients),
+        "elapsed": elapsed,
+        "actions_per_second": len(latencies) / elapsed,
+        "p50_latency_ms": float(np.percentile(latencies, 50)),
+        "p99_latency_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the QDutch table server.")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP host.")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port.")
+    parser.add_argument("--unix", help="Path of a Unix socket, used instead of TCP.")
+    parser.add_argument("--tables", type=int, default=100, help="Number of tables played concurrently.")
+    parser.add_argument("--games", type=int, default=5, help="Number of games per table.")
+    parser.add_argument("--idle-tables", type=int, default=0, help="Number of tables opened and never played.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the games and of the moves.")
+    args = parser.parse_args()
+
+    results = asyncio.run(load_test(args.tables, args.games, args.idle_tables, args.host, args.port, args.unix, args.seed))
+    for name, value in results.items():
+        print(f"{name}: {value:.3f}" if isinstance(value, float) else f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,498 @@
+"""
+Noisy player slots for the "errors" variant of the game.
+
+After each gate of an operator card (see gates.parse_operator, e.g. the H and the CNOT of an
+H_CNOT card), every qubit the gate acts on goes through the noise channels of parameters.noise,
+in this order:
+    - depolarizing p:       rho -> (1 - p) rho + p I / 2
+    - dephasing p:          rho -> (1 - p) rho + p Z rho Z
+    - amplitude_damping g:  |1> decays to |0> with probability g
+
+Two interchangeable engines hold any number of slots. Their methods take an array of slot
+indices and work on all of them with a few vectorized operations:
+    - DensityMatrixEngine holds the exact (2**n, 2**n) density matrix of each slot, so the
+      probabilities it returns are exact;
+    - TrajectoryEngine holds one (2**n,) state vector per slot and samples one Kraus branch of
+      each channel. Each slot follows one quantum trajectory: the measured values have exactly
+      the distribution of the noisy game, with the memory and time of a noiseless slot.
+See noise_benchmark.py for the time and memory of both engines at each size.
+
+DensityMatrixBackend and TrajectoryBackend wrap an engine of one slot as a PlayerSlot backend
+(see player_slot_class.BACKENDS), so a game simulates its noisy slots one at a time. The batch
+engine (batch_engine.py) does not simulate noise.
+"""
+import abc
+from functools import lru_cache
+
+import numpy as np
+import parameters as param
+from gates import parse_operator
+from statevector_backend import local_operator
+
+
+PAULIS = {
+    "I": np.eye(2, dtype=complex),
+    "X": np.array([[0, 1], [1, 0]], dtype=complex),
+    "Y": np.array([[0, -1j], [1j, 0]], dtype=complex),
+    "Z": np.array([[1, 0], [0, -1]], dtype=complex),
+}
+
+
+def kraus_operators(depolarizing=0.0, dephasing=0.0, amplitude_damping=0.0) -> list[np.ndarray]:
+    """
+    Builds the Kraus operators of the noise channels of one qubit.
+
+    Args:
+        depolarizing (float): Probability to replace the qubit by the maximally mixed state.
+        dephasing (float): Probability of a Z error.
+        amplitude_damping (float): Probability of a decay from |1> to |0>.
+
+    Returns:
+        list[np.ndarray]: The (m, 2, 2) Kraus operators of each channel with a nonzero
+        probability, in the order they are applied.
+    """
+    channels = []
+    if depolarizing:
+        channels.append(np.array([np.sqrt(1 - 3 * depolarizing / 4) * PAULIS["I"]]
+                                 + [np.sqrt(depolarizing / 4) * PAULIS[name] for name in "XYZ"]))
+    if dephasing:
+        channels.append(np.array([np.sqrt(1 - dephasing) * PAULIS["I"], np.sqrt(dephasing) * PAULIS["Z"]]))
+    if amplitude_damping:
+        channels.append(np.array([
+            [[1, 0], [0, np.sqrt(1 - amplitude_damping)]],
+            [[0, np.sqrt(amplitude_damping)], [0, 0]],
+        ], dtype=complex))
+    return channels
+
+
+def _contract(tensor, matrix, axes) -> np.ndarray:
+    """
+    Contracts a 2**k x 2**k matrix with k axes of a tensor of qubit axes.
+
+    Args:
+        tensor (np.ndarray): The tensor, with a (2,) axis per qubit and any other axes.
+        matrix (np.ndarray): The matrix, its most significant bit acting on axes[0].
+        axes (list[int]): The k axes of the tensor.
+
+    Returns:
+        np.ndarray: The contracted tensor, with the axes in the same order.
+    """
+    k = len(axes)
+    result = np.tensordot(matrix.reshape((2,) * 2*k), tensor, axes=(list(range(k, 2*k)), axes))
+    return np.moveaxis(result, list(range(k)), axes)
+
+
+# Names of the gates of parse_operator on the cards, for each of their qubits
+_CARD_NAMES = {"cx": ("C", "X"), "swap": ("SWAP", "SWAP")}
+
+
+@lru_cache(maxsize=1024)
+def _gates(operator: tuple[str, ...]) -> tuple:
+    # Unitary of each gate of the card on the qubits it acts on, most significant qubit first,
+    # and the qubits
+    gates = []
+    for gate_name, qubits in parse_operator(list(operator)):
+        card = ["I"] * len(operator)
+        for q, name in zip(qubits, _CARD_NAMES.get(gate_name, (gate_name.upper(),))):
+            card[q] = name
+        unitary, local_qubits = local_operator(tuple(card))
+        gates.append((unitary, tuple(reversed(local_qubits))))
+    return tuple(gates)
+
+
+class NoisyEngine(abc.ABC):
+    """
+    Common part of the engines: the slots, the noise channels and the grouping of the slots by
+    operator card.
+    """
+    def __init__(self, num_slots, num_qubits, noise=None, rng=None):
+        """
+        Initializes all the slots in the state |0...0>.
+
+        Args:
+            num_slots (int): The number of slots.
+            num_qubits (int): The number of qubits of a slot.
+            noise (dict | None): The probabilities of the noise channels, see kraus_operators.
+                Defaults to parameters.noise.
+            rng (numpy.random.Generator | None): Generator used to sample the measurements and
+                the noise.
+        """
+        self.num_slots = num_slots
+        self.num_qubits = num_qubits
+        self.channels = kraus_operators(**(param.noise if noise is None else noise))
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self._bits = (np.arange(2**num_qubits)[None, :] >> np.arange(num_qubits)[:, None]) & 1
+
+    def _axis(self, q):
+        # Axis of a qubit in the tensor of a slot, after the axis of the slots
+        return 1 + self.num_qubits - 1 - q
+
+    def apply_operator(self, slots, operators) -> None:
+        """
+        Applies an operator card to each slot, each of its gates followed by the noise on the
+        qubits the gate acts on. The slots are grouped by card and each group is updated at once.
+
+        Args:
+            slots (np.ndarray): The slots.
+            operators (list[list[str]]): The operator card applied to each slot.
+        """
+        slots = np.asarray(slots)
+        keys = [tuple(operator) for operator in operators]
+        groups = {}
+        for i, key in enumerate(keys):
+            groups.setdefault(key, []).append(i)
+
+        for key, indices in groups.items():
+            for unitary, qubits in _gates(key):
+                self._apply(slots[indices], unitary, qubits)
+
+    @abc.abstractmethod
+    def _apply(self, slots, unitary, qubits) -> None:
+        """
+        Applies a gate to the slots, followed by the noise on its qubits.
+
+        Args:
+            slots (np.ndarray): The slots.
+            unitary (np.ndarray): The unitary of the gate, its most significant bit acting on
+                qubits[0].
+            qubits (tuple[int, ...]): The qubits of the gate.
+        """
+
+    @abc.abstractmethod
+    def set_state(self, slots, values) -> None:
+        """
+        Prepares computational basis states.
+
+        Args:
+            slots (np.ndarray): The slots.
+            values (np.ndarray): The basis state of each slot.
+        """
+
+    @abc.abstractmethod
+    def probabilities(self, slots=None) -> np.ndarray:
+        """
+        Computes the probability of each value of the slots.
+
+        Args:
+            slots (np.ndarray | None): The slots. Defaults to all of them.
+
+        Returns:
+            np.ndarray: (slots, 2**num_qubits) probability of each value.
+        """
+
+    def measure_all(self, slots) -> np.ndarray:
+        """
+        Measures all the qubits of each slot and collapses them to the measured basis states.
+
+        Args:
+            slots (np.ndarray): The slots.
+
+        Returns:
+            np.ndarray: The measured values.
+        """
+        cdf = np.cumsum(self.probabilities(slots), axis=1)
+        draws = self.rng.random(len(cdf)) * cdf[:, -1]
+        values = np.minimum(np.sum(cdf <= draws[:, None], axis=1), cdf.shape[1] - 1)
+
+        self.set_state(slots, values)
+        return values
+
+
+class DensityMatrixEngine(NoisyEngine):
+    """
+    Exact simulation of noisy slots with their density matrices. A slot takes 16 * 4**num_qubits
+    bytes and a gate costs O(4**num_qubits) per slot.
+    """
+    def __init__(self, num_slots, num_qubits, noise=None, rng=None):
+        super().__init__(num_slots, num_qubits, noise, rng)
+        dim = 2**num_qubits
+        self.rho = np.zeros((num_slots, dim, dim), dtype=complex)
+        self.rho[:, 0, 0] = 1
+
+    def _apply(self, slots, unitary, qubits):
+        n = self.num_qubits
+        tensor = self.rho[slots].reshape((len(slots),) + (2,) * 2*n)
+        rows = [self._axis(q) for q in qubits]
+        columns = [axis + n for axis in rows]
+
+        # rho -> U rho U^dagger, the columns are contracted with the conjugate
+        tensor = _contract(_contract(tensor, unitary, rows), unitary.conj(), columns)
+        for q in qubits:
+            # rho -> sum_i K_i rho K_i^dagger for each channel
+            for channel in self.channels:
+                tensor = sum(
+                    _contract(_contract(tensor, kraus, [self._axis(q)]), kraus.conj(), [self._axis(q) + n])
+                    for kraus in channel
+                )
+        self.rho[slots] = tensor.reshape(len(slots), 2**n, 2**n)
+
+    def set_state(self, slots, values) -> None:
+        """
+        Prepares computational basis states.
+
+        Args:
+            slots (np.ndarray): The slots.
+            values (np.ndarray): The basis state of each slot.
+        """
+        self.rho[slots] = 0
+        self.rho[slots, values, values] = 1
+
+    def set_statevector(self, slots, amplitudes) -> None:
+        """
+        Prepares pure states.
+
+        Args:
+            slots (np.ndarray): The slots.
+            amplitudes (np.ndarray): (slots, 2**num_qubits) amplitudes of each state.
+        """
+        amplitudes = np.asarray(amplitudes, dtype=complex)
+        amplitudes = amplitudes / np.linalg.norm(amplitudes, axis=1, keepdims=True)
+        self.rho[slots] = amplitudes[:, :, None] * amplitudes[:, None, :].conj()
+
+    def probabilities(self, slots=None) -> np.ndarray:
+        rho = self.rho if slots is None else self.rho[slots]
+        return np.diagonal(rho, axis1=1, axis2=2).real.copy()
+
+    def measure(self, slots, qubits) -> np.ndarray:
+        """
+        Measures one qubit of each slot and collapses the density matrices.
+
+        Args:
+            slots (np.ndarray): The slots.
+            qubits (np.ndarray): The qubit measured in each slot.
+
+        Returns:
+            np.ndarray: The measured bits.
+        """
+        ones = self._bits[qubits].astype(bool)
+        p1 = np.sum(self.probabilities(slots) * ones, axis=1)
+        bits = self.rng.random(len(p1)) < p1
+
+        kept = ones == bits[:, None]
+        norm = np.where(bits, p1, 1 - p1)
+        self.rho[slots] = self.rho[slots] * (kept[:, :, None] & kept[:, None, :]) / norm[:, None, None]
+        return bits.astype(np.int64)
+
+
+class TrajectoryEngine(NoisyEngine):
+    """
+    Quantum trajectory simulation of noisy slots: each slot is a state vector and each noise
+    channel applies one of its Kraus operators, drawn with its probability. A slot takes
+    16 * 2**num_qubits bytes and a gate costs O(2**num_qubits) per slot.
+    """
+    def __init__(self, num_slots, num_qubits, noise=None, rng=None):
+        super().__init__(num_slots, num_qubits, noise, rng)
+        self.psi = np.zeros((num_slots, 2**num_qubits), dtype=complex)
+        self.psi[:, 0] = 1
+
+    def _apply(self, slots, unitary, qubits):
+        n = self.num_qubits
+        tensor = _contract(self.psi[slots].reshape((len(slots),) + (2,) * n), unitary, [self._axis(q) for q in qubits])
+
+        for q in qubits:
+            for channel in self.channels:
+                # Every branch of the channel, then one branch per slot
+                branches = np.stack([_contract(tensor, kraus, [self._axis(q)]) for kraus in channel])
+                weights = np.sum(np.abs(branches.reshape(len(channel), len(slots), -1))**2, axis=2)
+                cdf = np.cumsum(weights, axis=0)
+                draws = self.rng.random(len(slots)) * cdf[-1]
+                chosen = np.minimum(np.sum(cdf <= draws, axis=0), len(channel) - 1)
+                tensor = branches[chosen, np.arange(len(slots))] / np.sqrt(weights[chosen, np.arange(len(slots))]).reshape(
+                    (-1,) + (1,) * n)
+
+        self.psi[slots] = tensor.reshape(len(slots), 2**n)
+
+    def set_state(self, slots, values) -> None:
+        """
+        Prepares computational basis states.
+
+        Args:
+            slots (np.ndarray): The slots.
+            values (np.ndarray): The basis state of each slot.
+        """
+        self.psi[slots] = 0
+        self.psi[slots, values] = 1
+
+    def set_statevector(self, slots, amplitudes) -> None:
+        """
+        Prepares pure states.
+
+        Args:
+            slots (np.ndarray): The slots.
+            amplitudes (np.ndarray): (slots, 2**num_qubits) amplitudes of each state.
+        """
+        amplitudes = np.asarray(amplitudes, dtype=complex)
+        self.psi[slots] = amplitudes / np.linalg.norm(amplitudes, axis=1, keepdims=True)
+
+    def probabilities(self, slots=None) -> np.ndarray:
+        psi = self.psi if slots is None else self.psi[slots]
+        return np.abs(psi)**2
+
+    def measure(self, slots, qubits) -> np.ndarray:
+        """
+        Measures one qubit of each slot and collapses the states.
+
+        Args:
+            slots (np.ndarray): The slots.
+            qubits (np.ndarray): The qubit measured in each slot.
+
+        Returns:
+            np.ndarray: The measured bits.
+        """
+        psi = self.psi[slots]
+        ones = self._bits[qubits].astype(bool)
+        p1 = np.sum(np.abs(psi)**2 * ones, axis=1)
+        bits = self.rng.random(len(p1)) < p1
+
+        kept = ones == bits[:, None]
+        norm = np.sqrt(np.where(bits, p1, 1 - p1))
+        self.psi[slots] = np.where(kept, psi, 0) / norm[:, None]
+        return bits.astype(np.int64)
+
+
+class NoisyBackend:
+    """
+    PlayerSlot backend wrapping a noisy engine of one slot.
+    """
+    # Whether set_statevector can load the states of the game, e.g. from a snapshot
+    settable = True
+    engine_class = None
+
+    def __init__(self, num_qubits, rng=None):
+        """
+        Initializes the backend in the state |0...0>, with the noise of parameters.noise.
+
+        Args:
+            num_qubits (int): The number of qubits of the slot.
+            rng (numpy.random.Generator | None): Generator used to sample the measurements and
+                the noise.
+        """
+        self.engine = self.engine_class(1, num_qubits, rng=rng)
+        self.num_qubits = num_qubits
+        self.rng = self.engine.rng
+        self._slot = np.zeros(1, dtype=np.int64)
+
+    @property
+    def noisy(self) -> bool:
+        """
+        bool: Whether noise channels act on the slot (see parameters.noise). A noisy trajectory is
+        pure, but its next states are sampled: the policies do not try cards on it.
+        """
+        return bool(self.engine.channels)
+
+    def apply_operator(self, operator: list[str]) -> None:
+        """
+        Applies a quantum operator and its noise.
+
+        Args:
+            operator (list[str]): The quantum operator to apply.
+        """
+        self.engine.apply_operator(self._slot, [operator])
+
+    def measure(self, nb) -> int:
+        """
+        Measures one qubit and collapses the state accordingly.
+
+        Args:
+            nb (int): The index of the qubit to measure.
+
+        Returns:
+            int: The measured bit.
+        """
+        return int(self.engine.measure(self._slot, np.array([nb]))[0])
+
+    def measure_all(self) -> int:
+        """
+        Measures all the qubits and collapses the state to the measured basis state.
+
+        Returns:
+            int: The measured value.
+        """
+        return int(self.engine.measure_all(self._slot)[0])
+
+    def probabilities(self) -> np.ndarray:
+        """
+        Computes the probability of each value without collapsing the state.
+
+        Returns:
+            np.ndarray: The probability of each of the 2**num_qubits values.
+        """
+        return self.engine.probabilities(self._slot)[0]
+
+    def set_state(self, state: int) -> None:
+        """
+        Prepares a computational basis state.
+
+        Args:
+            state (int): The index of the basis state.
+        """
+        self.engine.set_state(self._slot, np.array([state]))
+
+    def set_statevector(self, amplitudes) -> None:
+        """
+        Prepares a pure state.
+
+        Args:
+            amplitudes (np.ndarray): The 2**num_qubits amplitudes.
+        """
+        self.engine.set_statevector(self._slot, np.asarray(amplitudes)[None])
+
+    def to_circuit(self):
+        """
+        Builds a circuit preparing the current state of the slot, when it is pure.
+
+        Returns:
+            QuantumCircuit: The state preparation circuit.
+        """
+        from qiskit import QuantumCircuit
+
+        qc = QuantumCircuit(self.num_qubits, self.num_qubits)
+        qc.initialize(self.statevector, range(self.num_qubits))
+        return qc
+
+
+class DensityMatrixBackend(NoisyBackend):
+    """
+    Exact noisy player slot, see DensityMatrixEngine.
+    """
+    # The noise channels can leave the slot in a mixed state
+    pure = False
+    engine_class = DensityMatrixEngine
+
+    def snapshot(self) -> np.ndarray:
+        return self.engine.rho.copy()
+
+    def restore(self, state) -> None:
+        self.engine.rho = state.copy()
+
+    @property
+    def statevector(self) -> np.ndarray:
+        """
+        np.ndarray: The amplitudes of the slot, up to a global phase, if its state is pure.
+        """
+        eigenvalues, eigenvectors = np.linalg.eigh(self.engine.rho[0])
+        if eigenvalues[-1] < 1 - 1e-9:
+            raise ValueError("The noise left the slot in a mixed state, it has no state vector.")
+        return eigenvectors[:, -1]
+
+
+class TrajectoryBackend(NoisyBackend):
+    """
+    Noisy player slot following one quantum trajectory, see TrajectoryEngine.
+    """
+    # Each trajectory is a pure state
+    pure = True
+    engine_class = TrajectoryEngine
+
+    def snapshot(self) -> np.ndarray:
+        return self.engine.psi.copy()
+
+    def restore(self, state) -> None:
+        self.engine.psi = state.copy()
+
+    @property
+    def statevector(self) -> np.ndarray:
+        """
+        np.ndarray: A copy of the amplitudes of the current trajectory.
+        """
+        return self.engine.psi[0].copy()
@@ -0,0 +1,97 @@
+"""
+Benchmark of the noisy engines: exact density matrices against quantum trajectories.
+
+For each number of qubits, both engines simulate the same batch of slots with all the noise
+channels enabled. The benchmark measures the memory of a slot and the time per slot of a random
+operator card (with its noise) and of a measurement of all the qubits.
+
+Usage:
+    python noise_benchmark.py --qubits 2 3 4 5 6 7 --slots 256
+
+Output on a single-core x86-64 container (256 slots, times in microseconds per slot):
+
+qubits        density slot KiB         density card us      density measure us     trajectory slot KiB      trajectory card us   trajectory measure us
+     2                   0.250                 144.936                   1.152                   0.062                 112.007                   0.417
+     3                   1.000                 316.162                   1.828                   0.125                 206.977                   0.477
+     4                   4.000                 438.646                   5.152                   0.250                 353.953                   0.548
+     5                  16.000                 792.287                  13.591                   0.500                 352.183                   0.806
+     6                  64.000                1567.679                  31.815                   1.000                 464.105                   1.380
+     7                 256.000                4811.453                 145.684                   2.000                 607.689                   2.634
+
+The noise is applied after each gate of a card, so an H_CNOT card costs two gates. The density
+matrices take 2**num_qubits times more memory than the trajectories, and their gates cost about
+as many more operations. At 2 qubits both engines are dominated by the grouping of the slots by
+card; the trajectory engine is faster at every size, by 8x at 7 qubits. The density matrix
+engine remains the reference: it gives the exact probabilities of a noisy slot, where a
+trajectory only samples them.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+from card_generator import generate_operator
+from noise_backend import DensityMatrixEngine, TrajectoryEngine
+import parameters as param
+
+
+ENGINES = {"density": DensityMatrixEngine, "trajectory": TrajectoryEngine}
+
+NOISE = {"depolarizing": 0.01, "dephasing": 0.01, "amplitude_damping": 0.01}
+
+
+def benchmark(engine_class, num_qubits, num_slots=256, cards=20, seed=0) -> dict:
+    """
+    Benchmarks one engine for one number of qubits.
+
+    Args:
+        engine_class (type): The engine.
+        num_qubits (int): The number of qubits of a slot.
+        num_slots (int): The number of slots simulated at once.
+        cards (int): The number of operator cards applied to every slot.
+        seed (int): Seed of the cards and of the noise.
+
+    Returns:
+        dict: The memory of a slot in KiB and the times per slot in microseconds.
+    """
+    # The cards are generated for num_qubits qubits
+    saved_num_qubits = param.num_qubits
+    param.num_qubits = num_qubits
+    try:
+        rng = random.Random(seed)
+        operators = [[generate_operator(rng) for _ in range(num_slots)] for _ in range(cards)]
+    finally:
+        param.num_qubits = saved_num_qubits
+    slots = np.arange(num_slots)
+
+    engine = engine_class(num_slots, num_qubits, NOISE, np.random.default_rng(seed))
+    state = engine.rho if engine_class is DensityMatrixEngine else engine.psi
+
+    start = time.perf_counter()
+    for card in operators:
+        engine.apply_operator(slots, card)
+    card_time = (time.perf_counter() - start) / cards / num_slots * 1e6
+
+    start = time.perf_counter()
+    engine.measure_all(slots)
+    measure_time = (time.perf_counter() - start) / num_slots * 1e6
+
+    return {"slot KiB": state.nbytes / num_slots / 2**10, "card us": card_time, "measure us": measure_time}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the noisy engines.")
+    parser.add_argument("--qubits", type=int, nargs="+", default=list(range(2, 8)), help="Numbers of qubits.")
+    parser.add_argument("--slots", type=int, default=256, help="Number of slots simulated at once.")
+    parser.add_argument("--cards", type=int, default=20, help="Number of operator cards per slot.")
+    args = parser.parse_args()
+
+    columns = ["slot KiB", "card us", "measure us"]
+    print(f"{'qubits':>6}  " + "  ".join(f"{engine + ' ' + name:>22}" for engine in ENGINES for name in columns))
+    for num_qubits in args.qubits:
+        results = {engine: benchmark(engine_class, num_qubits, args.slots, args.cards) for engine, engine_class in ENGINES.items()}
+        print(f"{num_qubits:>6}  " + "  ".join(f"{results[engine][name]:>22.3f}" for engine in ENGINES for name in columns))
+
+
+if __name__ == "__main__":
+    main()
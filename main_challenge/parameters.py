@@ -2,11 +2,27 @@ num_qubits = 3  # Number of qubits in the quantum circuit
 
 num_qubits = 3
 
+backend = "numpy"  # Simulation backend of the player slots ("numpy", "stabilizer", "table", "tensor", "aer", or "density" and "trajectory" for noisy slots)
+
+# Error probabilities of the "errors" variant, applied after each gate on the qubits it acts on.
+# Only the "density" and "trajectory" backends simulate them (see noise_backend.py).
+noise = {
+    "depolarizing": 0.0,
+    "dephasing": 0.0,
+    "amplitude_damping": 0.0,
+}
+
+# File the metrics of the interface are written to when it is closed, with a .json or .prom
+# extension (see instrumentation.py). None disables the instrumentation.
+instrumentation = None
+
 state_prob = 0.30  # Probability to have the qubit in the state |0>
 
 measurement_prob = 0.20  # Probability to have a measurement operation
 
-operation_prob = 1 - state_prob - measurement_prob  # Probability to have an operation
+entangle_prob = 0.0  # Probability to have an Entangle card, linking two slots (see registers.py)
+
+operation_prob = 1 - state_prob - measurement_prob - entangle_prob  # Probability to have an operation
 
 
 single_qubit_prob = 0.75
@@ -15,9 +31,11 @@ two_qubit_prob = 1 - single_qubit_prob
 
 
 
-one_single_qubit_prob = single_qubit_prob * 0.70
+one_single_qubit_ratio = 0.70  # Share of the single qubit operators acting on only one qubit
+
+one_single_qubit_prob = single_qubit_prob * one_single_qubit_ratio
 
-two_single_qubit_prob = single_qubit_prob * 0.30
+two_single_qubit_prob = single_qubit_prob * (1 - one_single_qubit_ratio)
 
 gate_prob = {
     "single_qubit": {
@@ -34,4 +52,53 @@ gate_prob = {
 }
 
 
+# Card probabilities that can be changed with configure
+CONFIGURABLE = ("state_prob", "measurement_prob", "entangle_prob", "single_qubit_prob", "one_single_qubit_ratio",
+                "gate_prob")
+
+
+def check_probabilities(**overrides):
+    """
+    Checks that the card probabilities, with some of them overridden, are all in [0, 1], and
+    raises a ValueError otherwise, e.g. when state_prob + measurement_prob + entangle_prob is
+    larger than 1.
+
+    Args:
+        **overrides: New values of state_prob, measurement_prob, entangle_prob, single_qubit_prob,
+            one_single_qubit_ratio or gate_prob.
+    """
+    for name in overrides:
+        if name not in CONFIGURABLE:
+            raise ValueError(f"{name} is not a configurable card probability.")
+    values = {name: overrides.get(name, globals()[name]) for name in CONFIGURABLE}
+
+    probabilities = {name: values[name] for name in CONFIGURABLE if name != "gate_prob"}
+    probabilities["operation_prob"] = 1 - values["state_prob"] - values["measurement_prob"] - values["entangle_prob"]
+    for group, gates in values["gate_prob"].items():
+        for gate, prob in gates.items():
+            probabilities[f"gate_prob[{group!r}][{gate!r}]"] = prob
+
+    for name, prob in probabilities.items():
+        # Tolerance for the rounding of the sums
+        if not -1e-9 <= prob <= 1 + 1e-9:
+            raise ValueError(f"{name} must be a probability in [0, 1]. Got {prob}.")
+
+
+def configure(**overrides):
+    """
+    Changes the card probabilities and recomputes the probabilities that derive from them.
+    Nothing is changed if a probability is outside [0, 1] (see check_probabilities).
+
+    Args:
+        **overrides: New values of state_prob, measurement_prob, entangle_prob, single_qubit_prob,
+            one_single_qubit_ratio or gate_prob.
+    """
+    global operation_prob, two_qubit_prob, one_single_qubit_prob, two_single_qubit_prob
+
+    check_probabilities(**overrides)
+    globals().update(overrides)
 
+    operation_prob = max(1 - state_prob - measurement_prob - entangle_prob, 0.0)
+    two_qubit_prob = 1 - single_qubit_prob
+    one_single_qubit_prob = single_qubit_prob * one_single_qubit_ratio
+    two_single_qubit_prob = single_qubit_prob * (1 - one_single_qubit_ratio)
@@ -1,23 +1,108 @@
+import random
+
+import numpy as np
 from player_slot_class import PlayerSlot
 from card_generator import generate_state
 
+
+# Largest number of (points, smallest card) pairs of hand_distribution, 128 MiB of float64. The
+# joint distribution grows as 4**num_qubits, it is limited to about 11 qubits.
+MAX_JOINT_SIZE = 1 << 24
+
+
 class Player:
-    def __init__(self, name):
+    def __init__(self, name, rng=random, slot_rng=None):
+        """
+        Initializes the player with four random cards.
+
+        Args:
+            name (str): The name of the player.
+            rng (random.Random): Generator used to draw the initial cards.
+            slot_rng (numpy.random.Generator | None): Generator used to sample the measurements
+                of the cards.
+        """
         self.name = name
-        self.hand = [PlayerSlot() for _ in range(4)]
+        self.hand = [PlayerSlot(rng=slot_rng) for _ in range(4)]
 
         for card in self.hand:
-            card.set_state(generate_state())
+            card.set_state(generate_state(rng))
 
     def calculate_points(self):
         """
-        Calculates the total points of the player based on the cards in its hand.
+        Calculates the total points of the player based on the cards in its hand. Each card is
+        measured at most once, see PlayerSlot.reveal.
 
         Returns:
             int: The total points of the player.
         """
         points = 0
         for slot in self.hand:
-            points += slot.measure_all()
+            points += slot.reveal()
+
+        return points
+
+    def expected_points(self):
+        """
+        Calculates the exact expected points of the player, without measuring its cards.
+
+        Returns:
+            float: The expected points of the player.
+        """
+        return sum(slot.expected_value() for slot in self.hand)
+
+    def hand_distribution(self):
+        """
+        Calculates the joint distribution of the total points of the player and of its smallest
+        card, without measuring its cards. The distribution is built by adding the cards one at a
+        time, as independent cards: entangled cards (see registers.py) are counted with their
+        marginal distributions, so it is only exact without them. The distribution has
+        about 4 * 4**num_qubits pairs, a ValueError is raised when it has more than
+        MAX_JOINT_SIZE pairs (see points_distribution for the points only).
+
+        Returns:
+            np.ndarray: The probability of each (points, smallest card) pair.
+        """
+        nb_values = 2**self.hand[0].backend.num_qubits
+        shape = (len(self.hand) * (nb_values - 1) + 1, nb_values)
+        if shape[0] * shape[1] > MAX_JOINT_SIZE:
+            raise ValueError(f"The joint distribution of a hand of {self.hand[0].backend.num_qubits}-qubit cards has "
+                             f"{shape[0] * shape[1]} pairs, more than MAX_JOINT_SIZE = {MAX_JOINT_SIZE}.")
+
+        distributions = [slot.probabilities() for slot in self.hand]
+        joint = np.zeros(shape)
+        joint[np.arange(nb_values), np.arange(nb_values)] = distributions[0]
+
+        for probabilities in distributions[1:]:
+            new_joint = np.zeros_like(joint)
+            for value, prob in enumerate(probabilities):
+                if prob == 0:
+                    continue
+                shifted = joint[:len(joint) - value] * prob
+                # The smallest card becomes the new card when it is smaller
+                new_joint[value:, :value] += shifted[:, :value]
+                new_joint[value:, value] += shifted[:, value:].sum(axis=1)
+            joint = new_joint
+
+        return joint
+
+    def points_distribution(self):
+        """
+        Calculates the distribution of the total points of the player, without measuring its
+        cards. The distributions of the cards are convolved with FFTs, so the cost grows as
+        2**num_qubits and not as the joint distribution of hand_distribution. Entangled cards
+        are counted with their marginal distributions, so the distribution is only exact when
+        the cards of the hand are independent.
+
+        Returns:
+            np.ndarray: The probability of each number of points.
+        """
+        distributions = [slot.probabilities() for slot in self.hand]
+        size = sum(len(probabilities) - 1 for probabilities in distributions) + 1
+        length = 1 << (size - 1).bit_length()
+
+        spectrum = np.fft.rfft(distributions[0], length)
+        for probabilities in distributions[1:]:
+            spectrum *= np.fft.rfft(probabilities, length)
 
-        return points    
+        # The rounding errors of the FFTs can give tiny negative probabilities
+        return np.clip(np.fft.irfft(spectrum, length)[:size], 0, None)
@@ -1,19 +1,94 @@
-from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister, transpile
-from qiskit_aer import AerSimulator
+import importlib
+from functools import lru_cache
+
+import numpy as np
 import parameters as para
-import matplotlib.pyplot as plt
+
+
+# Simulation backends available for the player slots, as "module.Class". A backend is only
+# imported when it is used, so the game does not need qiskit unless the "aer" backend is selected.
+BACKENDS = {
+    "aer": "aer_backend.AerBackend",
+    "density": "noise_backend.DensityMatrixBackend",
+    "numpy": "statevector_backend.StatevectorBackend",
+    "stabilizer": "stabilizer_backend.StabilizerBackend",
+    "table": "table_backend.TableBackend",
+    "tensor": "tensor_backend.TensorBackend",
+    "trajectory": "noise_backend.TrajectoryBackend",
+}
+
+
+def qubit_marginals(probabilities, num_qubits) -> np.ndarray:
+    """
+    Computes the probability of measuring 1 on each qubit from the distribution of the values.
+
+    Args:
+        probabilities (np.ndarray): (..., 2**num_qubits) probabilities of the values.
+        num_qubits (int): The number of qubits.
+
+    Returns:
+        np.ndarray: (..., num_qubits) probability of each qubit to be measured as 1.
+    """
+    probabilities = np.asarray(probabilities)
+    batch = probabilities.shape[:-1]
+    # Qubit q is the middle axis when the values are split into (high bits, bit q, low bits)
+    return np.stack([
+        probabilities.reshape(batch + (2**(num_qubits - 1 - q), 2, 2**q))[..., 1, :].sum(axis=(-2, -1))
+        for q in range(num_qubits)
+    ], axis=-1)
+
+
+@lru_cache(maxsize=None)
+def load_backend(name):
+    """
+    Imports the class of a simulation backend.
+
+    Args:
+        name (str): The name of the backend (see BACKENDS).
+
+    Returns:
+        type: The backend class.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name}. Expected one of {list(BACKENDS)}.")
+
+    module_name, class_name = BACKENDS[name].rsplit(".", 1)
+    return getattr(importlib.import_module(module_name), class_name)
 
 
 class PlayerSlot:
     """
     Represents one player card slot in the QDutch game.
     """
-    def __init__(self):
+    def __init__(self, backend=None, rng=None):
         """
-        Initializes the PlayerSlot with a quantum circuit.
+        Initializes the PlayerSlot with a simulation backend.
+
+        Args:
+            backend (str | None): The name of the simulation backend (see BACKENDS). If None,
+                parameters.backend is used.
+            rng (numpy.random.Generator | None): Generator used to sample the measurements.
         """
-        self.qc = QuantumCircuit(para.num_qubits, para.num_qubits)
+        backend = para.backend if backend is None else backend
+        self.backend = load_backend(backend)(para.num_qubits, rng)
         self.last_measure = None
+
+    @property
+    def entangled(self) -> bool:
+        """
+        bool: Whether the slot is entangled with other slots (see registers.py). An entangled
+        slot has no state vector or circuit of its own.
+        """
+        # Only the ClusterView of registers.py declares it, so the backends stay independent
+        return getattr(self.backend, "entangled", False)
+
+    @property
+    def qc(self):
+        """
+        QuantumCircuit: A circuit preparing the current state of the player slot. The slot only
+        stores a fixed-size state, the circuit is generated on demand.
+        """
+        return self.backend.to_circuit()
     
     def apply_operator(self, operator: list[str]) -> None:
         """
@@ -22,42 +97,7 @@ class PlayerSlot:
         Args:
             operator (list[str]): The quantum operator to apply.
         """
-        # CNOT gate
-        if "C" in operator:
-            target = operator.index("X")
-            control = operator.index("C")
-            self.qc.cx(control, target)
-            self.last_measure = None
-            return
-
-        # H followed by a CNOT gate
-        if "HC" in operator:
-            qubit1 = operator.index("HC")
-            qubit2 = operator.index("X")
-            self.qc.h(qubit1)
-            self.qc.cx(qubit1, qubit2)
-            self.last_measure = None
-            return
-        
-        # SWAP gate
-        if "SWAP" in operator:
-            qubit1 = operator.index("SWAP")
-            qubit2 = operator[qubit1+1:].index("SWAP") + qubit1 + 1
-            self.qc.cx(qubit1, qubit2)
-            self.qc.cx(qubit2, qubit1)
-            self.qc.cx(qubit1, qubit2)
-            self.last_measure = None
-            return
-        
-        # Single qubit gates
-        for i, gate_name in enumerate(operator):
-            if gate_name == "I":
-                continue
-
-            else:
-                method = getattr(self.qc, gate_name.lower())
-                method(i)
-        
+        self.backend.apply_operator(operator)
         self.last_measure = None
 
     def measure(self, nb) -> int:
@@ -67,52 +107,77 @@ class PlayerSlot:
         Returns:
             int: The measured state of the player slot.
         """
-        self.qc.measure(nb, nb)
-        # To be able to retrieve the state and continue the game after the measurement
-        self.qc.save_statevector()
+        self.last_measure = None
+        return self.backend.measure(nb)
 
-        simulator = AerSimulator(method="statevector")
-        new_circuit = transpile(self.qc, simulator)
-        job = simulator.run(new_circuit, shots=1)
-        result = job.result()
+    def measure_all(self) -> int:
+        """
+        Measures the state of the player slot (3 qubits).
+        
+        Returns:
+            int: The measured state of the player slot.
+        """
+        self.last_measure = self.backend.measure_all()
+        return self.last_measure
 
-        # Get the statevector and the partial measurement
-        statevector = result.get_statevector(new_circuit)
-        measured_bit = list(result.get_counts().keys())[0][-nb-1]
+    def reveal(self) -> int:
+        """
+        Measures the state of the player slot, unless it was already measured since its last
+        change. The measured state is a basis state, so measuring it again would give the same
+        value: the cached value is returned instead. The cache is invalidated by apply_operator,
+        measure and set_state, which makes this method cheap enough to be called every frame.
 
-        # Reinitialize the circuit with the statevector AFTER the partial measurement to continue the game
-        self.qc = QuantumCircuit(para.num_qubits, para.num_qubits)
-        self.qc.initialize(statevector, range(para.num_qubits))
+        Returns:
+            int: The measured state of the player slot.
+        """
+        if self.last_measure is None:
+            self.measure_all()
+        return self.last_measure
 
-        return int(measured_bit)
+    def probabilities(self):
+        """
+        Computes the exact probability of each value of the player slot, without measuring it.
 
+        Returns:
+            np.ndarray: The probability of each of the 2**num_qubits values.
+        """
+        return self.backend.probabilities()
 
-    def measure_all(self) -> int:
+    def qubit_probabilities(self) -> np.ndarray:
         """
-        Measures the state of the player slot (3 qubits).
-        
+        Computes the exact probability of measuring 1 on each qubit, without measuring it.
+
         Returns:
-            int: The measured state of the player slot.
+            np.ndarray: The probability of each of the num_qubits qubits to be measured as 1.
         """
-        # if self.last_measure is None:
-        self.qc.measure_all()
-    
-        # Simulate the circuit to get the measurement result
-        simulator = AerSimulator()
-        new_circuit = transpile(self.qc, simulator)
-        job = simulator.run(new_circuit, shots=1)
-        result = job.result()
-        counts = result.get_counts()
+        # The backends of many qubits compute them without the distribution of the values
+        if hasattr(self.backend, "qubit_probabilities"):
+            return self.backend.qubit_probabilities()
+        return qubit_marginals(self.probabilities(), self.backend.num_qubits)
 
-        value = int(list(counts.keys())[0][:para.num_qubits], 2)
-        self.last_measure = value
+    def measure_probability(self, nb) -> float:
+        """
+        Computes the exact probability that measure(nb) returns 1, without measuring.
 
-        # Reinitialize the circuit after the measurement to continue the game
-        self.qc = QuantumCircuit(para.num_qubits, para.num_qubits)
-        self.set_state(value)
+        Args:
+            nb (int): The index of the qubit.
 
-        return value
-        return self.last_measure
+        Returns:
+            float: The probability of measuring 1.
+        """
+        return float(self.qubit_probabilities()[nb])
+
+    def expected_value(self) -> float:
+        """
+        Computes the exact expected value of the player slot, without measuring it.
+
+        Returns:
+            float: The expected value.
+        """
+        if hasattr(self.backend, "expected_value"):
+            return self.backend.expected_value()
+        probabilities = self.probabilities()
+        return float(probabilities @ np.arange(len(probabilities)))
 
     def set_state(self, state: int) -> None:
         """
@@ -121,16 +186,45 @@ class PlayerSlot:
         Args:
             state (int): The new state of the player slot.
         """
-        initial_state = [0] * 2**para.num_qubits
-        initial_state[state] = 1
+        self.backend.set_state(state)
+        self.last_measure = None
+
+    def set_statevector(self, amplitudes) -> None:
+        """
+        Sets the amplitudes of the player slot, e.g. to restore a saved game.
 
-        self.qc = QuantumCircuit(para.num_qubits, para.num_qubits)
-        self.qc.initialize(initial_state, range(para.num_qubits))
+        Args:
+            amplitudes (np.ndarray): The 2**num_qubits amplitudes of the new state.
+        """
+        self.backend.set_statevector(amplitudes)
         self.last_measure = None
 
+    def snapshot(self):
+        """
+        Saves the state of the player slot, so that it can be restored without re-simulating it.
+        The backend itself is saved too, since an Entangle card replaces it by a view of a
+        cluster (see registers.py).
+
+        Returns:
+            tuple: The backend, its state and the cached measurement (see reveal).
+        """
+        return self.backend, self.backend.snapshot(), self.last_measure
+
+    def restore(self, state) -> None:
+        """
+        Restores a state saved by snapshot.
+
+        Args:
+            state (tuple): The saved state.
+        """
+        self.backend, backend_state, self.last_measure = state
+        self.backend.restore(backend_state)
+
     def plot_circuit(self) -> None:
         """
         Plots the quantum circuit of the player slot.
         """
+        import matplotlib.pyplot as plt
+
         self.qc.draw(output='mpl')
         plt.show()
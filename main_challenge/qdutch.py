@@ -1,32 +1,23 @@
+import atexit
+import logging
 import pygame
 import sys
-import os
 
+import card_renderer
+import instrumentation
+import parameters as param
 from game_class import QDutch
-from card_renderer import draw_card_front, draw_card_back
+from card_renderer import draw_card_front, draw_card_back, get_font, get_image
+from scene import Scene
+from action_worker import ACTION_DONE, ActionWorker
+from registers import ENTANGLE_GATES
 
-# --- Initialization ---
-pygame.init()
-
-# Get the directory where the running script is located
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-
-SCREEN_SIZE = (900, 600)
-screen = pygame.display.set_mode(SCREEN_SIZE)
-pygame.display.set_caption("Modular Card Renderer")
-
-# Build the absolute path to the image file
-bg_image_path = os.path.join(SCRIPT_DIR, "assets/background.png")
-bg_image = pygame.image.load(bg_image_path).convert_alpha()
-
-measurement_img_path = os.path.join(SCRIPT_DIR, "assets/measure.png")
-measurement_img = pygame.image.load(measurement_img_path).convert_alpha()
+logger = logging.getLogger(__name__)
 
 # --- Constants ---
 WIDTH, HEIGHT = 800, 600
 CARD_WIDTH, CARD_HEIGHT = 60, 90
 CARD_SPACING = 20
-font = pygame.font.SysFont("arial", 100, bold=False)
 
 # Colors
 BG_COLOR = (34, 139, 34)      # Green table
@@ -38,18 +29,107 @@ COLOR_BOTTOM = pygame.Color(255, 224, 230)
 HIDDEN_BASE = (180, 180, 180)
 
 # --- Pygame Setup ---
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Top View Table Game")
-font = pygame.font.SysFont(None, 24)
-clock = pygame.time.Clock()
+# Created by init_display, so that importing this module opens no window
+screen = None
+bg_image = None
+font = None
+clock = None
+# Functions of the event loop timed when parameters.instrumentation is set
+LOOP_FUNCTIONS = ["get_events", "present", "draw_table_with_states", "draw_center_elements", "draw_player_labels"]
+# The draw functions add their items to the scene, which only redraws the regions that changed
+scene = None
+
+
+def init_display():
+    """
+    Initializes pygame, opens the window and loads the font and the card back.
+    """
+    global screen, bg_image, font, clock, scene
+
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Top View Table Game")
+    bg_image = get_image("background.png")
+    font = get_font(None, 24)
+    clock = pygame.time.Clock()
+    scene = Scene(screen, BG_COLOR)
 
 # --- Global Buttons ---
 card_buttons = []
 center_buttons = []
 
 
+def add_card(key, bits, position, rotation, card_type="state"):
+    """
+    Adds a card to the scene: its front if bits is given, its back otherwise.
+    """
+    x, y = position
+    width, height = (CARD_HEIGHT, CARD_WIDTH) if rotation % 180 else (CARD_WIDTH, CARD_HEIGHT)
+    # Bounds of the rotated card, with a margin for the rounding of its position
+    rect = pygame.Rect(0, 0, width + 4, height + 4)
+    rect.center = (int(x + CARD_WIDTH // 2), int(y + CARD_HEIGHT // 2))
+
+    if bits is None:
+        scene.add(key, rect, ("back", rotation),
+                  lambda surface: draw_card_back(surface, bg_image, position, (CARD_WIDTH, CARD_HEIGHT), rotation))
+    else:
+        signature = (tuple(bits) if isinstance(bits, list) else bits, card_type, rotation)
+        scene.add(key, rect, signature,
+                  lambda surface: draw_card_front(surface, bits, position, (CARD_WIDTH, CARD_HEIGHT), rotation, card_type=card_type))
+
+
+def entangle_labels(data):
+    """
+    Labels of the qubits of an Entangle card: the gate on the first clicked card is marked 1 and
+    the gate on the second one is marked 2.
+    """
+    gate, qubit_a, qubit_b = data
+    first, second = ENTANGLE_GATES[gate]
+    labels = [None, None, None]
+    labels[qubit_a] = f"{first}1"
+    labels[qubit_b] = f"{labels[qubit_b] or ''}{second}2"
+    return labels
+
+
+def add_button(key, rect, color, text=None):
+    """
+    Adds a colored rectangle to the scene, with an optional centered text.
+    """
+    def draw(surface):
+        pygame.draw.rect(surface, color, rect)
+        if text is not None:
+            rendered = font.render(text, True, TEXT_COLOR)
+            surface.blit(rendered, rendered.get_rect(center=rect.center))
+
+    scene.add(key, rect, (color, text), draw)
+
+
+def present():
+    """
+    Redraws the regions of the scene that changed and pushes them to the display.
+
+    Returns:
+        list[pygame.Rect]: The updated regions, empty when nothing changed.
+    """
+    rects = scene.render()
+    if rects:
+        pygame.display.update(rects)
+    return rects
+
+
+def get_events(idle):
+    """
+    Returns the pending events. When the table is idle, sleeps until the next event instead of
+    polling every frame.
+    """
+    if idle:
+        return [pygame.event.wait()] + pygame.event.get()
+    return pygame.event.get()
+
+
 def draw_table_with_states(players, show_states, end_game_show_cards=False):
-    screen.fill(BG_COLOR)
+    # The visible cards show their cached value (see PlayerSlot.reveal), so the slots are only
+    # simulated again after they changed
     card_buttons.clear()
 
     # --- Player 1 (Bottom) ---
@@ -58,11 +138,11 @@ def draw_table_with_states(players, show_states, end_game_show_cards=False):
         y = HEIGHT - CARD_HEIGHT - 40
         rect = pygame.Rect(x, y, CARD_WIDTH, CARD_HEIGHT)
         if show_states and i < 2 or end_game_show_cards:
-            value = players[0].hand[i].measure_all()
+            value = players[0].hand[i].reveal()
             bits = list(f"{value:03b}")
-            draw_card_front(screen, bits, (x, y), (CARD_WIDTH, CARD_HEIGHT), 0)
         else:
-            draw_card_back(screen, bg_image, (x, y), (CARD_WIDTH, CARD_HEIGHT), 0)
+            bits = None
+        add_card(("card", 0, i), bits, (x, y), 0)
         card_buttons.append((rect, 0, i))
 
     # --- Player 3 (Top) ---
@@ -71,11 +151,11 @@ def draw_table_with_states(players, show_states, end_game_show_cards=False):
         y = 40 + CARD_HEIGHT // 2
         rect = pygame.Rect(x, y, CARD_WIDTH, CARD_HEIGHT)
         if show_states and i < 2 or end_game_show_cards:
-            value = players[2].hand[i].measure_all()
+            value = players[2].hand[i].reveal()
             bits = list(f"{value:03b}")
-            draw_card_front(screen, bits, (x, y), (CARD_WIDTH, CARD_HEIGHT), 180)
         else:
-            draw_card_back(screen, bg_image, (x, y), (CARD_WIDTH, CARD_HEIGHT), 180)
+            bits = None
+        add_card(("card", 2, i), bits, (x, y), 180)
         card_buttons.append((rect, 2, i))
 
     # --- Player 2 (Left) ---
@@ -84,11 +164,11 @@ def draw_table_with_states(players, show_states, end_game_show_cards=False):
         y = HEIGHT // 2 - 1.5 * (CARD_WIDTH + CARD_SPACING) + i * (CARD_WIDTH + CARD_SPACING)
         rect = pygame.Rect(x, y, CARD_WIDTH, CARD_HEIGHT)
         if show_states and i < 2 or end_game_show_cards:
-            value = players[1].hand[i].measure_all()
+            value = players[1].hand[i].reveal()
             bits = list(f"{value:03b}")
-            draw_card_front(screen, bits, (x, y), (CARD_WIDTH, CARD_HEIGHT), 270)
         else:
-            draw_card_back(screen, bg_image, (x, y), (CARD_WIDTH, CARD_HEIGHT), 270)
+            bits = None
+        add_card(("card", 1, i), bits, (x, y), 270)
         card_buttons.append((rect, 1, i))
 
     # --- Player 4 (Right) ---
@@ -97,11 +177,11 @@ def draw_table_with_states(players, show_states, end_game_show_cards=False):
         y = HEIGHT // 2 + 1.5 * (CARD_WIDTH + CARD_SPACING) - i * (CARD_WIDTH + CARD_SPACING)
         rect = pygame.Rect(x, y, CARD_WIDTH, CARD_HEIGHT)
         if show_states and i < 2 or end_game_show_cards:
-            value = players[3].hand[i].measure_all()
+            value = players[3].hand[i].reveal()
             bits = list(f"{value:03b}")
-            draw_card_front(screen, bits, (x, y), (CARD_WIDTH, CARD_HEIGHT), 90)
         else:
-            draw_card_back(screen, bg_image, (x, y), (CARD_WIDTH, CARD_HEIGHT), 90)
+            bits = None
+        add_card(("card", 3, i), bits, (x, y), 90)
         card_buttons.append((rect, 3, i))
 
 
@@ -112,29 +192,25 @@ def draw_center_elements():
 
     # Dutch button
     dutch_rect = pygame.Rect(center_x - 160, center_y - 25, 100, 50)
-    pygame.draw.rect(screen, (255, 125, 25), dutch_rect)
-    dutch_text = font.render("Dutch", True, TEXT_COLOR)
-    screen.blit(dutch_text, dutch_text.get_rect(center=dutch_rect.center))
+    add_button("Dutch", dutch_rect, (255, 125, 25), "Dutch")
     center_buttons.append((dutch_rect, "Dutch"))
 
     # Deck
     deck_rect = pygame.Rect(center_x - CARD_WIDTH // 2, center_y - CARD_HEIGHT // 2, CARD_WIDTH, CARD_HEIGHT)
-    pygame.draw.rect(screen, (180, 180, 180), deck_rect)
-    deck_text = font.render("Deck", True, TEXT_COLOR)
-    screen.blit(deck_text, deck_text.get_rect(center=deck_rect.center))
+    add_button("deck", deck_rect, (180, 180, 180), "Deck")
     center_buttons.append((deck_rect, "deck"))
 
     # Cards (no text on these two)
     card1_rect = pygame.Rect(center_x + 70, center_y - CARD_HEIGHT // 2, CARD_WIDTH, CARD_HEIGHT)
-    pygame.draw.rect(screen, BG_CARD_COLOR, card1_rect)
+    add_button("card 1", card1_rect, BG_CARD_COLOR)
     center_buttons.append((card1_rect, "card 1"))
 
     card2_rect = pygame.Rect(center_x + 140, center_y - CARD_HEIGHT // 2, CARD_WIDTH, CARD_HEIGHT)
-    pygame.draw.rect(screen, BG_CARD_COLOR, card2_rect)
+    add_button("card 2", card2_rect, BG_CARD_COLOR)
     center_buttons.append((card2_rect, "card 2"))
 
 def draw_player_labels(show_states, current_player_no):
-    label_font = pygame.font.SysFont(None, 28)
+    label_font = get_font(None, 28)
 
     player_positions = {
         0: (WIDTH // 2 + 25, HEIGHT - 150),              # Bottom
@@ -155,23 +231,33 @@ def draw_player_labels(show_states, current_player_no):
                 label_rect = label.get_rect(center=pos)
                 label = pygame.transform.rotate(label, 270/i)
 
-            screen.blit(label, label_rect)
+            scene.add(("label", i), pygame.Rect(label_rect.topleft, label.get_size()), f"Player {i + 1}",
+                      lambda surface, label=label, label_rect=label_rect: surface.blit(label, label_rect))
 
 def draw_start_message():
-    msg_font = pygame.font.SysFont(None, 36)
+    msg_font = get_font(None, 36)
     message = "Press Enter to Start"
     text = msg_font.render(message, True, (255, 255, 255))
     rect = text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
-    screen.blit(text, rect)
+    scene.add("start message", rect, message, lambda surface: surface.blit(text, rect))
+
+def draw_status_message(message):
+    """
+    Adds a message under the deck, e.g. to explain why a move was refused.
+    """
+    msg_font = get_font(None, 24)
+    text = msg_font.render(message, True, (255, 255, 255))
+    rect = text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + CARD_HEIGHT // 2 + 30))
+    scene.add("status message", rect, message, lambda surface: surface.blit(text, rect))
 
 def show_ranking_screen(ranking, players):
     pygame.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Game Over - Rankings")
-    clock = pygame.time.Clock()
     font_large = pygame.font.SysFont(None, 40)
     font_title = pygame.font.SysFont(None, 60)
 
+    # The rankings do not change, so the screen is only redrawn when an event wakes the loop up
     while True:
         screen.fill(BG_COLOR)
 
@@ -185,21 +271,32 @@ def show_ranking_screen(ranking, players):
             label = font_large.render(f"{position}. {name_cap}   Score: {score}", True, (255, 255, 255))
             screen.blit(label, (WIDTH // 2 - label.get_width() // 2, 120 + i * 50))
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-
         pygame.display.flip()
-        clock.tick(60)
+
+        event = pygame.event.wait()
+        if event.type == pygame.QUIT:
+            pygame.quit()
+            sys.exit()
 
 
 # --- Main Game Loop ---
 def main():
+    init_display()
+    if param.instrumentation:
+        instrumentation.enable()
+        instrumentation.instrument_functions(sys.modules[__name__], LOOP_FUNCTIONS, "qdutch")
+        instrumentation.instrument_functions(card_renderer, ["render_card_front", "render_card_back"])
+        # The window is closed with sys.exit
+        atexit.register(instrumentation.save, param.instrumentation)
+
     game = QDutch()
     game.start_game()
     game.init_routine()
     players = game.players
+    # The slot operations run on a worker thread, the window keeps rendering while they are simulated
+    worker = ActionWorker(game)
+    if param.instrumentation:
+        instrumentation.register_gauges("action_worker", worker.stats)
 
     turn_no = 0
     player_no = 0
@@ -211,22 +308,32 @@ def main():
     drew_from_deck = False
     selected_card = None
     can_click_player_cards = False
+    # First card clicked for an Entangle card
+    entangle_first = None
     player_done = False
     measured_card_displayed = False
     measured_card_value = None
     measured_target = None
     pending_player_done = False
+    card1 = card2 = None
     card1_preview = None
     card2_preview = None
+    # Shown under the deck until the next move, e.g. when a move is refused
+    status_message = None
+
+    # Mouse motion does not change the table and would wake up the idle loop
+    pygame.event.set_blocked(pygame.MOUSEMOTION)
 
     while True:
         # --- Game end condition ---
         if dutch_turn is not None and turn_no == dutch_turn + 1 and player_no == player_dutch:
+            worker.wait()
             game.end_routine()
+            scene.begin()
             draw_table_with_states(players, show_states, True)
             draw_player_labels(True, None)
 
-            pygame.display.flip()
+            present()
             pygame.time.delay(2000)  # Wait for 2 seconds to show the final state
 
             ranking = game.get_ranking()
@@ -236,7 +343,8 @@ def main():
 
         # --- Display measured card alone ---
         if measured_card_displayed:
-            # Redraw the full table and card positions as usual
+            # Describe the full table and card positions as usual, only the changes are redrawn
+            scene.begin()
             draw_table_with_states(players, show_states=False)
             draw_player_labels(False, player_no)
             draw_center_elements()
@@ -259,19 +367,22 @@ def main():
                 x = WIDTH - 40 - CARD_HEIGHT // 2
                 y = HEIGHT // 2 + 1.5 * (CARD_WIDTH + CARD_SPACING) - target_card_index * (CARD_WIDTH + CARD_SPACING)
 
-            # Draw the state value above the card
-            value_int = game.apply_operator_card(target_player, target_card_index, selected_card)
+            # Draw the state value above the card. The measurement was done when the card was
+            # clicked, the frames only display its result.
             bits = [None, None, None]
-            bits[selected_card.data] = value_int
-            draw_card_front(screen, bits, (x, y), (CARD_WIDTH, CARD_HEIGHT),  0)
+            bits[selected_card.data] = measured_card_value
+            add_card("measured card", bits, (x, y), 0)
 
-            pygame.display.flip()
+            idle = not present()
 
             # Block input until Enter or click
-            for event in pygame.event.get():
+            for event in get_events(idle):
                 if event.type == pygame.QUIT:
+                    worker.shutdown()
                     pygame.quit()
                     sys.exit()
+                elif event.type == pygame.VIDEOEXPOSE:
+                    scene.invalidate()
                 elif event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
                     measured_card_displayed = False
                     measured_target = None
@@ -282,11 +393,14 @@ def main():
 
 
         # --- Normal game drawing ---
+        scene.begin()
         draw_table_with_states(players, show_states)
         if not show_states:
             draw_center_elements()
         else:
             draw_start_message()
+        if status_message:
+            draw_status_message(status_message)
         
         if drew_from_deck and not selected_card and card1_preview and card2_preview:
             # Coordinates for temporary card preview
@@ -297,26 +411,68 @@ def main():
             bits2 = card2_preview.data
             if card1_preview.type == "State":
                 bits1 = list(f"{bits1:03b}")
+            elif card1_preview.type == "Entangle":
+                bits1 = entangle_labels(bits1)
             if card2_preview.type == "State":
                 bits2 = list(f"{bits2:03b}")
-            draw_card_front(screen, bits1, (x1+135, y), (CARD_WIDTH, CARD_HEIGHT), 0, card_type=card1_preview.type)
-            draw_card_front(screen, bits2, (x2+135, y), (CARD_WIDTH, CARD_HEIGHT), 0, card_type=card2_preview.type)
+            elif card2_preview.type == "Entangle":
+                bits2 = entangle_labels(bits2)
+            add_card("preview 1", bits1, (x1+135, y), 0, card_type=card1_preview.type)
+            add_card("preview 2", bits2, (x2+135, y), 0, card_type=card2_preview.type)
 
         draw_player_labels(show_states, player_no)
 
+        idle = not present()
+
         # --- Event handling ---
-        for event in pygame.event.get():
+        for event in get_events(idle):
             if event.type == pygame.QUIT:
+                worker.shutdown()
                 pygame.quit()
                 sys.exit()
 
+            elif event.type == pygame.VIDEOEXPOSE:
+                scene.invalidate()
+
+            elif event.type == ACTION_DONE:
+                worker.handled()
+                kind, player, card_index = event.tag
+                if event.error is not None:
+                    # The move is refused, e.g. an Entangle card on a backend that cannot merge
+                    # the slots, and the player chooses again
+                    logger.error("The %s action failed", kind, exc_info=event.error)
+                    status_message = f"The move failed: {event.error}"
+                    if kind == "draw":
+                        drew_from_deck = False
+                    elif kind == "dutch":
+                        dutch_call = False
+                        player_dutch = None
+                        dutch_turn = None
+                    elif kind != "next":
+                        can_click_player_cards = True
+                elif kind == "draw":
+                    card1, card2 = event.result
+                    card1_preview = card1
+                    card2_preview = card2
+                    logger.debug("Drew %s and %s", card1, card2)
+                elif kind == "next":
+                    pass
+                elif kind == "measurement":
+                    measured_card_value = event.result
+                    measured_target = (player, card_index)
+                    measured_card_displayed = True
+                    pending_player_done = True
+                else:
+                    player_done = True
+
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_RETURN and not showed_initial_states:
                     show_states = False
                     showed_initial_states = True
 
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                if not show_states:
+                # No new move while the previous one is simulated
+                if not show_states and not worker.busy:
                     mx, my = pygame.mouse.get_pos()
 
                     # --- Center interactions ---
@@ -325,74 +481,90 @@ def main():
 
                             if not drew_from_deck and not dutch_call:
                                 if label == "Dutch":
-                                    game.call_dutch()
-                                    print("Dutch called")
+                                    # The turn ends when the call is recorded by the worker
+                                    worker.submit("call_dutch", tag=("dutch", player_no, None))
+                                    logger.debug("Player %d called Dutch", player_no + 1)
                                     dutch_call = True
                                     player_dutch = player_no
                                     dutch_turn = turn_no
-                                    player_done = True
                                     break
 
                             if not drew_from_deck and label == "deck":
-                                card1, card2 = game.draw_cards()
-                                card1_preview = card1
-                                card2_preview = card2
+                                # The cards are shown when the worker drew them
+                                worker.submit("draw_cards", tag=("draw", player_no, None))
                                 drew_from_deck = True
-                                print(f"Card 1: {card1}, Card 2: {card2}")
+                                card1 = card2 = None
 
-                            elif drew_from_deck and not selected_card:
+                            elif drew_from_deck and not selected_card and card1 is not None:
                                 if label == "card 1":
                                     selected_card = card1
                                     card1_preview = None
                                     card2_preview = None
-                                    print("Card 1 clicked")
+                                    logger.debug("Card 1 selected")
                                 elif label == "card 2":
                                     selected_card = card2
                                     card1_preview = None
                                     card2_preview = None
-                                    print("Card 2 clicked")
+                                    logger.debug("Card 2 selected")
                             can_click_player_cards = True
 
                     # --- Player card clicks ---
                     if can_click_player_cards:
                         for rect, player, card_index in card_buttons:
                             if rect.collidepoint((mx, my)):
-                                print(f"Player {player + 1} clicked card {card_index + 1}")
+                                logger.debug("Player %d clicked card %d", player + 1, card_index + 1)
+                                status_message = None
                                 
+                                # The result comes back as an ACTION_DONE event
                                 if selected_card.type == "Measurement":
-                                    measured_card_value = game.apply_operator_card(player, card_index, selected_card)
-                                    measured_target = (player, card_index)
-                                    measured_card_displayed = True
-                                    pending_player_done = True
+                                    worker.submit("apply_operator_card", player, card_index, selected_card,
+                                                  tag=("measurement", player, card_index))
                                     can_click_player_cards = False
                                     break
                                 elif selected_card.type == "Operator":
-                                    game.apply_operator_card(player, card_index, selected_card)
-                                    player_done = True
+                                    worker.submit("apply_operator_card", player, card_index, selected_card,
+                                                  tag=("operator", player, card_index))
+                                    can_click_player_cards = False
+                                    break
+
+                                elif selected_card.type == "Entangle":
+                                    # The card links the two clicked cards
+                                    if entangle_first is None:
+                                        entangle_first = (player, card_index)
+                                        break
+                                    if entangle_first == (player, card_index):
+                                        status_message = "Cannot entangle a card with itself."
+                                        continue
+                                    worker.submit("apply_entangle_card", *entangle_first, player, card_index, selected_card,
+                                                  tag=("entangle", player, card_index))
+                                    entangle_first = None
+                                    can_click_player_cards = False
                                     break
 
                                 elif selected_card.type == "State":
                                     if player == player_no:
-                                        game.apply_state_card(card_index, selected_card)
-                                        player_done = True
+                                        worker.submit("apply_state_card", card_index, selected_card,
+                                                      tag=("state", player, card_index))
+                                        can_click_player_cards = False
                                         break
                                     else:
-                                        print("Cannot apply state card to another player.")
+                                        status_message = "Cannot apply state card to another player."
                                         continue
 
         # --- End-of-turn update ---
         if player_done:
             player_no = (player_no + 1) % 4
-            game.next_player()
+            worker.submit("next_player", tag=("next", player_no, None))
             if player_no == 0:
                 turn_no += 1
 
             drew_from_deck = False
             selected_card = None
             can_click_player_cards = False
+            entangle_first = None
             player_done = False
+            status_message = None
 
-        pygame.display.flip()
         clock.tick(60)
 
 
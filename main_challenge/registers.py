@@ -0,0 +1,393 @@
+"""
+Quantum registers shared by entangled player slots.
+
+An Entangle card applies a two qubit gate between a qubit of one slot and a qubit of another one,
+possibly of another player. The slots keep their own small backend until such a gate entangles
+them: the RegisterManager then merges their states into one cluster, a state vector over the
+qubits of all its slots, and each slot gets a ClusterView backend acting on its qubits of the
+cluster. After every gate and measurement, the slots whose qubits are no longer entangled with
+the rest of the cluster are split from it and get their own backend back, so the memory only
+grows with the size of the largest entangled cluster.
+
+Layout of a cluster of k slots of n qubits: slot i holds the qubits i*n to (i+1)*n - 1 of the
+cluster, the qubit 0 being the least significant bit of the index of the amplitudes.
+
+The backend of the slots must give their state vectors to merge them and support set_statevector
+to split them, and the clusters are not noisy: Entangle cards are refused on stabilizer, density
+matrix and noisy trajectory slots (see check_backend and parameters.backend).
+"""
+import numpy as np
+import parameters as param
+from statevector_backend import apply_local_unitary, local_operator, operator_unitary
+
+
+# Gates written on the two qubits of each Entangle card, the first one on the first slot
+ENTANGLE_GATES = {
+    "CNOT": ("C", "X"),
+    "SWAP": ("SWAP", "SWAP"),
+    "H_CNOT": ("HC", "X"),
+}
+
+# Second singular value below which a slot is separable from the rest of its cluster
+SEPARABLE_TOLERANCE = 1e-6
+
+
+def check_backend(backend_class) -> None:
+    """
+    Checks that the slots of a backend can be entangled, and raises a ValueError otherwise.
+
+    Args:
+        backend_class (type): The backend of the slots, e.g. load_backend(parameters.backend).
+    """
+    from noise_backend import NoisyBackend
+
+    if not (backend_class.pure and backend_class.settable):
+        raise ValueError(f"Entangle cards cannot be played on the slots of {backend_class.__name__}, "
+                         "use the numpy, aer, table, tensor or trajectory backend.")
+    if issubclass(backend_class, NoisyBackend) and any(param.noise.values()):
+        raise ValueError("Entangle cards cannot be played on noisy slots, the clusters are not noisy.")
+
+
+class Cluster:
+    """
+    State vector of entangled slots. The amplitudes are never modified in place, so the
+    snapshots of the views share them without any copy.
+    """
+    def __init__(self, views, psi):
+        """
+        Args:
+            views (list[ClusterView]): The views of the slots of the cluster, in qubit order.
+            psi (np.ndarray): The amplitudes over the qubits of all the slots.
+        """
+        self.views = views
+        self.psi = psi
+
+    @property
+    def num_qubits(self) -> int:
+        return sum(view.num_qubits for view in self.views)
+
+    def qubit(self, view, nb) -> int:
+        """
+        Finds the qubit of the cluster holding a qubit of a slot.
+
+        Args:
+            view (ClusterView): The view of the slot.
+            nb (int): The index of the qubit in the slot.
+
+        Returns:
+            int: The index of the qubit in the cluster.
+        """
+        return sum(other.num_qubits for other in self.views[:self.views.index(view)]) + nb
+
+    def apply(self, unitary, qubits) -> None:
+        """
+        Applies a unitary on some qubits of the cluster.
+
+        Args:
+            unitary (np.ndarray): The 2**k x 2**k unitary, qubits[0] being its least significant bit.
+            qubits (tuple[int, ...]): The k qubits of the cluster.
+        """
+        self.psi = apply_local_unitary(self.psi, unitary, qubits, self.num_qubits)
+
+    def _slot_matrix(self, view) -> np.ndarray:
+        # Amplitudes as a (slot values, values of the other qubits) matrix
+        n, total = view.num_qubits, self.num_qubits
+        first = self.qubit(view, 0)
+        # The first axis of the tensor is the most significant bit
+        axes = [total - 1 - q for q in range(first + n - 1, first - 1, -1)]
+        tensor = np.moveaxis(self.psi.reshape((2,) * total), axes, list(range(n)))
+        return tensor.reshape(2**n, -1)
+
+    def probabilities(self, view) -> np.ndarray:
+        """
+        Computes the probability of each value of one slot.
+
+        Args:
+            view (ClusterView): The view of the slot.
+
+        Returns:
+            np.ndarray: The probability of each of the 2**num_qubits values of the slot.
+        """
+        return (np.abs(self._slot_matrix(view))**2).sum(axis=1)
+
+    def project(self, view, mask) -> None:
+        """
+        Projects the cluster on the values of one slot where mask is True and normalizes it.
+
+        Args:
+            view (ClusterView): The view of the slot.
+            mask (np.ndarray): (2**num_qubits,) the kept values of the slot.
+        """
+        n, total = view.num_qubits, self.num_qubits
+        first = self.qubit(view, 0)
+        values = np.arange(2**total)
+        kept = mask[(values >> first) & (2**n - 1)]
+        psi = np.where(kept, self.psi, 0)
+        self.psi = psi / np.linalg.norm(psi)
+
+    def split(self) -> None:
+        """
+        Gives back their own backend to the slots that are not entangled with the rest of the
+        cluster anymore. A slot is separable when the matrix of its amplitudes against the other
+        qubits has rank 1, its state is then the first singular vector.
+        """
+        for view in list(self.views):
+            if len(self.views) == 1:
+                view.detach(self.psi)
+                self.views = []
+                return
+
+            u, s, vh = np.linalg.svd(self._slot_matrix(view), full_matrices=False)
+            if s[1] > SEPARABLE_TOLERANCE:
+                continue
+
+            # The remaining qubits keep their order
+            self.views.remove(view)
+            self.psi = s[0] * vh[0]
+            view.detach(u[:, 0])
+
+
+class ClusterView:
+    """
+    Backend of a slot entangled with other slots: the operations act on the qubits of the slot in
+    the state vector of its cluster.
+    """
+    # Whether set_statevector can load the states of the game, e.g. from a snapshot
+    settable = True
+    # Whether the state is always pure, so statevector never fails. The slot is only a part of the
+    # state of its cluster.
+    pure = False
+    # Read by PlayerSlot.entangled
+    entangled = True
+
+    def __init__(self, slot, home, cluster=None):
+        """
+        Args:
+            slot (PlayerSlot): The slot.
+            home: The backend of the slot while it is not entangled, given back by detach.
+            cluster (Cluster | None): The cluster of the slot.
+        """
+        self.slot = slot
+        self.home = home
+        self.num_qubits = home.num_qubits
+        self.rng = home.rng
+        self.cluster = cluster
+
+    def detach(self, amplitudes) -> None:
+        """
+        Gives back its own backend to the slot, in a state split from the cluster.
+
+        Args:
+            amplitudes (np.ndarray): The amplitudes of the slot.
+        """
+        self.home.set_statevector(amplitudes)
+        self.slot.backend = self.home
+
+    def apply_operator(self, operator: list[str]) -> None:
+        """
+        Applies a quantum operator to the qubits of the slot. A local operator never changes the
+        entanglement, so the cluster is not split.
+
+        Args:
+            operator (list[str]): The quantum operator to apply.
+        """
+        unitary, qubits = local_operator(tuple(operator))
+        if qubits:
+            self.cluster.apply(unitary, tuple(self.cluster.qubit(self, q) for q in qubits))
+
+    def measure(self, nb) -> int:
+        """
+        Measures one qubit of the slot, collapses the cluster and splits the slots that became
+        separable.
+
+        Args:
+            nb (int): The index of the qubit to measure.
+
+        Returns:
+            int: The measured bit.
+        """
+        cluster = self.cluster
+        mask = (np.arange(2**self.num_qubits) >> nb) & 1 == 1
+        p1 = float(cluster.probabilities(self)[mask].sum())
+        bit = int(self.rng.random() < p1)
+
+        cluster.project(self, mask if bit else ~mask)
+        cluster.split()
+        return bit
+
+    def measure_all(self) -> int:
+        """
+        Measures all the qubits of the slot, which always splits it from the cluster.
+
+        Returns:
+            int: The measured value.
+        """
+        cluster = self.cluster
+        cumulative = np.cumsum(cluster.probabilities(self))
+        value = int(np.searchsorted(cumulative, self.rng.random() * cumulative[-1], side="right"))
+        value = min(value, 2**self.num_qubits - 1)
+
+        cluster.project(self, np.arange(2**self.num_qubits) == value)
+        cluster.split()
+        return value
+
+    def probabilities(self) -> np.ndarray:
+        """
+        Computes the probability of each value of the slot, the marginal of the cluster.
+
+        Returns:
+            np.ndarray: The probability of each of the 2**num_qubits values.
+        """
+        return self.cluster.probabilities(self)
+
+    def set_state(self, state: int) -> None:
+        """
+        Replaces the card of the slot. Its qubits are measured first, which splits it from the
+        cluster and collapses the slots it was entangled with.
+
+        Args:
+            state (int): The index of the basis state.
+        """
+        self.measure_all()
+        self.home.set_state(state)
+
+    def set_statevector(self, amplitudes) -> None:
+        """
+        Replaces the state of the slot, measuring its qubits first (see set_state).
+
+        Args:
+            amplitudes (np.ndarray): The 2**num_qubits amplitudes.
+        """
+        self.measure_all()
+        self.home.set_statevector(amplitudes)
+
+    def snapshot(self):
+        """
+        Saves the state of the whole cluster. The amplitudes are shared without any copy.
+
+        Returns:
+            tuple: The views of the cluster and its amplitudes.
+        """
+        return tuple(self.cluster.views), self.cluster.psi
+
+    def restore(self, state) -> None:
+        """
+        Restores a state saved by snapshot.
+
+        Args:
+            state (tuple): The saved state.
+        """
+        views, self.cluster.psi = state
+        self.cluster.views = list(views)
+
+    @property
+    def statevector(self) -> np.ndarray:
+        raise ValueError("The slot is entangled with other slots, it has no state vector of its own.")
+
+    def to_circuit(self):
+        raise ValueError("The slot is entangled with other slots, it has no circuit of its own.")
+
+
+class RegisterManager:
+    """
+    Merges the states of the slots linked by Entangle cards and keeps track of the size of the
+    clusters.
+    """
+    def __init__(self):
+        # Largest number of qubits of a cluster since the creation of the manager
+        self.max_cluster_qubits = 0
+
+    def check(self, slot_a, slot_b) -> None:
+        """
+        Checks that two slots can be linked by an Entangle card, before changing them.
+
+        Args:
+            slot_a (PlayerSlot): The first slot.
+            slot_b (PlayerSlot): The second slot.
+        """
+        if slot_a is slot_b:
+            raise ValueError("An Entangle card links two different slots.")
+        for slot in (slot_a, slot_b):
+            backend = slot.backend.home if isinstance(slot.backend, ClusterView) else slot.backend
+            check_backend(type(backend))
+
+    def view(self, slot) -> ClusterView:
+        """
+        Puts a slot in a cluster, alone if it is not entangled yet.
+
+        Args:
+            slot (PlayerSlot): The slot.
+
+        Returns:
+            ClusterView: The view of the slot.
+        """
+        if isinstance(slot.backend, ClusterView):
+            return slot.backend
+
+        view = ClusterView(slot, slot.backend)
+        view.cluster = Cluster([view], np.asarray(view.home.statevector, dtype=complex))
+        slot.backend = view
+        return view
+
+    def merge(self, slot_a, slot_b) -> Cluster:
+        """
+        Merges the clusters of two slots. The cluster of slot_b is appended to the one of slot_a.
+        The merged cluster gets new views, so the snapshots of the former views still restore
+        the former clusters.
+
+        Args:
+            slot_a (PlayerSlot): The first slot.
+            slot_b (PlayerSlot): The second slot.
+
+        Returns:
+            Cluster: The merged cluster.
+        """
+        first, second = self.view(slot_a).cluster, self.view(slot_b).cluster
+        if first is second:
+            views, psi = first.views, first.psi
+        else:
+            views = first.views + second.views
+            # The qubits of the second cluster are the most significant ones
+            psi = np.kron(second.psi, first.psi)
+
+        cluster = Cluster([], psi)
+        for view in views:
+            new_view = ClusterView(view.slot, view.home, cluster)
+            view.slot.backend = new_view
+            cluster.views.append(new_view)
+
+        self.max_cluster_qubits = max(self.max_cluster_qubits, cluster.num_qubits)
+        return cluster
+
+    def entangle(self, slot_a, slot_b, data) -> None:
+        """
+        Applies the two qubit gate of an Entangle card between two slots.
+
+        Args:
+            slot_a (PlayerSlot): The slot of the first qubit of the gate.
+            slot_b (PlayerSlot): The slot of the second qubit of the gate.
+            data (list): The data of the card: the gate (see ENTANGLE_GATES), the qubit of
+                slot_a and the qubit of slot_b.
+        """
+        gate, qubit_a, qubit_b = data
+        self.check(slot_a, slot_b)
+
+        cluster = self.merge(slot_a, slot_b)
+        qubits = (cluster.qubit(slot_a.backend, qubit_a), cluster.qubit(slot_b.backend, qubit_b))
+        cluster.apply(operator_unitary(list(ENTANGLE_GATES[gate]), 2), qubits)
+        # The gate may not have entangled the slots, e.g. a CNOT with its control in |0>
+        cluster.split()
+
+    def entangled_slots(self, slot) -> list:
+        """
+        Lists the slots entangled with a slot, itself included.
+
+        Args:
+            slot (PlayerSlot): The slot.
+
+        Returns:
+            list[PlayerSlot]: The slots of its cluster.
+        """
+        if isinstance(slot.backend, ClusterView):
+            return [view.slot for view in slot.backend.cluster.views]
+        return [slot]
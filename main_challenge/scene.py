@@ -0,0 +1,99 @@
+"""
+Retained-mode scene of the QDutch table.
+
+The drawing functions of qdutch.py do not draw on the screen directly. Each frame, they describe
+the table as items (cards, labels, buttons) with a key, the rect they cover, a signature of their
+content and the function drawing them. The scene compares the items with the ones of the previous
+frame and only redraws the regions that changed. These regions are returned by render() so that
+they can be pushed with pygame.display.update(rects).
+"""
+import pygame
+
+
+class Scene:
+    """
+    Items of the current frame and of the previous one, in drawing order.
+    """
+    def __init__(self, surface, bg_color):
+        """
+        Initializes an empty scene. The first render redraws the whole surface.
+
+        Args:
+            surface (pygame.Surface): The surface the scene is drawn on.
+            bg_color (tuple[int, int, int]): The color behind the items.
+        """
+        self.surface = surface
+        self.bg_color = bg_color
+        self.items = {}
+        self._previous = {}
+        self._full_redraw = True
+
+    def begin(self) -> None:
+        """
+        Starts the description of a new frame.
+        """
+        self._previous, self.items = self.items, {}
+
+    def add(self, key, rect, signature, draw) -> None:
+        """
+        Adds an item to the current frame. The items are drawn in the order they are added.
+
+        Args:
+            key (hashable): Identifies the item from one frame to the next.
+            rect (pygame.Rect): The region covered by the item.
+            signature (hashable): The content of the item. The item is redrawn when it changes.
+            draw (Callable[[pygame.Surface], None]): Draws the item on a surface.
+        """
+        self.items[key] = (pygame.Rect(rect), signature, draw)
+
+    def invalidate(self) -> None:
+        """
+        Redraws the whole surface on the next render, e.g. after another screen was displayed.
+        """
+        self._full_redraw = True
+
+    def dirty_rects(self) -> list[pygame.Rect]:
+        """
+        Finds the regions that changed since the previous frame.
+
+        Returns:
+            list[pygame.Rect]: The regions covered by the items that were added, removed, moved or
+            whose signature changed.
+        """
+        if self._full_redraw:
+            return [self.surface.get_rect()]
+
+        rects = []
+        for key, (rect, signature, _) in self.items.items():
+            previous = self._previous.get(key)
+            if previous is None or previous[1] != signature:
+                rects.append(rect)
+            if previous is not None and previous[0] != rect:
+                rects.extend([previous[0], rect])
+
+        for key, (rect, _, _) in self._previous.items():
+            if key not in self.items:
+                rects.append(rect)
+
+        return rects
+
+    def render(self) -> list[pygame.Rect]:
+        """
+        Redraws the regions that changed: the background is filled and the items overlapping the
+        region are drawn again, clipped to the region.
+
+        Returns:
+            list[pygame.Rect]: The redrawn regions, empty when nothing changed.
+        """
+        rects = self.dirty_rects()
+        self._full_redraw = False
+
+        for rect in rects:
+            self.surface.set_clip(rect)
+            self.surface.fill(self.bg_color)
+            for item_rect, _, draw in self.items.values():
+                if item_rect.colliderect(rect):
+                    draw(self.surface)
+        self.surface.set_clip(None)
+
+        return rects
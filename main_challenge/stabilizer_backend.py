@@ -0,0 +1,288 @@
+import numpy as np
+from gates import parse_operator
+
+
+class StabilizerBackend:
+    """
+    Simulates a player slot with a stabilizer tableau (Aaronson-Gottesman).
+
+    All the operator cards are Clifford and all the state cards are computational basis states, so
+    the state of a slot can always be described by n stabilizer and n destabilizer generators.
+    The tableau stores their X and Z bits and their signs: the rows 0 to n-1 are the
+    destabilizers, the rows n to 2n-1 are the stabilizers and the last row is a scratch row used
+    by the deterministic measurements. Gates cost O(n) bit operations and measurements O(n^2),
+    which allows slots with a very large number of qubits.
+    """
+    # Whether set_statevector can load the states of the game, e.g. from a snapshot
+    settable = False
+    # Whether the state is always pure, so statevector never fails
+    pure = True
+
+    def __init__(self, num_qubits, rng=None):
+        """
+        Initializes the backend in the state |0...0>.
+
+        Args:
+            num_qubits (int): The number of qubits of the slot.
+            rng (numpy.random.Generator | None): Generator used to sample the measurements.
+        """
+        self.num_qubits = num_qubits
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.set_state(0)
+
+    # --- Gates ---
+    def h(self, q):
+        self.r ^= self.x[:, q] & self.z[:, q]
+        self.x[:, q], self.z[:, q] = self.z[:, q].copy(), self.x[:, q].copy()
+
+    def x_gate(self, q):
+        self.r ^= self.z[:, q]
+
+    def z_gate(self, q):
+        self.r ^= self.x[:, q]
+
+    def s(self, q):
+        self.r ^= self.x[:, q] & self.z[:, q]
+        self.z[:, q] ^= self.x[:, q]
+
+    def cx(self, control, target):
+        self.r ^= self.x[:, control] & self.z[:, target] & ~(self.x[:, target] ^ self.z[:, control])
+        self.x[:, target] ^= self.x[:, control]
+        self.z[:, control] ^= self.z[:, target]
+
+    def swap(self, q1, q2):
+        self.x[:, [q1, q2]] = self.x[:, [q2, q1]]
+        self.z[:, [q1, q2]] = self.z[:, [q2, q1]]
+
+    def apply_operator(self, operator: list[str]) -> None:
+        """
+        Applies the gates of a quantum operator to the tableau.
+
+        Args:
+            operator (list[str]): The quantum operator to apply.
+        """
+        for gate_name, qubits in parse_operator(operator):
+            # The x and z attributes hold the tableau bits
+            if gate_name in ("x", "z"):
+                gate_name += "_gate"
+            getattr(self, gate_name)(*qubits)
+
+    # --- Measurements ---
+    def _rowsum(self, rows, i):
+        """
+        Multiplies the generators of the given rows by the generator of row i.
+
+        Args:
+            rows (np.ndarray | int): The rows to update.
+            i (int): The row to multiply with.
+        """
+        x1, z1 = self.x[i].astype(np.int8), self.z[i].astype(np.int8)
+        x2, z2 = self.x[rows].astype(np.int8), self.z[rows].astype(np.int8)
+
+        # Exponent of i picked up when multiplying the single qubit Pauli matrices
+        g = np.where(
+            x1 & z1, z2 - x2,
+            np.where(x1, z2 * (2*x2 - 1), np.where(z1, x2 * (1 - 2*z2), 0))
+        )
+        total = 2*self.r[rows].astype(np.int64) + 2*int(self.r[i]) + g.sum(axis=-1)
+
+        self.r[rows] = (total % 4) == 2
+        self.x[rows] ^= self.x[i]
+        self.z[rows] ^= self.z[i]
+
+    def measure(self, nb, outcome=None) -> int:
+        """
+        Measures one qubit in the computational basis and updates the tableau.
+
+        Args:
+            nb (int): The index of the qubit to measure.
+            outcome (int | None): Forces the outcome of a random measurement instead of sampling it.
+
+        Returns:
+            int: The measured bit.
+        """
+        n = self.num_qubits
+        anticommuting = np.flatnonzero(self.x[n:2*n, nb])
+
+        # Random outcome: a stabilizer anticommutes with Z_nb
+        if anticommuting.size:
+            p = n + anticommuting[0]
+            rows = np.flatnonzero(self.x[:2*n, nb])
+            rows = rows[rows != p]
+            if rows.size:
+                self._rowsum(rows, p)
+
+            self.x[p-n], self.z[p-n], self.r[p-n] = self.x[p], self.z[p], self.r[p]
+            self.x[p] = False
+            self.z[p] = False
+            self.z[p, nb] = True
+            self.r[p] = self.rng.random() < 0.5 if outcome is None else outcome
+            return int(self.r[p])
+
+        return self._deterministic_outcome(nb)
+
+    def _deterministic_outcome(self, nb) -> int:
+        """
+        Computes the outcome of measuring a qubit when no stabilizer anticommutes with Z_nb. Only
+        the scratch row of the tableau is modified.
+
+        Args:
+            nb (int): The index of the qubit.
+
+        Returns:
+            int: The measured bit.
+        """
+        # Z_nb is a product of stabilizers
+        n = self.num_qubits
+        scratch = 2*n
+        self.x[scratch] = False
+        self.z[scratch] = False
+        self.r[scratch] = False
+        for i in np.flatnonzero(self.x[:n, nb]):
+            self._rowsum(scratch, i + n)
+        return int(self.r[scratch])
+
+    def measure_all(self) -> int:
+        """
+        Measures all the qubits and collapses the state to the measured basis state.
+
+        Returns:
+            int: The measured value.
+        """
+        return sum(self.measure(q) << q for q in range(self.num_qubits))
+
+    def qubit_probabilities(self) -> np.ndarray:
+        """
+        Computes the probability of measuring 1 on each qubit from the tableau, without collapsing
+        the state: 1/2 when a stabilizer anticommutes with Z_q, else the deterministic outcome.
+
+        Returns:
+            np.ndarray: The probability of each of the num_qubits qubits to be measured as 1.
+        """
+        n = self.num_qubits
+        random = self.x[n:2*n].any(axis=0)
+        return np.array([0.5 if random[q] else self._deterministic_outcome(q) for q in range(n)], dtype=float)
+
+    def expected_value(self) -> float:
+        """
+        Computes the expected value without collapsing the state, from the qubit probabilities:
+        the value is linear in its bits.
+
+        Returns:
+            float: The expected value.
+        """
+        return float(self.qubit_probabilities() @ 2.0**np.arange(self.num_qubits))
+
+    def probabilities(self) -> np.ndarray:
+        """
+        Computes the probability of each value without collapsing the state. Each qubit with a
+        random outcome doubles the number of explored branches, so this is only practical when
+        the value can take a moderate number of values: the expected value and the qubit
+        probabilities of a slot are computed from the tableau instead.
+
+        Returns:
+            np.ndarray: The probability of each of the 2**num_qubits values.
+        """
+        n = self.num_qubits
+        probabilities = np.zeros(2**n)
+
+        # Depth-first exploration of the measurement outcomes, qubit by qubit
+        branches = [(self._copy(), 0, 0, 1.0)]
+        while branches:
+            tableau, q, value, prob = branches.pop()
+            if q == n:
+                probabilities[value] += prob
+                continue
+
+            if tableau.x[n:2*n, q].any():
+                other = tableau._copy()
+                tableau.measure(q, outcome=0)
+                other.measure(q, outcome=1)
+                branches.append((tableau, q + 1, value, prob / 2))
+                branches.append((other, q + 1, value | 1 << q, prob / 2))
+            else:
+                branches.append((tableau, q + 1, value | tableau.measure(q) << q, prob))
+
+        return probabilities
+
+    def _copy(self) -> "StabilizerBackend":
+        copy = StabilizerBackend.__new__(StabilizerBackend)
+        copy.num_qubits = self.num_qubits
+        copy.rng = self.rng
+        copy.x, copy.z, copy.r = self.x.copy(), self.z.copy(), self.r.copy()
+        return copy
+
+    def set_state(self, state: int) -> None:
+        """
+        Prepares a computational basis state.
+
+        Args:
+            state (int): The index of the basis state.
+        """
+        n = self.num_qubits
+        self.x = np.zeros((2*n + 1, n), dtype=bool)
+        self.z = np.zeros((2*n + 1, n), dtype=bool)
+        self.r = np.zeros(2*n + 1, dtype=bool)
+
+        # Destabilizers X_q and stabilizers (-1)^b_q Z_q
+        self.x[np.arange(n), np.arange(n)] = True
+        self.z[n + np.arange(n), np.arange(n)] = True
+        self.r[n:2*n] = [(state >> q) & 1 for q in range(n)]
+
+    def set_statevector(self, amplitudes) -> None:
+        """
+        Not supported: a tableau cannot be recovered from arbitrary amplitudes, see settable.
+        """
+        raise ValueError("The stabilizer backend cannot be set from amplitudes. Use the numpy, aer or table backend.")
+
+    def snapshot(self):
+        """
+        Saves the state of the slot.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: Copies of the tableau arrays x, z and r.
+        """
+        return self.x.copy(), self.z.copy(), self.r.copy()
+
+    def restore(self, state) -> None:
+        """
+        Restores a state saved by snapshot. The saved arrays are copied, so they can be restored
+        again.
+
+        Args:
+            state (tuple[np.ndarray, np.ndarray, np.ndarray]): The saved state.
+        """
+        self.x, self.z, self.r = (array.copy() for array in state)
+
+    def _clifford(self):
+        """
+        Returns:
+            qiskit.quantum_info.Clifford: The Clifford operator mapping |0...0> to the current state.
+        """
+        from qiskit.quantum_info import Clifford
+
+        n = self.num_qubits
+        return Clifford(np.hstack([self.x[:2*n], self.z[:2*n], self.r[:2*n, None]]))
+
+    def to_circuit(self):
+        """
+        Synthesizes a Clifford circuit preparing the current state from |0...0>.
+
+        Returns:
+            QuantumCircuit: The state preparation circuit.
+        """
+        from qiskit import QuantumCircuit
+
+        qc = QuantumCircuit(self.num_qubits, self.num_qubits)
+        qc.compose(self._clifford().to_circuit(), inplace=True)
+        return qc
+
+    @property
+    def statevector(self) -> np.ndarray:
+        """
+        np.ndarray: The amplitudes of the slot, up to a global phase. Only practical for a small
+        number of qubits.
+        """
+        from qiskit.quantum_info import Statevector
+
+        return Statevector(self._clifford().to_circuit()).data
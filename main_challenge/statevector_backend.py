@@ -0,0 +1,338 @@
+from functools import lru_cache
+
+import numpy as np
+from gates import parse_operator
+
+
+@lru_cache(maxsize=None)
+def _bit_indices(num_qubits):
+    """
+    Precomputes, for every qubit, the basis indices where the qubit is 0 and where it is 1.
+
+    Args:
+        num_qubits (int): The number of qubits.
+
+    Returns:
+        tuple[tuple[np.ndarray, np.ndarray], ...]: The (zeros, ones) index arrays of each qubit.
+    """
+    index = np.arange(2**num_qubits)
+    return tuple(
+        (index[(index >> q) & 1 == 0], index[(index >> q) & 1 == 1])
+        for q in range(num_qubits)
+    )
+
+
+class StatevectorBackend:
+    """
+    Simulates a player slot by holding its 2**num_qubits complex amplitudes directly.
+
+    Gates are applied in place with index permutations and phase multiplications, and the
+    measurements are sampled with a local NumPy generator. Qubit 0 is the least significant bit
+    of the basis indices, as in Qiskit.
+    """
+    # Whether set_statevector can load the states of the game, e.g. from a snapshot
+    settable = True
+    # Whether the state is always pure, so statevector never fails
+    pure = True
+
+    def __init__(self, num_qubits, rng=None):
+        """
+        Initializes the backend in the state |0...0>.
+
+        Args:
+            num_qubits (int): The number of qubits of the slot.
+            rng (numpy.random.Generator | None): Generator used to sample the measurements.
+        """
+        self.num_qubits = num_qubits
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self._bits = _bit_indices(num_qubits)
+        self.psi = np.zeros(2**num_qubits, dtype=complex)
+        self.psi[0] = 1
+
+    # --- Gates ---
+    def h(self, q):
+        zeros, ones = self._bits[q]
+        a = self.psi[zeros]
+        b = self.psi[ones]
+        self.psi[zeros] = (a + b) * np.sqrt(0.5)
+        self.psi[ones] = (a - b) * np.sqrt(0.5)
+
+    def x(self, q):
+        zeros, ones = self._bits[q]
+        self.psi[zeros], self.psi[ones] = self.psi[ones], self.psi[zeros]
+
+    def z(self, q):
+        self.psi[self._bits[q][1]] *= -1
+
+    def s(self, q):
+        self.psi[self._bits[q][1]] *= 1j
+
+    def cx(self, control, target):
+        ones = self._bits[control][1]
+        self.psi[ones] = self.psi[ones ^ (1 << target)]
+
+    def swap(self, q1, q2):
+        # Indices where q1 is 1 and q2 is 0, exchanged with the ones where q1 is 0 and q2 is 1
+        ones = self._bits[q1][1]
+        first = ones[(ones >> q2) & 1 == 0]
+        second = first ^ (1 << q1) ^ (1 << q2)
+        self.psi[first], self.psi[second] = self.psi[second], self.psi[first]
+
+    def apply_gates(self, operator: list[str]) -> None:
+        """
+        Applies the gates of a quantum operator to the state, one at a time.
+
+        Args:
+            operator (list[str]): The quantum operator to apply.
+        """
+        for gate_name, qubits in parse_operator(operator):
+            getattr(self, gate_name)(*qubits)
+
+    def apply_operator(self, operator: list[str]) -> None:
+        """
+        Applies a quantum operator to the state with its cached compiled form.
+
+        Args:
+            operator (list[str]): The quantum operator to apply.
+        """
+        self.psi[:] = compile_operator(tuple(operator), self.num_qubits).apply(self.psi)
+
+    # --- Measurements ---
+    def measure(self, nb) -> int:
+        """
+        Measures one qubit and collapses the state accordingly.
+
+        Args:
+            nb (int): The index of the qubit to measure.
+
+        Returns:
+            int: The measured bit.
+        """
+        zeros, ones = self._bits[nb]
+        p1 = float(np.sum(np.abs(self.psi[ones])**2))
+        bit = int(self.rng.random() < p1)
+
+        kept, dropped = (ones, zeros) if bit else (zeros, ones)
+        self.psi[dropped] = 0
+        self.psi[kept] /= np.sqrt(p1 if bit else 1 - p1)
+
+        return bit
+
+    def measure_all(self) -> int:
+        """
+        Measures all the qubits and collapses the state to the measured basis state.
+
+        Returns:
+            int: The measured value.
+        """
+        probabilities = np.abs(self.psi)**2
+        value = int(self.rng.choice(len(probabilities), p=probabilities / probabilities.sum()))
+        self.set_state(value)
+
+        return value
+
+    def probabilities(self) -> np.ndarray:
+        """
+        Computes the probability of each value without collapsing the state.
+
+        Returns:
+            np.ndarray: The probability of each of the 2**num_qubits values.
+        """
+        return np.abs(self.psi)**2
+
+    def set_state(self, state: int) -> None:
+        """
+        Prepares a computational basis state.
+
+        Args:
+            state (int): The index of the basis state.
+        """
+        self.psi[:] = 0
+        self.psi[state] = 1
+
+    def set_statevector(self, amplitudes) -> None:
+        """
+        Sets the amplitudes of the slot. They are normalized, so amplitudes stored with a lower
+        precision can be loaded.
+
+        Args:
+            amplitudes (np.ndarray): The 2**num_qubits amplitudes.
+        """
+        amplitudes = np.asarray(amplitudes, dtype=complex)
+        self.psi[:] = amplitudes / np.linalg.norm(amplitudes)
+
+    def snapshot(self) -> np.ndarray:
+        """
+        Saves the state of the slot.
+
+        Returns:
+            np.ndarray: A copy of the amplitudes, never modified afterwards.
+        """
+        return self.psi.copy()
+
+    def restore(self, state) -> None:
+        """
+        Restores a state saved by snapshot. The saved amplitudes are copied, so they can be
+        restored again.
+
+        Args:
+            state (np.ndarray): The saved state.
+        """
+        self.psi[:] = state
+
+    @property
+    def statevector(self) -> np.ndarray:
+        """
+        np.ndarray: A copy of the amplitudes of the slot.
+        """
+        return self.psi.copy()
+
+    def to_circuit(self):
+        """
+        Builds a circuit preparing the current state of the slot.
+
+        Returns:
+            QuantumCircuit: The state preparation circuit.
+        """
+        from qiskit import QuantumCircuit
+
+        qc = QuantumCircuit(self.num_qubits, self.num_qubits)
+        qc.initialize(self.psi, range(self.num_qubits))
+        return qc
+
+
+def operator_unitary(operator: list[str], num_qubits: int) -> np.ndarray:
+    """
+    Computes the unitary matrix of an operator card.
+
+    Args:
+        operator (list[str]): The quantum operator.
+        num_qubits (int): The number of qubits.
+
+    Returns:
+        np.ndarray: The 2**num_qubits x 2**num_qubits unitary matrix.
+    """
+    backend = StatevectorBackend(num_qubits)
+    unitary = np.zeros((2**num_qubits, 2**num_qubits), dtype=complex)
+    for column in range(2**num_qubits):
+        backend.set_state(column)
+        backend.apply_gates(operator)
+        unitary[:, column] = backend.psi
+
+    return unitary
+
+
+@lru_cache(maxsize=1024)
+def local_operator(operator: tuple[str, ...]) -> tuple[np.ndarray, tuple[int, ...]]:
+    """
+    Restricts an operator card to the qubits it acts on.
+
+    Args:
+        operator (tuple[str, ...]): The quantum operator.
+
+    Returns:
+        tuple[np.ndarray, tuple[int, ...]]: The 2**k x 2**k unitary of the card on its k qubits,
+        the first one being its least significant bit, and the k qubits.
+    """
+    qubits = tuple(q for q, gate_name in enumerate(operator) if gate_name != "I")
+    unitary = operator_unitary([operator[q] for q in qubits], len(qubits))
+    return unitary, qubits
+
+
+class CompiledOperator:
+    """
+    Operator card compiled into a single kernel, in one of three forms:
+        - "dense": the full 2**n x 2**n unitary, for a small number of qubits;
+        - "permutation": new_psi[k] = phases[k] * psi[permutation[k]], for the cards without H
+          gate, which only permute the amplitudes and multiply them by a phase;
+        - "local": the unitary of the card restricted to the qubits it acts on, contracted with
+          the corresponding axes of the state reshaped as a (2, ..., 2) tensor.
+    """
+    def __init__(self, form, num_qubits, **data):
+        self.form = form
+        self.num_qubits = num_qubits
+        self.unitary = data.get("unitary")
+        self.permutation = data.get("permutation")
+        self.phases = data.get("phases")
+        self.qubits = data.get("qubits")
+
+    def apply(self, psi) -> np.ndarray:
+        """
+        Applies the operator.
+
+        Args:
+            psi (np.ndarray): The amplitudes of the state.
+
+        Returns:
+            np.ndarray: The amplitudes after the operator.
+        """
+        if self.form == "dense":
+            return self.unitary @ psi
+
+        if self.form == "permutation":
+            return self.phases * psi[self.permutation]
+
+        return apply_local_unitary(psi, self.unitary, self.qubits, self.num_qubits)
+
+
+def apply_local_unitary(psi, unitary, qubits, num_qubits) -> np.ndarray:
+    """
+    Applies a unitary acting on a few qubits by contracting it with the corresponding axes of the
+    state reshaped as a (2, ..., 2) tensor.
+
+    Args:
+        psi (np.ndarray): The amplitudes of the state.
+        unitary (np.ndarray): The 2**k x 2**k unitary, qubits[0] being its least significant bit.
+        qubits (tuple[int, ...]): The k qubits the unitary acts on.
+        num_qubits (int): The number of qubits of the state.
+
+    Returns:
+        np.ndarray: The amplitudes after the unitary.
+    """
+    k = len(qubits)
+    # The first axis of the tensors is the most significant bit
+    axes = [num_qubits - 1 - q for q in reversed(qubits)]
+    tensor = np.tensordot(
+        unitary.reshape((2,) * 2*k), psi.reshape((2,) * num_qubits),
+        axes=(list(range(k, 2*k)), axes),
+    )
+    return np.moveaxis(tensor, list(range(k)), axes).reshape(-1)
+
+
+# Maximal number of qubits of the dense and permutation forms of the compiled operators
+DENSE_MAX_QUBITS = 6
+PERMUTATION_MAX_QUBITS = 16
+
+
+@lru_cache(maxsize=256)
+def compile_operator(operator: tuple[str, ...], num_qubits: int) -> CompiledOperator:
+    """
+    Compiles an operator card into a single kernel. The compiled operators are kept in an LRU
+    cache keyed by the tuple representation of the card, see compile_operator.cache_info().
+
+    Args:
+        operator (tuple[str, ...]): The quantum operator.
+        num_qubits (int): The number of qubits.
+
+    Returns:
+        CompiledOperator: The compiled operator.
+    """
+    if num_qubits <= DENSE_MAX_QUBITS:
+        return CompiledOperator("dense", num_qubits, unitary=operator_unitary(operator, num_qubits))
+
+    has_h = any(gate_name == "h" for gate_name, _ in parse_operator(operator))
+    if not has_h and num_qubits <= PERMUTATION_MAX_QUBITS:
+        # The amplitudes k + 1 are moved and multiplied by powers of i, which keeps them exact
+        backend = StatevectorBackend(num_qubits)
+        backend.psi = np.arange(1, 2**num_qubits + 1, dtype=complex)
+        backend.apply_gates(operator)
+        magnitudes = np.abs(backend.psi)
+        return CompiledOperator(
+            "permutation", num_qubits,
+            permutation=np.rint(magnitudes).astype(np.int64) - 1,
+            phases=backend.psi / magnitudes,
+        )
+
+    qubits = tuple(q for q, gate_name in enumerate(operator) if gate_name != "I")
+    local_operator = [operator[q] for q in qubits]
+    return CompiledOperator("local", num_qubits, unitary=operator_unitary(local_operator, len(qubits)), qubits=qubits)
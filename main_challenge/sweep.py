@@ -0,0 +1,236 @@
+"""
+Monte Carlo sweep over the card probabilities of parameters.py.
+
+Each configuration overrides some of the probabilities of parameters.py, plays a batch of
+simulated games with the headless simulator and is summarized by a few metrics (game length,
+score spread, how often "Dutch" is called and won). The configurations and their metrics are
+saved column by column in a .npz file, which can be loaded with pandas.DataFrame(dict(np.load(path))).
+
+A configuration is a flat dict. The keys state_prob, measurement_prob, single_qubit_prob and
+one_single_qubit_ratio map to the variables of parameters.py, and the keys gate_<name> (e.g.
+gate_H, gate_CNOT) map to the entries of parameters.gate_prob.
+
+Usage:
+    python sweep.py --random 200 --games 500 --out sweep.npz
+    python sweep.py --grid state_prob=0.2,0.3,0.4 measurement_prob=0.1,0.2 --games 500
+"""
+import argparse
+import copy
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import parameters as param
+from headless import POLICIES, play_game
+
+
+# Probabilities of parameters.py, restored before applying each configuration
+DEFAULTS = {
+    "state_prob": param.state_prob,
+    "measurement_prob": param.measurement_prob,
+    "entangle_prob": param.entangle_prob,
+    "single_qubit_prob": param.single_qubit_prob,
+    "one_single_qubit_ratio": param.one_single_qubit_ratio,
+    "gate_prob": copy.deepcopy(param.gate_prob),
+}
+
+METRICS = ("games", "mean_turns", "std_turns", "mean_score_spread", "dutch_call_rate", "dutch_win_rate")
+
+
+def to_overrides(config) -> dict:
+    """
+    Converts a flat configuration into keyword arguments of parameters.configure. The
+    probabilities missing from the configuration keep their default value.
+
+    Args:
+        config (dict): The configuration.
+
+    Returns:
+        dict: The overrides.
+    """
+    overrides = copy.deepcopy(DEFAULTS)
+    for name, value in config.items():
+        if name.startswith("gate_"):
+            gate = name[len("gate_"):]
+            group = next(group for group in overrides["gate_prob"].values() if gate in group)
+            group[gate] = value
+        else:
+            overrides[name] = value
+
+    return overrides
+
+
+def grid_configs(grid) -> list[dict]:
+    """
+    Builds all the combinations of a grid of values.
+
+    Args:
+        grid (dict[str, list[float]]): The values of each swept probability.
+
+    Returns:
+        list[dict]: The configurations.
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+
+def random_configs(num_configs, seed=0) -> list[dict]:
+    """
+    Draws random configurations covering all the card probabilities.
+
+    Args:
+        num_configs (int): The number of configurations.
+        seed (int): The seed of the draws.
+
+    Returns:
+        list[dict]: The configurations.
+    """
+    rng = np.random.default_rng(seed)
+    configs = []
+    for _ in range(num_configs):
+        state_prob, _, measurement_prob = rng.dirichlet([1, 1, 1])
+        config = {
+            "state_prob": float(state_prob),
+            "measurement_prob": float(measurement_prob),
+            "single_qubit_prob": float(rng.random()),
+        }
+        for group in param.gate_prob.values():
+            for gate, prob in zip(group, rng.dirichlet(np.ones(len(group)))):
+                config[f"gate_{gate}"] = float(prob)
+        configs.append(config)
+
+    return configs
+
+
+def run_batch(config, policy_names, seed_sequence, num_games, max_turns=50) -> dict:
+    """
+    Plays a batch of games with one configuration in a worker process.
+
+    Args:
+        config (dict): The configuration.
+        policy_names (list[str]): The name of the policy of each player (see headless.POLICIES).
+        seed_sequence (np.random.SeedSequence): The seed sequence of the batch.
+        num_games (int): The number of games.
+        max_turns (int): Maximal number of turns of a game.
+
+    Returns:
+        dict: Sums over the games, merged by summarize.
+    """
+    param.configure(**to_overrides(config))
+
+    sums = {"games": 0, "turns": 0, "turns_squared": 0, "score_spread": 0, "dutch_calls": 0, "dutch_wins": 0}
+    for seed in np.random.default_rng(seed_sequence).integers(2**63, size=num_games):
+        policies = [POLICIES[name]() for name in policy_names]
+        result = play_game(policies, int(seed), max_turns)
+
+        sums["games"] += 1
+        sums["turns"] += result["turns"]
+        sums["turns_squared"] += result["turns"]**2
+        sums["score_spread"] += max(result["scores"]) - min(result["scores"])
+        if result["dutch_player"] is not None:
+            sums["dutch_calls"] += 1
+            sums["dutch_wins"] += result["ranks"][result["dutch_player"]] == 1
+
+    return sums
+
+
+def summarize(sums) -> dict:
+    """
+    Computes the metrics of a configuration from the sums of its batches.
+
+    Args:
+        sums (dict): The merged sums returned by run_batch.
+
+    Returns:
+        dict: The metrics (see METRICS).
+    """
+    games = sums["games"]
+    mean_turns = sums["turns"] / games
+    return {
+        "games": games,
+        "mean_turns": mean_turns,
+        "std_turns": np.sqrt(max(sums["turns_squared"] / games - mean_turns**2, 0)),
+        "mean_score_spread": sums["score_spread"] / games,
+        "dutch_call_rate": sums["dutch_calls"] / games,
+        "dutch_win_rate": sums["dutch_wins"] / sums["dutch_calls"] if sums["dutch_calls"] else np.nan,
+    }
+
+
+def sweep(configs, out_path, policy_names=("greedy",) * 4, games=500, workers=None, seed=0,
+          batch_size=100, max_turns=50) -> dict:
+    """
+    Evaluates configurations in parallel and saves their metrics in a columnar .npz file.
+
+    Args:
+        configs (list[dict]): The configurations.
+        out_path (str): The output .npz file.
+        policy_names (list[str]): The name of the policy of each player (see headless.POLICIES).
+        games (int): The number of games per configuration.
+        workers (int | None): The number of worker processes. Defaults to the number of CPUs.
+        seed (int): The root seed of the sweep.
+        batch_size (int): The number of games played by a worker task.
+        max_turns (int): Maximal number of turns of a game.
+
+    Returns:
+        dict[str, np.ndarray]: The saved columns.
+    """
+    # Invalid configurations are reported before any game is played
+    for config in configs:
+        param.check_probabilities(**to_overrides(config))
+
+    starts = range(0, games, batch_size)
+    totals = [None] * len(configs)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for i, (config, config_seed) in enumerate(zip(configs, np.random.SeedSequence(seed).spawn(len(configs)))):
+            for start, batch_seed in zip(starts, config_seed.spawn(len(starts))):
+                future = executor.submit(run_batch, config, list(policy_names), batch_seed,
+                                         min(batch_size, games - start), max_turns)
+                futures[future] = i
+
+        for future in as_completed(futures):
+            i = futures[future]
+            sums = future.result()
+            totals[i] = sums if totals[i] is None else {name: totals[i][name] + sums[name] for name in sums}
+
+    metrics = [summarize(sums) for sums in totals]
+    names = sorted({name for config in configs for name in config})
+    columns = {name: np.array([config.get(name, np.nan) for config in configs], dtype=float) for name in names}
+    columns.update({name: np.array([row[name] for row in metrics]) for name in METRICS})
+
+    np.savez(out_path, **columns)
+    return columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo sweep over the QDutch card probabilities.")
+    search = parser.add_mutually_exclusive_group(required=True)
+    search.add_argument("--grid", nargs="+", metavar="NAME=V1,V2",
+                        help="Values of each swept probability, e.g. state_prob=0.2,0.3.")
+    search.add_argument("--random", type=int, metavar="N", help="Number of random configurations.")
+    parser.add_argument("--games", type=int, default=500, help="Number of games per configuration.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes.")
+    parser.add_argument("--policies", nargs="+", default=["greedy"] * 4, choices=list(POLICIES),
+                        help="Policy of each player.")
+    parser.add_argument("--seed", type=int, default=0, help="Root seed of the sweep.")
+    parser.add_argument("--batch-size", type=int, default=100, help="Number of games per worker task.")
+    parser.add_argument("--max-turns", type=int, default=50, help="Maximal number of turns of a game.")
+    parser.add_argument("--out", default="sweep.npz", help="Output .npz file.")
+    args = parser.parse_args()
+
+    if args.grid:
+        grid = {}
+        for item in args.grid:
+            name, values = item.split("=")
+            grid[name] = [float(value) for value in values.split(",")]
+        configs = grid_configs(grid)
+    else:
+        configs = random_configs(args.random, args.seed)
+
+    sweep(configs, args.out, args.policies, args.games, args.workers, args.seed, args.batch_size, args.max_turns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import numpy as np
+from transition_tables import get_tables
+
+
+class TableBackend:
+    """
+    Simulates a player slot with lookups in the precomputed transition tables.
+
+    The state of the slot is only its index in the tables, so applying an operator card and
+    measuring are O(1) operations.
+    """
+    # Whether set_statevector can load the states of the game, e.g. from a snapshot
+    settable = True
+    # Whether the state is always pure, so statevector never fails
+    pure = True
+
+    def __init__(self, num_qubits, rng=None):
+        """
+        Initializes the backend in the state |0...0>.
+
+        Args:
+            num_qubits (int): The number of qubits of the slot.
+            rng (numpy.random.Generator | None): Generator used to sample the measurements.
+        """
+        self.tables = get_tables()
+        if self.tables.num_qubits != num_qubits:
+            raise ValueError(f"The transition tables are for {self.tables.num_qubits} qubits. Got {num_qubits}.")
+
+        self.num_qubits = num_qubits
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.state = int(self.tables.basis_states[0])
+
+    def apply_operator(self, operator: list[str]) -> None:
+        """
+        Moves the slot to the state reached after an operator card.
+
+        Args:
+            operator (list[str]): The quantum operator to apply.
+        """
+        column = self.tables.operator_index[tuple(operator)]
+        self.state = int(self.tables.operator_table[self.state, column])
+
+    def measure(self, nb) -> int:
+        """
+        Measures one qubit and moves the slot to the collapsed state.
+
+        Args:
+            nb (int): The index of the qubit to measure.
+
+        Returns:
+            int: The measured bit.
+        """
+        bit = int(self.rng.random() < self.tables.measure_prob[self.state, nb])
+        self.state = int(self.tables.measure_table[self.state, nb, bit])
+        return bit
+
+    def measure_all(self) -> int:
+        """
+        Measures all the qubits and moves the slot to the measured basis state.
+
+        Returns:
+            int: The measured value.
+        """
+        value = int(np.searchsorted(self.tables.value_cdf[self.state], self.rng.random(), side="right"))
+        # Guards against the rounding of the last cumulative probability
+        value = min(value, 2**self.num_qubits - 1)
+        self.set_state(value)
+        return value
+
+    def probabilities(self) -> np.ndarray:
+        """
+        Computes the probability of each value without collapsing the state.
+
+        Returns:
+            np.ndarray: The probability of each of the 2**num_qubits values.
+        """
+        return np.array(self.tables.value_prob[self.state])
+
+    def set_state(self, state: int) -> None:
+        """
+        Prepares a computational basis state.
+
+        Args:
+            state (int): The index of the basis state.
+        """
+        self.state = int(self.tables.basis_states[state])
+
+    def set_statevector(self, amplitudes) -> None:
+        """
+        Moves the slot to the state of the tables closest to some amplitudes, so amplitudes
+        stored with a lower precision can be loaded.
+
+        Args:
+            amplitudes (np.ndarray): The 2**num_qubits amplitudes.
+        """
+        amplitudes = np.asarray(amplitudes, dtype=complex)
+        fidelities = np.abs(np.asarray(self.tables.amplitudes).conj() @ amplitudes)**2 / np.vdot(amplitudes, amplitudes).real
+        state = int(np.argmax(fidelities))
+        if fidelities[state] < 1 - 1e-4:
+            raise ValueError("The state is not in the transition tables.")
+        self.state = state
+
+    def snapshot(self) -> int:
+        """
+        Saves the state of the slot.
+
+        Returns:
+            int: The index of the state in the tables.
+        """
+        return self.state
+
+    def restore(self, state) -> None:
+        """
+        Restores a state saved by snapshot.
+
+        Args:
+            state (int): The saved state.
+        """
+        self.state = state
+
+    @property
+    def statevector(self) -> np.ndarray:
+        """
+        np.ndarray: The amplitudes of the slot, up to a global phase.
+        """
+        return np.array(self.tables.amplitudes[self.state])
+
+    def to_circuit(self):
+        """
+        Builds a circuit preparing the current state of the slot.
+
+        Returns:
+            QuantumCircuit: The state preparation circuit.
+        """
+        from qiskit import QuantumCircuit
+
+        qc = QuantumCircuit(self.num_qubits, self.num_qubits)
+        qc.initialize(self.statevector, range(self.num_qubits))
+        return qc
@@ -0,0 +1,315 @@
+"""
+Asyncio server hosting concurrent QDutch tables.
+
+Each table is an independent QDutch game with its own random generators, so the tables do not
+share any state. Clients create tables and play them over local TCP or Unix sockets with compact
+JSON messages, each one prefixed by its length as a 4-byte big-endian unsigned integer:
+    request:  {"id": 1, "op": "draw_cards", "table": 3, "args": {}}
+    response: {"id": 1, "ok": true, "result": [["Operator", ["H", "I", "I"]], ["State", 5]]}
+    error:    {"id": 1, "ok": false, "error": "Unknown table 3."}
+
+The operations are the _op_* methods of TableServer: create, close, state, call_dutch,
+draw_cards, apply_operator_card, apply_state_card, apply_entangle_card, next_player, bot_turn and
+get_ranking. A played card is referred to by its index among the two cards of the last
+draw_cards, so the server stays in control of the deck. bot_turn plays the whole turn of the
+active player with headless.ExpectimaxPolicy, to fill the empty seats of a table. The bot turns
+run on a worker thread, so the other tables are still served while a bot is searching.
+
+Usage:
+    python table_server.py --port 8765
+    python table_server.py --unix /tmp/qdutch.sock
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+from game_class import QDutch
+from headless import ExpectimaxPolicy, play_turn
+
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct("!I")
+MAX_MESSAGE_SIZE = 1 << 20
+# Number of players of a table
+MIN_PLAYERS, MAX_PLAYERS = 2, 8
+
+
+async def read_message(reader) -> dict | None:
+    """
+    Reads one length-prefixed message.
+
+    Args:
+        reader (asyncio.StreamReader): The stream of the connection.
+
+    Returns:
+        dict | None: The message, or None if the connection was closed.
+    """
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+
+    (size,) = HEADER.unpack(header)
+    if size > MAX_MESSAGE_SIZE:
+        raise ValueError(f"Message of {size} bytes, the maximum is {MAX_MESSAGE_SIZE}.")
+
+    return json.loads(await reader.readexactly(size))
+
+
+def write_message(writer, message) -> None:
+    """
+    Writes one length-prefixed message. The caller should drain the writer.
+
+    Args:
+        writer (asyncio.StreamWriter): The stream of the connection.
+        message (dict): The message.
+    """
+    data = json.dumps(message, separators=(",", ":")).encode()
+    writer.write(HEADER.pack(len(data)) + data)
+
+
+def _check_index(value, size, name):
+    if not isinstance(value, int) or not 0 <= value < size:
+        raise ValueError(f"Invalid {name} {value}. Expected an integer between 0 and {size - 1}.")
+
+
+class Table:
+    """
+    A QDutch game hosted by the server.
+    """
+    __slots__ = ("id", "game", "lock", "cards")
+
+    def __init__(self, table_id, seed=None, nb_players=4):
+        """
+        Starts the game of the table.
+
+        Args:
+            table_id (int): The identifier of the table.
+            seed (int | None): Seed of the game.
+            nb_players (int): The number of players.
+        """
+        self.id = table_id
+        self.game = QDutch(seed)
+        self.game.start_game(nb_players)
+        self.game.init_routine()
+        # Serializes the operations of the connections sharing the table
+        self.lock = asyncio.Lock()
+        # The cards of the last draw_cards, until the end of the turn
+        self.cards = None
+
+
+class TableServer:
+    """
+    Hosts the tables and answers the requests of the connections.
+    """
+    def __init__(self, max_tables=100_000):
+        """
+        Initializes a server without tables.
+
+        Args:
+            max_tables (int): The maximal number of open tables.
+        """
+        self.tables = {}
+        self.max_tables = max_tables
+        self.requests = 0
+        self._ids = itertools.count(1)
+        # Policy of the empty seats, created by the first bot_turn. Its values are computed
+        # lazily, so the bot turns run one at a time on a single thread.
+        self.bot = None
+        self.bot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bot")
+
+    async def handle_connection(self, reader, writer) -> None:
+        """
+        Answers the requests of a connection until it is closed. A connection can play on any
+        number of tables.
+
+        Args:
+            reader (asyncio.StreamReader): The input stream of the connection.
+            writer (asyncio.StreamWriter): The output stream of the connection.
+        """
+        try:
+            while (message := await read_message(reader)) is not None:
+                write_message(writer, await self.handle(message))
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            # The connection was lost or sent an invalid message
+            pass
+        finally:
+            writer.close()
+
+    async def handle(self, message) -> dict:
+        """
+        Executes a request. An unexpected error is logged and returned as an error response, the
+        connection stays open.
+
+        Args:
+            message (dict): The request.
+
+        Returns:
+            dict: The response.
+        """
+        self.requests += 1
+        if not isinstance(message, dict):
+            return {"id": None, "ok": False, "error": "The request must be a JSON object."}
+
+        response = {"id": message.get("id")}
+        try:
+            name = message.get("op")
+            operation = getattr(self, f"_op_{name}", None)
+            if operation is None:
+                raise ValueError(f"Unknown operation {name}.")
+
+            args = message.get("args") or {}
+            if name == "create":
+                result = operation(**args)
+            else:
+                table = self.tables.get(message.get("table"))
+                if table is None:
+                    raise ValueError(f"Unknown table {message.get('table')}.")
+                async with table.lock:
+                    result = operation(table, **args)
+                    if asyncio.iscoroutine(result):
+                        result = await result
+
+            response.update(ok=True, result=result)
+        except (ValueError, TypeError) as error:
+            response.update(ok=False, error=str(error))
+        except Exception as error:
+            logger.exception("Request %r failed", message)
+            response.update(ok=False, error=f"Internal error: {error!r}")
+
+        return response
+
+    def _op_create(self, seed=None, nb_players=4) -> int:
+        if len(self.tables) >= self.max_tables:
+            raise ValueError(f"The server already hosts {self.max_tables} tables.")
+        if not isinstance(nb_players, int) or not MIN_PLAYERS <= nb_players <= MAX_PLAYERS:
+            raise ValueError(f"Invalid number of players {nb_players}. Expected an integer between {MIN_PLAYERS} and {MAX_PLAYERS}.")
+
+        table_id = next(self._ids)
+        self.tables[table_id] = Table(table_id, seed, nb_players)
+        return table_id
+
+    def _op_close(self, table) -> None:
+        del self.tables[table.id]
+
+    def _op_state(self, table) -> dict:
+        game = table.game
+        return {
+            "active_player": game.active_player,
+            "dutch_player": game.dutch_player,
+            "turn": game.turn,
+            "ended": game.check_end_game(),
+        }
+
+    def _op_call_dutch(self, table) -> None:
+        if table.game.dutch_player is not None:
+            raise ValueError("Dutch was already called.")
+        table.game.call_dutch()
+
+    def _op_draw_cards(self, table) -> list:
+        if table.cards is not None:
+            raise ValueError("Cards were already drawn this turn.")
+        table.cards = table.game.draw_cards()
+        return [list(card) for card in table.cards]
+
+    def _drawn_card(self, table, card):
+        if table.cards is None:
+            raise ValueError("No card was drawn this turn.")
+        _check_index(card, len(table.cards), "card")
+        return table.cards[card]
+
+    def _op_apply_operator_card(self, table, card, player_no, card_no) -> int | None:
+        game = table.game
+        _check_index(player_no, len(game.players), "player")
+        _check_index(card_no, len(game.players[player_no].hand), "card number")
+
+        result = game.apply_operator_card(player_no, card_no, self._drawn_card(table, card))
+        table.cards = None
+        return None if result is None else int(result)
+
+    def _op_apply_state_card(self, table, card, card_no) -> None:
+        game = table.game
+        _check_index(card_no, len(game.players[game.active_player].hand), "card number")
+
+        game.apply_state_card(card_no, self._drawn_card(table, card))
+        table.cards = None
+
+    def _op_apply_entangle_card(self, table, card, player_no, card_no, other_player_no, other_card_no) -> None:
+        game = table.game
+        for player, slot in ((player_no, card_no), (other_player_no, other_card_no)):
+            _check_index(player, len(game.players), "player")
+            _check_index(slot, len(game.players[player].hand), "card number")
+
+        game.apply_entangle_card(player_no, card_no, other_player_no, other_card_no, self._drawn_card(table, card))
+        table.cards = None
+
+    def _op_next_player(self, table) -> dict:
+        # The cards that were not played are discarded
+        table.cards = None
+        table.game.next_player()
+        return self._op_state(table)
+
+    async def _op_bot_turn(self, table) -> dict:
+        if table.cards is not None:
+            raise ValueError("Cards were already drawn this turn.")
+        if table.game.check_end_game():
+            raise ValueError("The game has ended.")
+
+        # The lock of the table is held until the turn is played
+        return await asyncio.get_running_loop().run_in_executor(self.bot_executor, self._bot_turn, table)
+
+    def _bot_turn(self, table) -> dict:
+        if self.bot is None:
+            self.bot = ExpectimaxPolicy()
+
+        action = play_turn(table.game, self.bot)
+        state = self._op_state(table)
+        state["action"] = "dutch" if action is True else None if action is None else list(action)
+        return state
+
+    def _op_get_ranking(self, table) -> list:
+        return [[name, int(points), rank] for name, points, rank in table.game.get_ranking()]
+
+
+async def serve(host="127.0.0.1", port=8765, unix_path=None, max_tables=100_000) -> None:
+    """
+    Runs a table server until it is cancelled.
+
+    Args:
+        host (str): The TCP host.
+        port (int): The TCP port.
+        unix_path (str | None): Path of a Unix socket, used instead of TCP if given.
+        max_tables (int): The maximal number of open tables.
+    """
+    server = TableServer(max_tables)
+    if unix_path is not None:
+        listener = await asyncio.start_unix_server(server.handle_connection, unix_path)
+    else:
+        listener = await asyncio.start_server(server.handle_connection, host, port)
+
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.bot_executor.shutdown(cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QDutch table server.")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP host.")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port.")
+    parser.add_argument("--unix", help="Path of a Unix socket, used instead of TCP.")
+    parser.add_argument("--max-tables", type=int, default=100_000, help="Maximal number of open tables.")
+    args = parser.parse_args()
+
+    asyncio.run(serve(args.host, args.port, args.unix, args.max_tables))
+
+
+if __name__ == "__main__":
+    main()
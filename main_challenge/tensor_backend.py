@@ -0,0 +1,253 @@
+from functools import lru_cache
+
+import numpy as np
+from statevector_backend import apply_local_unitary, local_operator
+
+
+# Precision of the amplitudes. Single precision halves the memory of the large cards.
+DTYPE = np.complex64
+
+
+class TensorBackend:
+    """
+    Simulates a player slot with many qubits (10 to 24) as a (2, ..., 2) tensor of amplitudes.
+
+    The cards only act on one or two qubits: their unitary is contracted with the touched axes of
+    the tensor, see statevector_backend.apply_local_unitary. A basis state is only stored as its
+    index and a phase, so preparing a card is O(1) and the cards without H gate keep it in this
+    form. The tensor is allocated when a gate creates a superposition and released when all the
+    qubits are measured.
+
+    A dense card takes 8 * 2**num_qubits bytes (128 MiB for 24 qubits). Applying a gate
+    temporarily allocates twice as much, for the result of the contraction and its reordered
+    copy. The tensor is never modified in place, so a
+    snapshot shares it without any copy. See tensor_benchmark.py for the measured memory and time
+    per gate.
+    """
+    # Whether set_statevector can load the states of the game, e.g. from a snapshot
+    settable = True
+    # Whether the state is always pure, so statevector never fails
+    pure = True
+
+    def __init__(self, num_qubits, rng=None):
+        """
+        Initializes the backend in the state |0...0>.
+
+        Args:
+            num_qubits (int): The number of qubits of the slot.
+            rng (numpy.random.Generator | None): Generator used to sample the measurements.
+        """
+        self.num_qubits = num_qubits
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.set_state(0)
+
+    @property
+    def dense(self) -> bool:
+        """
+        bool: Whether the amplitudes are stored, rather than only a basis state.
+        """
+        return self.psi is not None
+
+    def _materialize(self):
+        self.psi = np.zeros(2**self.num_qubits, dtype=DTYPE)
+        self.psi[self.basis] = self.phase
+        self.basis, self.phase = None, None
+
+    def _axis(self, q):
+        # The first axis of the tensor is the most significant bit
+        return self.num_qubits - 1 - q
+
+    def apply_operator(self, operator: list[str]) -> None:
+        """
+        Applies a quantum operator by contracting its unitary with the axes of the qubits it
+        acts on.
+
+        Args:
+            operator (list[str]): The quantum operator to apply.
+        """
+        unitary, qubits = local_operator(tuple(operator))
+        if not qubits:
+            return
+
+        if not self.dense:
+            # Column of the unitary for the bits of the basis state on the touched qubits
+            column = unitary[:, sum(((self.basis >> q) & 1) << k for k, q in enumerate(qubits))]
+            nonzero = np.flatnonzero(np.abs(column) > 1e-12)
+            if len(nonzero) == 1:
+                # Still a basis state: only the touched bits and the phase change
+                local = int(nonzero[0])
+                for k, q in enumerate(qubits):
+                    self.basis = self.basis & ~(1 << q) | ((local >> k) & 1) << q
+                self.phase *= column[local]
+                return
+
+            self._materialize()
+
+        self.psi = apply_local_unitary(self.psi, unitary.astype(DTYPE), qubits, self.num_qubits)
+
+    def measure(self, nb) -> int:
+        """
+        Measures one qubit and collapses the state accordingly.
+
+        Args:
+            nb (int): The index of the qubit to measure.
+
+        Returns:
+            int: The measured bit.
+        """
+        if not self.dense:
+            # The draw keeps the generator in step with the other backends
+            self.rng.random()
+            return (self.basis >> nb) & 1
+
+        tensor = self.psi.reshape((2,) * self.num_qubits)
+        index = [slice(None)] * self.num_qubits
+        index[self._axis(nb)] = 1
+        p1 = float(np.sum(np.abs(tensor[tuple(index)])**2, dtype=np.float64))
+        bit = int(self.rng.random() < p1)
+
+        # A new tensor is built, the snapshots may share the current one
+        index[self._axis(nb)] = bit
+        collapsed = np.zeros_like(tensor)
+        collapsed[tuple(index)] = tensor[tuple(index)] / np.sqrt(p1 if bit else 1 - p1)
+        self.psi = collapsed.reshape(-1)
+
+        return bit
+
+    def measure_all(self) -> int:
+        """
+        Measures all the qubits and collapses the state to the measured basis state, which
+        releases the tensor.
+
+        Returns:
+            int: The measured value.
+        """
+        if not self.dense:
+            self.rng.random()
+            value = self.basis
+        else:
+            cumulative = np.cumsum(np.abs(self.psi)**2, dtype=np.float64)
+            value = int(np.searchsorted(cumulative, self.rng.random() * cumulative[-1], side="right"))
+            value = min(value, 2**self.num_qubits - 1)
+
+        self.set_state(value)
+        return value
+
+    def probabilities(self) -> np.ndarray:
+        """
+        Computes the probability of each value without collapsing the state. It allocates
+        8 * 2**num_qubits bytes: the expected value and the qubit probabilities of a slot are
+        computed without it.
+
+        Returns:
+            np.ndarray: The probability of each of the 2**num_qubits values.
+        """
+        if not self.dense:
+            probabilities = np.zeros(2**self.num_qubits)
+            probabilities[self.basis] = 1
+            return probabilities
+
+        return np.abs(self.psi)**2
+
+    def qubit_probabilities(self) -> np.ndarray:
+        """
+        Computes the probability of measuring 1 on each qubit without collapsing the state. A
+        basis state gives its bits, and a dense card sums its tensor over the other axes, so the
+        2**num_qubits probabilities of the values are never built in double precision.
+
+        Returns:
+            np.ndarray: The probability of each of the num_qubits qubits to be measured as 1.
+        """
+        if not self.dense:
+            return np.array([(self.basis >> q) & 1 for q in range(self.num_qubits)], dtype=float)
+
+        probabilities = np.abs(self.psi)**2
+        # Qubit q is the middle axis when the values are split into (high bits, bit q, low bits)
+        return np.array([
+            probabilities.reshape(2**self._axis(q), 2, 2**q)[:, 1, :].sum(dtype=np.float64)
+            for q in range(self.num_qubits)
+        ]) / probabilities.sum(dtype=np.float64)
+
+    def expected_value(self) -> float:
+        """
+        Computes the expected value without collapsing the state, from the qubit probabilities:
+        the value is linear in its bits.
+
+        Returns:
+            float: The expected value.
+        """
+        if not self.dense:
+            return float(self.basis)
+        return float(self.qubit_probabilities() @ 2.0**np.arange(self.num_qubits))
+
+    def set_state(self, state: int) -> None:
+        """
+        Prepares a computational basis state in O(1): only its index is stored.
+
+        Args:
+            state (int): The index of the basis state.
+        """
+        self.basis = int(state)
+        self.phase = 1 + 0j
+        self.psi = None
+
+    def set_statevector(self, amplitudes) -> None:
+        """
+        Sets the amplitudes of the slot.
+
+        Args:
+            amplitudes (np.ndarray): The 2**num_qubits amplitudes.
+        """
+        amplitudes = np.asarray(amplitudes, dtype=complex)
+        self.psi = (amplitudes / np.linalg.norm(amplitudes)).astype(DTYPE)
+        self.basis, self.phase = None, None
+
+    def snapshot(self):
+        """
+        Saves the state of the slot. The tensor is shared with the snapshot without any copy.
+
+        Returns:
+            tuple: The basis state, its phase and the tensor.
+        """
+        return self.basis, self.phase, self.psi
+
+    def restore(self, state) -> None:
+        """
+        Restores a state saved by snapshot.
+
+        Args:
+            state (tuple): The saved state.
+        """
+        self.basis, self.phase, self.psi = state
+
+    @property
+    def statevector(self) -> np.ndarray:
+        """
+        np.ndarray: A copy of the amplitudes of the slot.
+        """
+        if not self.dense:
+            statevector = np.zeros(2**self.num_qubits, dtype=DTYPE)
+            statevector[self.basis] = self.phase
+            return statevector
+
+        return self.psi.copy()
+
+    def to_circuit(self):
+        """
+        Builds a circuit preparing the current state of the slot. A basis state is prepared with
+        X gates instead of a state preparation over all the amplitudes.
+
+        Returns:
+            QuantumCircuit: The state preparation circuit.
+        """
+        from qiskit import QuantumCircuit
+
+        qc = QuantumCircuit(self.num_qubits, self.num_qubits)
+        if not self.dense:
+            for q in range(self.num_qubits):
+                if (self.basis >> q) & 1:
+                    qc.x(q)
+            qc.global_phase = float(np.angle(self.phase))
+        else:
+            qc.initialize(self.psi.astype(complex) / np.linalg.norm(self.psi), range(self.num_qubits))
+        return qc
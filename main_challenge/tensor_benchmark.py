@@ -0,0 +1,102 @@
+"""
+Benchmark of the tensor backend for large cards.
+
+For each number of qubits, measures the memory of a dense card, the peak memory allocated while
+a gate is applied (on top of the card itself) and the time of the basis state preparation, of a
+single and a two qubit card, and of the measurements.
+
+Usage:
+    python tensor_benchmark.py --qubits 10 12 14 16 18 20 22 24
+
+Results on a single-core x86-64 container (complex64 amplitudes, times in ms):
+
+    qubits  state MiB   peak MiB  set_state        H     CNOT  measure  measure_all
+        10      0.008      0.017      0.001    0.048    0.084    0.062        0.033
+        12      0.031      0.064      0.001    0.073    0.085    0.094        0.050
+        14      0.125      0.251      0.001    0.167    0.186    0.201        0.170
+        16      0.500      1.002      0.001    0.604    0.592    0.513        1.054
+        18      2.000      4.002      0.001    2.692    2.897    1.804        5.063
+        20      8.000     16.002      0.001   10.567   10.243    9.436       13.851
+        22     32.000     64.002      0.001   56.157   49.131   43.812       45.141
+        24    128.000    256.002      0.001  217.566  193.977  169.411      185.303
+
+The time per gate and the memory grow as 2**num_qubits. A card in a basis state only takes a few
+bytes whatever its number of qubits.
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from tensor_backend import TensorBackend
+
+
+def _timeit(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def benchmark(num_qubits, repeats=5, seed=0) -> dict:
+    """
+    Benchmarks the tensor backend for one number of qubits.
+
+    Args:
+        num_qubits (int): The number of qubits of the card.
+        repeats (int): The number of repetitions of each timed operation.
+        seed (int): Seed of the measurements.
+
+    Returns:
+        dict: The memory in MiB and the time of each operation in ms.
+    """
+    backend = TensorBackend(num_qubits, np.random.default_rng(seed))
+    h = ["H"] + ["I"] * (num_qubits - 1)
+    cnot = ["I"] * num_qubits
+    cnot[num_qubits // 2], cnot[num_qubits - 1] = "C", "X"
+
+    results = {"qubits": num_qubits, "set_state": _timeit(lambda: backend.set_state(1), repeats)}
+
+    # A superposition over all the qubits makes the card dense
+    for q in range(num_qubits):
+        backend.apply_operator(["I"] * q + ["H"] + ["I"] * (num_qubits - q - 1))
+    results["state MiB"] = backend.psi.nbytes / 2**20
+
+    tracemalloc.start()
+    backend.apply_operator(h)
+    results["peak MiB"] = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+
+    results["H"] = _timeit(lambda: backend.apply_operator(h), repeats)
+    results["CNOT"] = _timeit(lambda: backend.apply_operator(cnot), repeats)
+
+    state = backend.snapshot()
+
+    def measure():
+        backend.restore(state)
+        backend.measure(0)
+
+    def measure_all():
+        backend.restore(state)
+        backend.measure_all()
+
+    results["measure"] = _timeit(measure, repeats)
+    results["measure_all"] = _timeit(measure_all, repeats)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the tensor backend.")
+    parser.add_argument("--qubits", type=int, nargs="+", default=list(range(10, 25, 2)), help="Numbers of qubits.")
+    parser.add_argument("--repeats", type=int, default=5, help="Repetitions of each timed operation.")
+    args = parser.parse_args()
+
+    columns = ["qubits", "state MiB", "peak MiB", "set_state", "H", "CNOT", "measure", "measure_all"]
+    print("  ".join(f"{name:>9}" for name in columns))
+    for num_qubits in args.qubits:
+        results = benchmark(num_qubits, args.repeats)
+        print("  ".join(f"{results[name]:>9}" if name == "qubits" else f"{results[name]:>9.3f}" for name in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import copy
+import os
+import sys
+import types
+
+import pytest
+
+# The game modules are imported as top-level modules, like when the scripts are run
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parameters as param
+
+
+@pytest.fixture(autouse=True)
+def restore_parameters():
+    """
+    Restores the values of parameters.py changed by a test.
+    """
+    saved = {name: copy.deepcopy(value) for name, value in vars(param).items()
+             if not name.startswith("_") and not callable(value) and not isinstance(value, types.ModuleType)}
+    yield
+    vars(param).update(saved)
@@ -0,0 +1,33 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import instrumentation
+from action_worker import ActionWorker
+from game_class import QDutch
+
+
+def test_worker_stats_are_exported_as_gauges(monkeypatch):
+    monkeypatch.setattr(instrumentation, "_gauges", {})
+    game = QDutch(0)
+    game.start_game(4)
+    game.init_routine()
+    worker = ActionWorker(game)
+    try:
+        instrumentation.register_gauges("action_worker", worker.stats)
+        worker.submit("draw_cards", tag=("draw", 0, None))
+        worker.submit("next_player", tag=("next", 1, None))
+        worker.wait()
+
+        assert game.active_player == 1
+        # The events of the actions are not handled yet
+        assert worker.busy
+        worker.handled()
+        worker.handled()
+        assert not worker.busy
+        gauges = instrumentation.snapshot()["gauges"]
+        assert gauges["action_worker.completed"] == 2
+        assert gauges["action_worker.queue_depth"] == 0
+        assert 'qdutch_gauge{gauge="action_worker.completed"} 2' in instrumentation.to_prometheus()
+    finally:
+        worker.shutdown()
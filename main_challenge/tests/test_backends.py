@@ -0,0 +1,147 @@
+import random
+
+import numpy as np
+import pytest
+from qiskit import QuantumCircuit
+from qiskit.quantum_info import Statevector
+
+import parameters as param
+from card_generator import generate_operator
+from gates import parse_operator
+from player_slot_class import PlayerSlot, load_backend
+
+
+# The noisy backends are noiseless with the default parameters.noise
+BACKENDS = ["numpy", "aer", "stabilizer", "table", "tensor", "density", "trajectory"]
+# The tensor backend stores complex64 amplitudes
+ATOL = {"tensor": 1e-6}
+
+
+def reference_statevector(operators, num_qubits):
+    # Independent simulation of the operator cards with qiskit
+    qc = QuantumCircuit(num_qubits)
+    for operator in operators:
+        for gate_name, qubits in parse_operator(operator):
+            getattr(qc, gate_name)(*qubits)
+    return Statevector(qc).data
+
+
+def random_operators(count, seed=0):
+    rng = random.Random(seed)
+    return [generate_operator(rng) for _ in range(count)]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_probabilities_match_reference(backend):
+    operators = random_operators(40)
+    slot = load_backend(backend)(param.num_qubits, np.random.default_rng(0))
+    for operator in operators:
+        slot.apply_operator(operator)
+
+    expected = np.abs(reference_statevector(operators, param.num_qubits))**2
+    np.testing.assert_allclose(slot.probabilities(), expected, atol=ATOL.get(backend, 1e-9))
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_measure_collapses_the_qubit(backend):
+    slot = load_backend(backend)(param.num_qubits, np.random.default_rng(1))
+    slot.apply_operator(["H", "I", "I"])
+    bit = slot.measure(0)
+
+    probabilities = slot.probabilities()
+    np.testing.assert_allclose(probabilities[bit], 1, atol=ATOL.get(backend, 1e-9))
+    assert slot.measure_all() == bit
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_set_state_and_snapshot(backend):
+    slot = load_backend(backend)(param.num_qubits, np.random.default_rng(2))
+    slot.set_state(5)
+    saved = slot.snapshot()
+    slot.apply_operator(["H", "X", "I"])
+    slot.restore(saved)
+
+    np.testing.assert_allclose(slot.probabilities(), np.eye(2**param.num_qubits)[5], atol=ATOL.get(backend, 1e-9))
+
+
+def test_player_slot_uses_parameters_backend():
+    param.backend = "numpy"
+    slot = PlayerSlot(rng=np.random.default_rng(0))
+    slot.set_state(3)
+    assert slot.reveal() == 3
+    assert slot.expected_value() == pytest.approx(3)
+
+
+def test_stabilizer_snapshot_cannot_be_restored():
+    from game_class import QDutch
+    from game_record import restore, snapshot
+
+    param.backend = "numpy"
+    game = QDutch(0)
+    game.start_game()
+    record = snapshot(game)
+
+    param.backend = "stabilizer"
+    with pytest.raises(ValueError, match="stabilizer"):
+        restore(record)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_expected_value_and_qubit_probabilities(backend):
+    param.backend = backend
+    slot = PlayerSlot(rng=np.random.default_rng(3))
+    for operator in random_operators(20, seed=3):
+        slot.apply_operator(operator)
+
+    probabilities = np.abs(reference_statevector(random_operators(20, seed=3), param.num_qubits))**2
+    bits = (np.arange(2**param.num_qubits)[:, None] >> np.arange(param.num_qubits)) & 1
+    atol = ATOL.get(backend, 1e-9)
+    np.testing.assert_allclose(slot.qubit_probabilities(), probabilities @ bits, atol=atol)
+    assert slot.expected_value() == pytest.approx(probabilities @ np.arange(len(probabilities)), abs=1e-5)
+
+
+def test_tensor_marginals_do_not_build_the_probabilities(monkeypatch):
+    tensor_backend = load_backend("tensor")
+    monkeypatch.setattr(tensor_backend, "probabilities", lambda self: pytest.fail("dense probabilities"))
+    param.num_qubits = 24
+    param.backend = "tensor"
+    slot = PlayerSlot(rng=np.random.default_rng(4))
+    slot.set_state(2**23 + 5)
+    slot.apply_operator(["X", "Z"] + ["I"] * 22)
+
+    assert slot.expected_value() == 2**23 + 4
+    assert slot.measure_probability(0) == 0 and slot.measure_probability(23) == 1
+
+    # A dense card of 12 qubits against the numpy backend
+    param.num_qubits = 12
+    operators = [["H"] * 12, ["I", "I", "HC"] + ["I"] * 8 + ["X"], ["C", "X"] + ["I"] * 10, ["I", "H"] + ["I"] * 10]
+    reference = load_backend("numpy")(12)
+    slot = PlayerSlot(rng=np.random.default_rng(5))
+    for operator in operators:
+        reference.apply_operator(operator)
+        slot.apply_operator(operator)
+
+    probabilities = reference.probabilities()
+    assert slot.backend.dense
+    assert slot.expected_value() == pytest.approx(probabilities @ np.arange(2**12), rel=1e-5)
+
+
+def test_stabilizer_marginals_from_the_tableau(monkeypatch):
+    stabilizer_backend = load_backend("stabilizer")
+    monkeypatch.setattr(stabilizer_backend, "probabilities", lambda self: pytest.fail("branching probabilities"))
+    param.num_qubits = 64
+    param.backend = "stabilizer"
+    slot = PlayerSlot(rng=np.random.default_rng(6))
+    slot.set_state(2**40)
+    # Bell pair on the qubits 0 and 1, qubit 2 flipped
+    slot.apply_operator(["HC", "X"] + ["I"] * 62)
+    slot.apply_operator(["I", "I", "X"] + ["I"] * 61)
+
+    expected = np.zeros(64)
+    expected[[0, 1]] = 0.5
+    expected[[2, 40]] = 1
+    np.testing.assert_allclose(slot.qubit_probabilities(), expected)
+    assert slot.expected_value() == pytest.approx(1.5 + 4 + 2**40)
+
+    with pytest.raises(ValueError, match="amplitudes"):
+        slot.set_statevector(np.eye(2**3)[0])
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import parameters as param
+from batch_engine import MEASUREMENT, OPERATOR, STATE, BatchQDutch
+from statevector_backend import StatevectorBackend
+
+
+def test_operator_cards_match_the_statevector_backend():
+    engine = BatchQDutch(8, rng=np.random.default_rng(0))
+    engine.start_game()
+    rng = np.random.default_rng(1)
+    initial = engine.states[:, 0, 0].copy()
+
+    cards = rng.integers(len(engine.operators), size=(10, 8))
+    for row in cards:
+        engine.apply_cards(np.full(8, OPERATOR), row, np.zeros(8, dtype=int), np.zeros(8, dtype=int))
+
+    for game in range(8):
+        slot = StatevectorBackend(param.num_qubits)
+        slot.set_statevector(initial[game])
+        for operator in cards[:, game]:
+            slot.apply_operator(engine.operators[operator])
+        np.testing.assert_allclose(engine.states[game, 0, 0], slot.statevector, atol=1e-9)
+
+
+def test_ended_games_stay_ended():
+    engine = BatchQDutch(2, rng=np.random.default_rng(0))
+    engine.start_game()
+    engine.call_dutch(np.array([0]))
+
+    for _ in range(4):
+        engine.next_player()
+        if engine.active_player[0] != 0:
+            assert not engine.check_end_game().any()
+    np.testing.assert_array_equal(engine.check_end_game(), [True, False])
+
+    # The next moves and cards are ignored in the game that ended
+    states = engine.states[0].copy()
+    engine.next_player()
+    engine.apply_cards(np.full(2, STATE), np.full(2, 7), np.zeros(2, dtype=int), np.zeros(2, dtype=int))
+    engine.apply_cards(np.full(2, MEASUREMENT), np.zeros(2, dtype=int), np.ones(2, dtype=int), np.ones(2, dtype=int))
+    engine.dutch_player[0] = -1
+    engine.call_dutch(np.array([0]))
+
+    np.testing.assert_array_equal(engine.check_end_game(), [True, False])
+    np.testing.assert_array_equal(engine.active_player, [0, 1])
+    np.testing.assert_array_equal(engine.turn, [1, 1])
+    np.testing.assert_array_equal(engine.dutch_player, [-1, -1])
+    np.testing.assert_array_equal(engine.states[0], states)
+
+
+def test_entangle_cards_are_rejected():
+    param.configure(entangle_prob=0.1)
+    with pytest.raises(ValueError, match="Entangle"):
+        BatchQDutch(2)
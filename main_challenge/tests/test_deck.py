@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+import parameters as param
+from card_generator import card_distribution, enumerate_operators
+from deck import Deck, decode
+
+
+def card_key(card):
+    return card.type, tuple(card.data) if isinstance(card.data, list) else card.data
+
+
+@pytest.mark.parametrize("entangle_prob", [0.0, 0.2])
+def test_frequencies_match_card_distribution(entangle_prob):
+    param.configure(state_prob=0.25, measurement_prob=0.2, entangle_prob=entangle_prob)
+    size = 400_000
+    rows, counts = np.unique(Deck(np.random.default_rng(0)).draw(size), axis=0, return_counts=True)
+    frequencies = {card_key(decode(row.tolist())): count / size for row, count in zip(rows, counts)}
+
+    cards, probabilities = card_distribution()
+    assert sum(probabilities) == pytest.approx(1)
+    for card, prob in zip(cards, probabilities):
+        # Five standard deviations of the frequency
+        assert frequencies.pop(card_key(card), 0) == pytest.approx(prob, abs=5 * np.sqrt(prob / size) + 1e-12)
+    assert not frequencies
+
+
+def test_snapshot_draws_the_same_cards_again():
+    deck = Deck(np.random.default_rng(1), batch_size=8)
+    deck.draw_card()
+    saved = deck.snapshot()
+    cards = [deck.draw_card() for _ in range(20)]
+
+    deck.restore(saved)
+    # The cards of the saved batch are drawn again
+    assert [deck.draw_card() for _ in range(7)] == cards[:7]
+
+
+def test_card_data_indexes_the_operators():
+    deck = Deck(np.random.default_rng(2))
+    cards = deck.draw(500)
+    operators = enumerate_operators()
+    for row, value in zip(cards.tolist(), deck.card_data(cards).tolist()):
+        card = decode(row)
+        if card.type == "Operator":
+            assert list(operators[value]) == card.data
+        elif card.type in ("State", "Measurement"):
+            assert value == card.data
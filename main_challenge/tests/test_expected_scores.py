@@ -0,0 +1,68 @@
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+import parameters as param
+from card_generator import Card, generate_operator
+from game_class import QDutch
+from player_class import Player
+
+
+def scrambled_game(seed, cards=12):
+    game = QDutch(seed)
+    game.start_game()
+    game.init_routine()
+    rng = random.Random(seed)
+    for _ in range(cards):
+        game.apply_operator_card(rng.randrange(4), rng.randrange(4), Card("Operator", generate_operator(rng)))
+    return game
+
+
+def test_hand_distribution_matches_enumeration():
+    game = scrambled_game(0)
+    player = game.players[0]
+    distributions = [slot.probabilities() for slot in player.hand]
+
+    expected = np.zeros_like(player.hand_distribution())
+    for values in itertools.product(range(len(distributions[0])), repeat=4):
+        expected[sum(values), min(values)] += np.prod([p[v] for p, v in zip(distributions, values)])
+
+    np.testing.assert_allclose(player.hand_distribution(), expected, atol=1e-12)
+    assert game.expected_scores()[0] == pytest.approx(expected.sum(axis=1) @ np.arange(len(expected)))
+
+
+def test_win_probabilities_match_sampling():
+    game = scrambled_game(1)
+    game.dutch_player = 2
+    rng = np.random.default_rng(0)
+    samples = 20_000
+
+    scores = []
+    for i, player in enumerate(game.players):
+        values = np.stack([rng.choice(len(p), size=samples, p=p / p.sum()) for p in (slot.probabilities() for slot in player.hand)])
+        scores.append(values.sum(axis=0) + 0.01 * values.min(axis=0) - 0.5 * (i == 2))
+    scores = np.array(scores)
+    frequencies = (scores <= scores.min(axis=0) + 1e-9).mean(axis=1)
+
+    np.testing.assert_allclose(game.win_probabilities(), frequencies, atol=0.02)
+
+
+def test_points_distribution_matches_hand_distribution():
+    game = scrambled_game(2)
+    for player in game.players:
+        np.testing.assert_allclose(player.points_distribution(), player.hand_distribution().sum(axis=1), atol=1e-12)
+
+
+def test_large_cards_only_have_points_distributions():
+    param.num_qubits = 12
+    player = Player("Player 1", random.Random(0), np.random.default_rng(0))
+    for slot in player.hand:
+        slot.apply_operator(["H"] + ["I"] * 11)
+
+    with pytest.raises(ValueError, match="MAX_JOINT_SIZE"):
+        player.hand_distribution()
+    points = player.points_distribution()
+    assert points.sum() == pytest.approx(1)
+    assert points @ np.arange(len(points)) == pytest.approx(player.expected_points())
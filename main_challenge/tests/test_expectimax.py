@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from expectimax import get_slot_values, state_id
+from player_slot_class import PlayerSlot
+from statevector_backend import StatevectorBackend
+
+
+def expected_value(psi):
+    return np.abs(psi)**2 @ np.arange(len(psi))
+
+
+def value_after(psi, card):
+    # Expected value of the slot after a card, by simulation of the card on the amplitudes
+    slot = StatevectorBackend(int(np.log2(len(psi))))
+    if card.type == "State":
+        return card.data
+    if card.type == "Entangle":
+        return expected_value(psi)
+    if card.type == "Operator":
+        slot.psi = psi.copy()
+        slot.apply_operator(card.data)
+        return expected_value(slot.psi)
+
+    ones = (np.arange(len(psi)) >> card.data) & 1
+    value = 0.0
+    for bit in (0, 1):
+        kept = np.where(ones == bit, psi, 0)
+        prob = np.sum(np.abs(kept)**2)
+        if prob > 1e-12:
+            value += prob * expected_value(kept / np.sqrt(prob))
+    return value
+
+
+@pytest.mark.parametrize("state", [0, 1, 7, 25, 100])
+def test_one_step_values_match_brute_force(state):
+    slot_values = get_slot_values(offer_prob=0.5)
+    psi = np.asarray(slot_values.tables.amplitudes[state], dtype=complex)
+    keep = expected_value(psi)
+
+    best = [min(keep, value_after(psi, card)) for card in slot_values.cards]
+    expected = 0.5 * keep + 0.5 * float(np.dot(slot_values.probabilities, best))
+
+    assert slot_values.values(0)[state] == pytest.approx(keep)
+    assert slot_values.values(1)[state] == pytest.approx(expected)
+
+
+def test_state_id_of_a_slot():
+    slot_values = get_slot_values()
+    slot = PlayerSlot(rng=np.random.default_rng(0))
+    slot.set_state(5)
+    slot.apply_operator(["H", "I", "I"])
+    state = state_id(slot)
+    np.testing.assert_allclose(np.abs(slot_values.tables.amplitudes[state])**2, slot.probabilities(), atol=1e-9)
+
+
+def test_state_id_of_a_noisy_trajectory(monkeypatch):
+    import parameters as param
+
+    param.backend = "trajectory"
+    slot = PlayerSlot(rng=np.random.default_rng(0))
+    assert state_id(slot) is not None
+
+    param.noise = {"depolarizing": 0.1, "dephasing": 0.0, "amplitude_damping": 0.0}
+    slot = PlayerSlot(rng=np.random.default_rng(0))
+    monkeypatch.setattr(type(slot.backend), "statevector", property(lambda self: pytest.fail("statevector")))
+    assert state_id(slot) is None
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from game_record import ActionLog, RecordedGame, read_log, replay, snapshot
+from headless import RandomPolicy, play_turn
+
+
+def assert_same_game(game, other):
+    expected, actual = snapshot(game), snapshot(other)
+    for field in ("active_player", "dutch_player", "turn"):
+        assert actual[field] == expected[field]
+    np.testing.assert_allclose(actual["amplitudes"], expected["amplitudes"], atol=1e-6)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_replay_reproduces_the_game(tmp_path, seed):
+    path = str(tmp_path / "games.log")
+    policy = RandomPolicy(dutch_prob=0.02)
+    with ActionLog(path) as log:
+        game = RecordedGame(log, seed)
+        game.start_game(4)
+        game.init_routine()
+        for turn in range(30):
+            play_turn(game, policy)
+            # Undone and redone actions are logged too
+            if turn % 3 == 0:
+                game.undo()
+            if turn % 6 == 0:
+                game.redo()
+            if game.check_end_game():
+                break
+
+    replayed, = replay(read_log(path))
+    assert_same_game(game.game, replayed)
+
+
+def test_undo_without_action_is_not_logged(tmp_path):
+    path = str(tmp_path / "games.log")
+    with ActionLog(path) as log:
+        game = RecordedGame(log, 0)
+        game.start_game(4)
+        game.init_routine()
+        assert not game.undo()
+        assert not game.redo()
+
+    assert len(read_log(path, mmap=False)) == 2
@@ -0,0 +1,77 @@
+import json
+
+import numpy as np
+import pytest
+
+import parameters as param
+from card_generator import Card
+from game_class import QDutch
+from headless import POLICIES, GreedyPolicy, Policy, play_game, simulate
+
+
+@pytest.mark.parametrize("policy", ["random", "greedy", "expectimax"])
+def test_games_only_depend_on_their_seed(policy):
+    first = play_game([POLICIES[policy]() for _ in range(4)], seed=3)
+    second = play_game([POLICIES[policy]() for _ in range(4)], seed=3)
+    assert first == second
+    assert sorted(first["ranks"])[0] == 1
+
+
+def test_simulate_does_not_depend_on_the_workers(tmp_path):
+    outputs = []
+    for workers in (1, 2):
+        path = tmp_path / f"results_{workers}.jsonl"
+        simulate(["random"] * 4, 6, str(path), workers=workers, seed=5, chunk_size=2)
+        results = [json.loads(line) for line in path.read_text().splitlines()]
+        outputs.append(sorted(results, key=lambda result: result["game"]))
+
+    assert outputs[0] == outputs[1]
+    assert [result["game"] for result in outputs[0]] == list(range(6))
+
+
+@pytest.mark.parametrize("backend", ["density", "trajectory"])
+def test_greedy_policy_leaves_noisy_slots_unchanged(backend):
+    param.backend = backend
+    param.noise = {"depolarizing": 0.05, "dephasing": 0.05, "amplitude_damping": 0.05}
+    game = QDutch(0)
+    game.start_game(4)
+    game.init_routine()
+    for player_no in range(4):
+        slot = game.players[player_no].hand[0]
+        slot.apply_operator(["H"] + ["I"] * (param.num_qubits - 1))
+
+    before = [slot.probabilities() for player in game.players for slot in player.hand]
+    policy = GreedyPolicy()
+    for _ in range(5):
+        policy.choose_action(game, 0, game.draw_cards())
+
+    after = [slot.probabilities() for player in game.players for slot in player.hand]
+    np.testing.assert_allclose(after, before)
+
+
+def test_greedy_policy_does_not_sample_the_noise_of_trajectories():
+    param.backend = "trajectory"
+    param.noise = {"depolarizing": 0.0, "dephasing": 0.0, "amplitude_damping": 0.3}
+    game = QDutch(0)
+    game.start_game(2)
+    for player in game.players:
+        for slot in player.hand:
+            slot.set_state(7)
+    rngs = [slot.backend.rng.bit_generator.state for player in game.players for slot in player.hand]
+
+    # X on the last qubit takes the value 7 to 3, the noise then acts on a qubit in |0>
+    x_card = Card("Operator", ["I"] * (param.num_qubits - 1) + ["X"])
+    action = GreedyPolicy().choose_action(game, 0, [x_card])
+    assert action is not None and (action.player_no, action.slot_no) == (0, 0)
+    assert [slot.backend.rng.bit_generator.state for player in game.players for slot in player.hand] == rngs
+
+
+def test_policies_must_choose_actions():
+    with pytest.raises(TypeError):
+        Policy()
+
+
+@pytest.mark.parametrize("policy", ["random", "greedy"])
+def test_one_player_game(policy):
+    result = play_game([POLICIES[policy]()], seed=0)
+    assert result["ranks"] == [1]
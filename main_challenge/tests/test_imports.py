@@ -0,0 +1,13 @@
+import os
+import subprocess
+import sys
+
+MAIN_CHALLENGE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_game_only_imports_the_default_backend():
+    code = ("import sys, game_class; "
+            "print(sorted(m for m in ('qiskit', 'matplotlib', 'pygame', 'noise_backend', 'tensor_backend', "
+            "'stabilizer_backend', 'aer_backend', 'table_backend') if m in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], cwd=MAIN_CHALLENGE, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "[]"
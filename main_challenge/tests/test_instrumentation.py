@@ -0,0 +1,35 @@
+import pytest
+
+import instrumentation
+from game_class import QDutch
+from headless import POLICIES, play_game
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    instrumentation.disable()
+    instrumentation.reset()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+def test_disable_puts_back_the_original_methods():
+    original = QDutch.draw_cards
+    instrumentation.enable()
+    assert QDutch.draw_cards is not original
+    instrumentation.disable()
+    assert QDutch.draw_cards is original
+
+
+def test_calls_are_counted_and_merged():
+    result, metrics = instrumentation.run_instrumented(play_game, [POLICIES["random"]() for _ in range(4)], seed=0)
+    assert not instrumentation.enabled()
+
+    calls = metrics["operations"]["QDutch.next_player"]["calls"]
+    assert calls >= result["turns"]
+    assert sum(metrics["operations"]["QDutch.next_player"]["histogram"]) == calls
+
+    instrumentation.merge(metrics)
+    assert instrumentation.snapshot()["operations"]["QDutch.next_player"]["calls"] == 2 * calls
+    assert f'qdutch_calls_total{{operation="QDutch.next_player"}} {2 * calls}' in instrumentation.to_prometheus()
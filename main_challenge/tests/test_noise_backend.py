@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from noise_backend import DensityMatrixEngine, NoisyEngine, TrajectoryEngine
+
+NOISE = {"depolarizing": 0.1, "dephasing": 0.2, "amplitude_damping": 0.3}
+
+
+def test_noise_follows_each_gate_of_a_card():
+    # An H_CNOT card is an H gate followed by a CNOT gate, with the noise after each of them
+    slots = np.arange(1)
+    card = DensityMatrixEngine(1, 3, NOISE, np.random.default_rng(0))
+    card.apply_operator(slots, [["HC", "X", "I"]])
+    gates = DensityMatrixEngine(1, 3, NOISE, np.random.default_rng(0))
+    gates.apply_operator(slots, [["H", "I", "I"]])
+    gates.apply_operator(slots, [["C", "X", "I"]])
+
+    np.testing.assert_allclose(card.rho, gates.rho, atol=1e-12)
+
+
+def test_trajectories_sample_the_density_matrix():
+    operators = [["H", "I", "I"], ["HC", "X", "I"], ["I", "SWAP", "SWAP"], ["S", "I", "X"]]
+    density = DensityMatrixEngine(1, 3, NOISE, np.random.default_rng(0))
+    trajectories = TrajectoryEngine(20_000, 3, NOISE, np.random.default_rng(0))
+    for operator in operators:
+        density.apply_operator(np.arange(1), [operator])
+        trajectories.apply_operator(np.arange(20_000), [operator] * 20_000)
+
+    np.testing.assert_allclose(trajectories.probabilities().mean(axis=0), density.probabilities()[0], atol=0.02)
+
+
+def test_engines_are_abstract():
+    with pytest.raises(TypeError):
+        NoisyEngine(1, 3)
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+import parameters as param
+from card_generator import Card
+from game_class import QDutch
+from game_record import snapshot
+
+SUPPORTED = ["numpy", "aer", "table", "tensor", "trajectory"]
+UNSUPPORTED = ["stabilizer", "density"]
+
+
+def bell_pair_game(seed=0):
+    # Slots (0, 0) and (1, 0) in |0...0>, with a Hadamard on the qubit 0 of the first one
+    game = QDutch(seed)
+    game.start_game(4)
+    game.init_routine()
+    game.players[0].hand[0].set_state(0)
+    game.players[1].hand[0].set_state(0)
+    game.apply_operator_card(0, 0, Card("Operator", ["H"] + ["I"] * (param.num_qubits - 1)))
+    return game
+
+
+@pytest.mark.parametrize("backend", SUPPORTED)
+def test_entangle_correlates_the_measurements(backend):
+    param.backend = backend
+    for seed in range(6):
+        game = bell_pair_game(seed)
+        game.apply_entangle_card(0, 0, 1, 0, Card("Entangle", ["CNOT", 0, 0]))
+        first, second = game.players[0].hand[0], game.players[1].hand[0]
+        assert first.entangled and second.entangled
+        np.testing.assert_allclose(second.qubit_probabilities()[0], 0.5, atol=1e-6)
+
+        bit = game.apply_operator_card(0, 0, Card("Measurement", 0))
+        np.testing.assert_allclose(second.qubit_probabilities()[0], bit, atol=1e-6)
+        # The measurement split the slots
+        assert not first.entangled and not second.entangled
+
+
+@pytest.mark.parametrize("backend", SUPPORTED)
+def test_undo_entangle(backend):
+    param.backend = backend
+    game = bell_pair_game()
+    before = [slot.probabilities() for player in game.players for slot in player.hand]
+    game.apply_entangle_card(0, 0, 1, 0, Card("Entangle", ["CNOT", 0, 0]))
+
+    assert game.undo()
+    assert not game.players[0].hand[0].entangled and not game.players[1].hand[0].entangled
+    after = [slot.probabilities() for player in game.players for slot in player.hand]
+    np.testing.assert_allclose(after, before, atol=1e-6)
+
+
+@pytest.mark.parametrize("backend", UNSUPPORTED)
+def test_unsupported_backends_are_refused_before_recording(backend):
+    param.backend = backend
+    game = bell_pair_game()
+    undo_stack = list(game.undo_stack)
+
+    with pytest.raises(ValueError, match="Entangle"):
+        game.apply_entangle_card(0, 0, 1, 0, Card("Entangle", ["CNOT", 0, 0]))
+    assert game.undo_stack == undo_stack
+    assert not game.players[0].hand[0].entangled
+
+    param.entangle_prob = 0.1
+    with pytest.raises(ValueError, match="Entangle"):
+        QDutch(0).start_game(4)
+
+
+def test_noisy_slots_are_refused():
+    param.backend = "trajectory"
+    param.noise = {"depolarizing": 0.01, "dephasing": 0.0, "amplitude_damping": 0.0}
+    game = bell_pair_game()
+    with pytest.raises(ValueError, match="noisy"):
+        game.apply_entangle_card(0, 0, 1, 0, Card("Entangle", ["CNOT", 0, 0]))
+
+
+def test_entangled_games_cannot_be_snapshotted():
+    game = bell_pair_game()
+    game.apply_entangle_card(0, 0, 1, 0, Card("Entangle", ["CNOT", 0, 0]))
+    with pytest.raises(ValueError, match="entangled"):
+        snapshot(game)
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+import parameters as param
+from sweep import grid_configs, sweep, to_overrides
+
+
+def test_configure_rejects_invalid_probabilities():
+    with pytest.raises(ValueError, match="operation_prob"):
+        param.configure(state_prob=0.6, measurement_prob=0.5)
+    with pytest.raises(ValueError, match="single_qubit_prob"):
+        param.configure(single_qubit_prob=1.5)
+    # Nothing was changed
+    assert param.state_prob == 0.30
+    assert param.operation_prob == pytest.approx(1 - param.state_prob - param.measurement_prob - param.entangle_prob)
+
+
+def test_to_overrides_sets_the_gate_probabilities():
+    overrides = to_overrides({"state_prob": 0.4, "gate_H": 0.5})
+    assert overrides["state_prob"] == 0.4
+    assert overrides["gate_prob"]["single_qubit"]["H"] == 0.5
+    assert overrides["measurement_prob"] == param.measurement_prob
+
+
+def test_invalid_grid_fails_before_playing(tmp_path):
+    configs = grid_configs({"state_prob": [0.3, 0.9], "measurement_prob": [0.2]})
+    with pytest.raises(ValueError):
+        sweep(configs, str(tmp_path / "sweep.npz"), games=2, workers=1)
+    assert not (tmp_path / "sweep.npz").exists()
+
+
+def test_sweep_saves_one_row_per_configuration(tmp_path):
+    configs = grid_configs({"state_prob": [0.2, 0.4]})
+    columns = sweep(configs, str(tmp_path / "sweep.npz"), ["random"] * 4, games=4, workers=1, batch_size=2)
+    np.testing.assert_array_equal(columns["state_prob"], [0.2, 0.4])
+    np.testing.assert_array_equal(columns["games"], [4, 4])
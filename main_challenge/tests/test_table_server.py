@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+import parameters as param
+from load_test import load_test
+from registers import RegisterManager
+from table_server import TableServer
+
+
+def run(server, **message):
+    return asyncio.run(server.handle(message))
+
+
+def test_create_rejects_invalid_numbers_of_players():
+    server = TableServer()
+    for nb_players in (0, 1, 10**6, "4"):
+        response = run(server, id=1, op="create", args={"nb_players": nb_players})
+        assert response == {"id": 1, "ok": False, "error": response["error"]}
+    assert server.tables == {}
+
+
+def test_unexpected_errors_are_returned(monkeypatch):
+    server = TableServer()
+    table = run(server, op="create", args={"seed": 0})["result"]
+
+    def fail(table):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(server, "_op_state", fail)
+    response = run(server, id=2, op="state", table=table)
+    assert response["ok"] is False and "boom" in response["error"]
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_bot_turns_play_until_the_end(seed):
+    async def play():
+        server = TableServer()
+        table = (await server.handle({"op": "create", "args": {"seed": seed}}))["result"]
+        for _ in range(200):
+            response = await server.handle({"op": "bot_turn", "table": table})
+            assert response["ok"], response
+            response = await server.handle({"op": "next_player", "table": table})
+            if response["result"]["ended"]:
+                break
+        server.bot_executor.shutdown()
+        return response["result"]
+
+    assert asyncio.run(play())["ended"]
+
+
+def test_load_test_continues_after_refused_moves(tmp_path, monkeypatch):
+    def refuse(self, slot_a, slot_b):
+        raise ValueError("Refused.")
+
+    # Every Entangle card is refused by the server
+    monkeypatch.setattr(RegisterManager, "check", refuse)
+    param.configure(entangle_prob=0.5)
+
+    async def play():
+        server = TableServer()
+        path = str(tmp_path / "server.sock")
+        async with await asyncio.start_unix_server(server.handle_connection, path):
+            return await load_test(tables=2, games=2, unix_path=path)
+
+    results = asyncio.run(play())
+    assert results["refused_moves"] > 0
+    assert results["requests"] > results["refused_moves"]
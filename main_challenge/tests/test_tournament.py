@@ -0,0 +1,95 @@
+import json
+import os
+
+import pytest
+
+import tournament as tournament_module
+from tournament import Tournament, run, seatings, update_elo
+
+
+def test_update_elo_is_zero_sum():
+    ratings = {"a": 1500.0, "b": 1600.0, "c": 1400.0}
+    update_elo(ratings, ["a", "b", "c", "a"], [2, 1, 4, 3])
+    assert sum(ratings.values()) == pytest.approx(4500)
+    assert ratings["b"] > 1600 and ratings["c"] < 1400
+
+
+def test_update_elo_draws():
+    ratings = {"a": 1500.0, "b": 1500.0}
+    update_elo(ratings, ["a", "b"], [1, 1])
+    assert ratings == {"a": 1500.0, "b": 1500.0}
+
+    # A draw against a better rated player is a gain
+    ratings = {"a": 1500.0, "b": 1700.0}
+    update_elo(ratings, ["a", "b"], [1, 1])
+    assert ratings["a"] > 1500 and ratings["a"] + ratings["b"] == pytest.approx(3200)
+
+
+def test_seatings_rotate_every_group():
+    tables = seatings(["a", "b", "c"], 3)
+    assert tables == [("a", "b", "c"), ("b", "c", "a"), ("c", "a", "b")]
+
+    tables = seatings(["a", "b"], 3)
+    # Every group opposes different policies, in every rotation
+    assert all(len(set(table)) > 1 for table in tables)
+    assert ("a", "a", "b") in tables and ("a", "b", "a") in tables and ("b", "a", "a") in tables
+    assert len(tables) == 6
+
+
+def test_tournaments_need_two_players():
+    with pytest.raises(ValueError):
+        Tournament(["random", "greedy"], nb_players=1)
+
+
+def test_results_are_applied_in_task_order():
+    ranks = [[[1, 2]], [[2, 1]], [[1, 1]], [[2, 1]]]
+    in_order = Tournament(["random", "greedy"], games=2, nb_players=2, chunk_size=1)
+    for task, results in enumerate(ranks):
+        in_order.add_results(task, results)
+
+    shuffled = Tournament(["random", "greedy"], games=2, nb_players=2, chunk_size=1)
+    for task in (2, 0, 3):
+        shuffled.add_results(task, ranks[task])
+    # Task 1 is missing, the tasks 2 and 3 wait for it
+    assert shuffled.next_task == 1 and set(shuffled.pending) == {2, 3}
+    shuffled.add_results(1, ranks[1])
+
+    assert shuffled.finished and not shuffled.pending
+    assert shuffled.ratings == in_order.ratings
+    assert shuffled.stats == in_order.stats
+
+
+# File the tasks played by the workers are written to, inherited by the forked workers
+PLAYED = None
+
+
+def recording_play_task(seating, seed_sequence, first_game, num_games, max_turns):
+    with open(PLAYED, "a") as file:
+        file.write(json.dumps([list(seating), first_game]) + "\n")
+    return PLAY_TASK(seating, seed_sequence, first_game, num_games, max_turns)
+
+
+PLAY_TASK = tournament_module.play_task
+
+
+def test_resume_does_not_replay_finished_tasks(tmp_path, monkeypatch):
+    global PLAYED
+    PLAYED = str(tmp_path / "played.jsonl")
+    monkeypatch.setattr(tournament_module, "play_task", recording_play_task)
+    config = dict(policy_names=["random", "greedy"], games=2, nb_players=2, chunk_size=1, max_turns=10)
+    expected = run(Tournament(**config), workers=1)
+
+    # A tournament killed after its first task and the results of its third one
+    checkpoint = str(tmp_path / "tournament.json")
+    killed = Tournament(**config)
+    for task in (0, 2):
+        killed.add_results(task, PLAY_TASK(*killed.tasks[task], 10))
+    killed.save(checkpoint)
+    os.remove(PLAYED)
+
+    resumed = Tournament.load(checkpoint)
+    assert run(resumed, checkpoint, workers=1) == expected
+    with open(PLAYED) as file:
+        replayed = sorted((tuple(seating), first_game) for seating, first_game in map(json.loads, file))
+    assert replayed == sorted((tuple(resumed.tasks[task][0]), resumed.tasks[task][2]) for task in (1, 3))
+    assert Tournament.load(checkpoint).finished
@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+import pytest
+
+import parameters as param
+import transition_tables
+from transition_tables import TransitionTables, build_tables, get_tables
+
+
+@pytest.fixture
+def tables_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(transition_tables, "TABLES_DIR", str(tmp_path))
+    transition_tables._load_tables.cache_clear()
+    yield tmp_path
+    transition_tables._load_tables.cache_clear()
+
+
+def test_get_tables_follows_num_qubits(tables_dir):
+    param.num_qubits = 2
+    assert get_tables().num_qubits == 2
+    param.num_qubits = 3
+    assert get_tables().num_qubits == 3
+    param.num_qubits = 2
+    assert get_tables().num_qubits == 2
+
+
+def test_save_replaces_the_directory_at_once(tables_dir):
+    param.num_qubits = 2
+    tables = build_tables()
+    path = os.path.join(tables_dir, "clifford_2q")
+    tables.save(path)
+    # Saving again, e.g. after the deck changed, replaces the whole directory
+    tables.save(path)
+
+    assert os.listdir(tables_dir) == ["clifford_2q"]
+    loaded = TransitionTables.load(path)
+    np.testing.assert_array_equal(loaded.operator_table, tables.operator_table)
+
+
+def test_tables_match_the_statevector(tables_dir):
+    param.num_qubits = 2
+    tables = get_tables()
+    for state in range(tables.num_states):
+        for operator_index, operator in enumerate(tables.operators):
+            new_state = tables.operator_table[state, operator_index]
+            expected = transition_tables.operator_unitary(list(operator), 2) @ tables.amplitudes[state]
+            assert tables.state_index(expected) == new_state
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from game_class import QDutch
+from game_record import snapshot
+from headless import RandomPolicy, play_turn
+
+
+def play(game, turns):
+    policy = RandomPolicy(dutch_prob=0.05)
+    for _ in range(turns):
+        if game.check_end_game():
+            break
+        play_turn(game, policy)
+
+
+def assert_same_state(record, other):
+    for field in ("active_player", "dutch_player", "turn"):
+        assert other[field] == record[field]
+    np.testing.assert_allclose(other["amplitudes"], record["amplitudes"], atol=1e-6)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_undo_restores_every_state(seed):
+    game = QDutch(seed)
+    game.start_game(4)
+    game.init_routine()
+
+    start = snapshot(game)
+    play(game, 20)
+    end = snapshot(game)
+
+    while game.undo():
+        pass
+    assert_same_state(start, snapshot(game))
+
+    # Redo goes back to the last state with the same measurement results
+    while game.redo():
+        pass
+    assert_same_state(end, snapshot(game))
+
+
+def test_new_action_clears_the_redo_stack():
+    game = QDutch(0)
+    game.start_game(4)
+    game.init_routine()
+    play(game, 3)
+
+    assert game.undo()
+    game.next_player()
+    assert not game.redo()
+
+
+def test_no_history():
+    game = QDutch(0, history=False)
+    game.start_game(4)
+    game.init_routine()
+    play(game, 3)
+
+    assert not game.undo()
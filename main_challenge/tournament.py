@@ -0,0 +1,278 @@
+"""
+Round-robin tournaments between the policies of the headless simulator, with Elo ratings.
+
+Every group of nb_players policies plays games in every rotation of its seating, so that no
+policy is favored by its seat. The games are split in tasks of chunk_size games played by a
+process pool, each task with its own seed sequence. The results of a task are the ranks of
+QDutch.get_ranking, and each game updates the Elo ratings of every pair of its players.
+
+The ratings are updated in the order of the tasks, whatever the order in which the workers finish
+them, so a tournament only depends on its seed. The progress is saved in a JSON checkpoint after
+each finished task, with the results of the tasks finished out of order, so that a killed
+tournament resumes without playing any finished game again.
+
+The transition tables and the expectimax values are built by the main process before the pool is
+started: the workers share the memory-mapped tables and, when they are forked, inherit the
+expectimax values without computing them again.
+
+Usage:
+    python tournament.py --policies random greedy expectimax --games 200 --checkpoint tournament.json
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+from expectimax import get_slot_values
+from headless import POLICIES, play_chunk
+
+
+def seatings(policy_names, nb_players=4) -> list[tuple[str, ...]]:
+    """
+    Lists the seatings of a round-robin tournament: every group of policies in every rotation.
+
+    Args:
+        policy_names (list[str]): The policies of the tournament (see headless.POLICIES).
+        nb_players (int): The number of players of each game.
+
+    Returns:
+        list[tuple[str, ...]]: The policy of each seat, for each seating.
+    """
+    if len(policy_names) >= nb_players:
+        groups = itertools.combinations(policy_names, nb_players)
+    else:
+        # Some policies play several seats, but every game opposes different policies
+        groups = (group for group in itertools.combinations_with_replacement(policy_names, nb_players)
+                  if len(set(group)) > 1)
+
+    return [group[i:] + group[:i] for group in groups for i in range(nb_players)]
+
+
+def update_elo(ratings, names, ranks, k=32.0) -> None:
+    """
+    Updates Elo ratings with the ranks of a game. Each pair of players is a match won by the best
+    ranked player, or a draw for equal ranks, with a factor k / (nb_players - 1).
+
+    Args:
+        ratings (dict[str, float]): The ratings, updated in place.
+        names (list[str]): The policy of each player.
+        ranks (list[int]): The rank of each player.
+        k (float): The Elo factor of a game.
+    """
+    factor = k / (len(names) - 1)
+    deltas = dict.fromkeys(names, 0.0)
+    for (name_a, rank_a), (name_b, rank_b) in itertools.combinations(zip(names, ranks), 2):
+        if name_a == name_b:
+            continue
+        expected = 1 / (1 + 10**((ratings[name_b] - ratings[name_a]) / 400))
+        score = 1.0 if rank_a < rank_b else 0.5 if rank_a == rank_b else 0.0
+        deltas[name_a] += factor * (score - expected)
+        deltas[name_b] -= factor * (score - expected)
+
+    for name, delta in deltas.items():
+        ratings[name] += delta
+
+
+class Tournament:
+    """
+    State of a tournament: its configuration, the Elo ratings and the statistics of the policies,
+    and the progress of its tasks.
+    """
+    def __init__(self, policy_names, games=100, nb_players=4, seed=0, chunk_size=20, max_turns=50, k=32.0):
+        """
+        Plans a tournament.
+
+        Args:
+            policy_names (list[str]): The policies of the tournament (see headless.POLICIES).
+            games (int): The number of games of each seating.
+            nb_players (int): The number of players of each game.
+            seed (int): The root seed of the tournament.
+            chunk_size (int): The number of games played by a worker task.
+            max_turns (int): Maximal number of turns of a game.
+            k (float): The Elo factor of a game.
+        """
+        if nb_players < 2:
+            raise ValueError(f"A tournament game needs at least 2 players. Got {nb_players}.")
+
+        self.config = {
+            "policies": list(policy_names),
+            "games": games,
+            "nb_players": nb_players,
+            "seed": seed,
+            "chunk_size": chunk_size,
+            "max_turns": max_turns,
+            "k": k,
+        }
+        self.ratings = {name: 1500.0 for name in policy_names}
+        self.stats = {name: {"games": 0, "wins": 0, "rank_sum": 0} for name in policy_names}
+        # Index of the first task whose results are not in the ratings yet
+        self.next_task = 0
+        # Results of the tasks finished before the previous ones
+        self.pending = {}
+
+        # One task per chunk of games of each seating, with its own seed sequence
+        tables = seatings(policy_names, nb_players)
+        starts = range(0, games, chunk_size)
+        self.tasks = [
+            (seating, seed_sequence, start, min(chunk_size, games - start))
+            for seating, seating_seed in zip(tables, np.random.SeedSequence(seed).spawn(len(tables)))
+            for start, seed_sequence in zip(starts, seating_seed.spawn(len(starts)))
+        ]
+
+    @property
+    def finished(self) -> bool:
+        return self.next_task == len(self.tasks)
+
+    def add_results(self, task, results) -> None:
+        """
+        Adds the results of a task. The ratings are updated once the results of all the previous
+        tasks were added.
+
+        Args:
+            task (int): The index of the task.
+            results (list[list[int]]): The ranks of the players of each game of the task.
+        """
+        self.pending[task] = results
+        while self.next_task in self.pending:
+            seating = self.tasks[self.next_task][0]
+            for ranks in self.pending.pop(self.next_task):
+                update_elo(self.ratings, seating, ranks, self.config["k"])
+                for name, rank in zip(seating, ranks):
+                    self.stats[name]["games"] += 1
+                    self.stats[name]["wins"] += rank == 1
+                    self.stats[name]["rank_sum"] += rank
+            self.next_task += 1
+
+    def standings(self) -> list[dict]:
+        """
+        Ranks the policies by their Elo rating.
+
+        Returns:
+            list[dict]: The rating, number of games, win rate and mean rank of each policy.
+        """
+        rows = [
+            {
+                "policy": name,
+                "elo": self.ratings[name],
+                "games": stats["games"],
+                "win_rate": stats["wins"] / stats["games"] if stats["games"] else np.nan,
+                "mean_rank": stats["rank_sum"] / stats["games"] if stats["games"] else np.nan,
+            }
+            for name, stats in self.stats.items()
+        ]
+        return sorted(rows, key=lambda row: -row["elo"])
+
+    def save(self, path) -> None:
+        """
+        Saves a checkpoint. The file is replaced atomically, so a killed tournament never leaves
+        a partial checkpoint.
+
+        Args:
+            path (str): The checkpoint file.
+        """
+        state = {
+            "config": self.config,
+            "ratings": self.ratings,
+            "stats": self.stats,
+            "next_task": self.next_task,
+            "pending": {str(task): results for task, results in self.pending.items()},
+        }
+        with open(path + ".tmp", "w") as file:
+            json.dump(state, file)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path) -> "Tournament":
+        """
+        Loads a checkpoint saved by save.
+
+        Args:
+            path (str): The checkpoint file.
+
+        Returns:
+            Tournament: The tournament.
+        """
+        with open(path) as file:
+            state = json.load(file)
+
+        config = state["config"]
+        tournament = cls(config.pop("policies"), **config)
+        tournament.ratings = state["ratings"]
+        tournament.stats = state["stats"]
+        tournament.next_task = state["next_task"]
+        tournament.pending = {int(task): results for task, results in state["pending"].items()}
+        return tournament
+
+
+def play_task(seating, seed_sequence, first_game, num_games, max_turns) -> list[list[int]]:
+    """
+    Plays the games of a task in a worker process.
+
+    Returns:
+        list[list[int]]: The ranks of the players of each game.
+    """
+    return [result["ranks"] for result in play_chunk(seating, seed_sequence, first_game, num_games, max_turns)]
+
+
+def run(tournament, checkpoint=None, workers=None) -> list[dict]:
+    """
+    Plays the remaining tasks of a tournament in parallel and updates its ratings as the results
+    come in.
+
+    Args:
+        tournament (Tournament): The tournament, e.g. loaded from a checkpoint.
+        checkpoint (str | None): The checkpoint file, saved after each finished task.
+        workers (int | None): The number of worker processes. Defaults to the number of CPUs.
+
+    Returns:
+        list[dict]: The standings of the policies.
+    """
+    if "expectimax" in tournament.config["policies"]:
+        # Built once here and shared with the workers
+        get_slot_values()
+
+    max_turns = tournament.config["max_turns"]
+    remaining = [task for task in range(tournament.next_task, len(tournament.tasks)) if task not in tournament.pending]
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = {executor.submit(play_task, *tournament.tasks[task], max_turns): task for task in remaining}
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                tournament.add_results(futures.pop(future), future.result())
+            if checkpoint is not None:
+                tournament.save(checkpoint)
+
+    return tournament.standings()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Round-robin QDutch tournament with Elo ratings.")
+    parser.add_argument("--policies", nargs="+", default=list(POLICIES), choices=list(POLICIES),
+                        help="Policies of the tournament.")
+    parser.add_argument("--games", type=int, default=100, help="Number of games of each seating.")
+    parser.add_argument("--players", type=int, default=4, help="Number of players of each game.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes.")
+    parser.add_argument("--seed", type=int, default=0, help="Root seed of the tournament.")
+    parser.add_argument("--chunk-size", type=int, default=20, help="Number of games per worker task.")
+    parser.add_argument("--max-turns", type=int, default=50, help="Maximal number of turns of a game.")
+    parser.add_argument("--k", type=float, default=32.0, help="Elo factor of a game.")
+    parser.add_argument("--checkpoint", help="Checkpoint file. An existing checkpoint is resumed.")
+    args = parser.parse_args()
+
+    if args.checkpoint is not None and os.path.exists(args.checkpoint):
+        tournament = Tournament.load(args.checkpoint)
+    else:
+        tournament = Tournament(args.policies, args.games, args.players, args.seed, args.chunk_size, args.max_turns, args.k)
+
+    for row in run(tournament, args.checkpoint, args.workers):
+        print(f"{row['policy']:>12}  elo {row['elo']:7.1f}  games {row['games']:6d}  "
+              f"win rate {row['win_rate']:.3f}  mean rank {row['mean_rank']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Precomputed transition tables over the finite set of states a player slot can reach.
+
+With Clifford operator cards and computational basis state cards, a slot can only be in one of a
+finite number of stabilizer states. The tables enumerate these states once and store, for each of
+them, the state reached after every operator card and every measurement. The tables are saved in
+a directory of .npy files and memory-mapped when loaded, so that all the slots of all the games of
+a process share them.
+"""
+import os
+import shutil
+import tempfile
+from functools import lru_cache
+
+import numpy as np
+import parameters as param
+from card_generator import enumerate_operators
+from statevector_backend import operator_unitary
+
+
+# Directory where the tables are saved
+TABLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tables")
+
+# Number of decimals kept when comparing amplitudes
+DECIMALS = 8
+
+
+def canonical_key(statevector) -> bytes:
+    """
+    Computes a hashable key identifying a state up to its global phase.
+
+    Args:
+        statevector (np.ndarray): The amplitudes of the state.
+
+    Returns:
+        bytes: The key of the state.
+    """
+    statevector = np.asarray(statevector, dtype=complex)
+    first = np.flatnonzero(np.abs(statevector) > 10**-DECIMALS)[0]
+    statevector = statevector * (abs(statevector[first]) / statevector[first])
+
+    # Adding 0.0 turns the negative zeros into positive ones
+    rounded = np.round(statevector.view(float), DECIMALS) + 0.0
+    return rounded.tobytes()
+
+
+class TransitionTables:
+    """
+    Transition and measurement tables over the reachable slot states.
+
+    Attributes:
+        operators (list[tuple[str, ...]]): The operator cards, indexed like the table columns.
+        amplitudes (np.ndarray): (states, 2**n) amplitudes of each state.
+        operator_table (np.ndarray): (states, operators) state reached after each operator card.
+        measure_prob (np.ndarray): (states, n) probability to measure 1 on each qubit.
+        measure_table (np.ndarray): (states, n, 2) state reached after measuring 0 or 1 on each
+            qubit, or -1 if the outcome is impossible.
+        value_prob (np.ndarray): (states, 2**n) probability of each value when measuring all the
+            qubits.
+        value_cdf (np.ndarray): (states, 2**n) cumulative sum of value_prob.
+        basis_states (np.ndarray): (2**n,) state of each computational basis state.
+    """
+    ARRAYS = ("amplitudes", "operator_table", "measure_prob", "measure_table", "value_prob",
+              "value_cdf", "basis_states")
+
+    def __init__(self, operators, **arrays):
+        self.operators = [tuple(operator) for operator in operators]
+        self.operator_index = {operator: i for i, operator in enumerate(self.operators)}
+
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+        self.num_qubits = len(self.operators[0])
+        self._state_index = None
+
+    @property
+    def num_states(self) -> int:
+        return len(self.amplitudes)
+
+    def state_index(self, statevector) -> int:
+        """
+        Finds the index of a state in the tables.
+
+        Args:
+            statevector (np.ndarray): The amplitudes of the state.
+
+        Returns:
+            int: The index of the state.
+        """
+        if self._state_index is None:
+            self._state_index = {canonical_key(amplitudes): i for i, amplitudes in enumerate(self.amplitudes)}
+
+        try:
+            return self._state_index[canonical_key(statevector)]
+        except KeyError:
+            raise ValueError("The state is not in the transition tables.") from None
+
+    def save(self, path) -> None:
+        """
+        Saves the tables in a directory of .npy files. The files are written in a temporary
+        directory renamed to path at the end, so the processes loading the tables at the same
+        time never read a partially written directory.
+
+        Args:
+            path (str): The directory to write.
+        """
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        temp = tempfile.mkdtemp(prefix=os.path.basename(path) + ".", dir=parent)
+        try:
+            np.save(os.path.join(temp, "operators.npy"), np.array(self.operators))
+            for name in self.ARRAYS:
+                np.save(os.path.join(temp, f"{name}.npy"), getattr(self, name))
+
+            if os.path.isdir(path):
+                # Outdated tables: a directory can only be renamed over an empty one. The
+                # processes that memory-mapped them keep reading the moved files.
+                outdated = tempfile.mkdtemp(prefix=os.path.basename(path) + ".", dir=parent)
+                os.replace(path, outdated)
+                shutil.rmtree(outdated, ignore_errors=True)
+            try:
+                os.replace(temp, path)
+            except OSError:
+                # Another process saved the same tables first
+                if not os.path.isdir(path):
+                    raise
+        finally:
+            shutil.rmtree(temp, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path) -> "TransitionTables":
+        """
+        Loads tables saved with save. The arrays are memory-mapped.
+
+        Args:
+            path (str): The directory to read.
+
+        Returns:
+            TransitionTables: The loaded tables.
+        """
+        operators = np.load(os.path.join(path, "operators.npy")).tolist()
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in cls.ARRAYS}
+        return cls(operators, **arrays)
+
+
+def build_tables() -> TransitionTables:
+    """
+    Enumerates all the slot states reachable from the computational basis states with the operator
+    cards and the measurements, and builds their transition tables.
+
+    Returns:
+        TransitionTables: The tables for parameters.num_qubits qubits.
+    """
+    n = param.num_qubits
+    operators = enumerate_operators()
+    unitaries = np.array([operator_unitary(operator, n) for operator in operators])
+    bits = (np.arange(2**n)[None, :] >> np.arange(n)[:, None]) & 1
+
+    states = []
+    index = {}
+
+    def add(statevector):
+        key = canonical_key(statevector)
+        if key not in index:
+            index[key] = len(states)
+            states.append(statevector)
+        return index[key]
+
+    for value in range(2**n):
+        add(np.eye(2**n, dtype=complex)[value])
+
+    # Breadth-first exploration, the states are processed in the order they are found
+    operator_rows = []
+    measure_rows = []
+    measure_probs = []
+    done = 0
+    while done < len(states):
+        statevector = states[done]
+        done += 1
+
+        # All the operator cards at once
+        operator_rows.append([add(new_state) for new_state in unitaries @ statevector])
+
+        # Measurement of each qubit
+        row = []
+        probs = []
+        for q in range(n):
+            outcomes = []
+            for bit in (0, 1):
+                projected = np.where(bits[q] == bit, statevector, 0)
+                norm = np.linalg.norm(projected)
+                outcomes.append(add(projected / norm) if norm > 10**-DECIMALS else -1)
+            row.append(outcomes)
+            probs.append(np.sum(np.abs(statevector[bits[q] == 1])**2))
+        measure_rows.append(row)
+        measure_probs.append(probs)
+
+    amplitudes = np.array(states)
+    value_prob = np.abs(amplitudes)**2
+
+    return TransitionTables(
+        operators,
+        amplitudes=amplitudes,
+        operator_table=np.array(operator_rows, dtype=np.int32),
+        measure_prob=np.array(measure_probs),
+        measure_table=np.array(measure_rows, dtype=np.int32),
+        value_prob=value_prob,
+        value_cdf=np.cumsum(value_prob, axis=1),
+        basis_states=np.arange(2**n, dtype=np.int32),
+    )
+
+
+def get_tables() -> TransitionTables:
+    """
+    Loads the transition tables of parameters.num_qubits qubits, building and saving them first
+    if they are not on disk yet. The tables of each number of qubits are loaded once per process.
+
+    Returns:
+        TransitionTables: The memory-mapped tables.
+    """
+    return _load_tables(param.num_qubits)
+
+
+@lru_cache(maxsize=None)
+def _load_tables(num_qubits) -> TransitionTables:
+    path = os.path.join(TABLES_DIR, f"clifford_{num_qubits}q")
+    operators = [tuple(operator) for operator in enumerate_operators()]
+
+    if os.path.isdir(path):
+        tables = TransitionTables.load(path)
+        # Rebuild the tables if the deck changed since they were saved
+        if tables.operators == operators:
+            return tables
+
+    build_tables().save(path)
+    return TransitionTables.load(path)